@@ -0,0 +1,334 @@
+import argparse
+import csv
+import gc
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+import pandas as pd
+from openpyxl import Workbook
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+sys.path.insert(0, os.path.join(REPO_ROOT, "OCI_all_resources_collector with Cloudguard"))
+
+from OCI_Common.records import record_type, to_json
+from inventory import EXPORT_FIELDS
+from inventory_workbook import write_workbook
+
+try:
+    import pyarrow
+except ImportError:
+    pyarrow = None
+
+# Benchmarks for the report writers. Synthetic tables of any size go through each way the
+# collectors write their output, and every writer is timed and measured on its own:
+#
+#     inventory_workbook    oci_resources.xlsx with its charts (inventory_workbook.py)
+#     inventory_json        oci_resources.json, json.dump with indent=4 as the collector writes it
+#     csv_writer            csv.writer one row at a time (network_security.py, audit_activity.py)
+#     openpyxl              in-memory Workbook (policy.py, orphan version2.py)
+#     openpyxl_write_only   streaming Workbook (drift_report.py, tag_report.py)
+#     pandas_excel          DataFrame.to_excel (dynamic_groups.py, policy_analyzer.py, rightsizing.py)
+#     pandas_csv            DataFrame.to_csv from rows (metric_store.py)
+#     pandas_csv_columns    DataFrame.to_csv from column lists, no row objects
+#     parquet               DataFrame.to_parquet, when pyarrow is installed
+#
+# Each writer and table size runs in a fresh interpreter, so its peak RSS is its own. Results are
+# saved as JSON; with --baseline, writers that got slower, used more memory or wrote bigger files
+# than in an earlier run are listed and the exit status is 1, so a writer regression fails the run
+# that introduced it.
+
+DEFAULT_ROWS = "10000,100000"
+COMPARTMENTS = 200
+RESOURCE_TYPES = ["VCNs", "Compute Instances", "Block Volumes", "Buckets", "Autonomous Databases", "Load Balancers", "Policies"]
+RULE_COLUMNS = ["Compartment", "Type", "Name", "Rule Type", "Protocol", "Source/Destination", "Options", "Remarks"]
+TOLERANCE = 0.25  # Growth over the baseline that counts as a regression
+MIN_SECONDS = 0.5  # Smaller slowdowns are noise whatever the ratio
+MIN_RSS_MB = 16
+MIN_OUTPUT_MB = 1
+SAMPLE_INTERVAL = 0.005  # Seconds between RSS samples where the peak cannot be reset
+
+
+def inventory_table(rows):
+    # A collector run: rows resource records across the compartments and resource types,
+    # with tags, and one finding for every fourth resource
+    record_classes = {resource_type: record_type(resource_type, (), EXPORT_FIELDS[resource_type]) for resource_type in RESOURCE_TYPES}
+    resources, findings = {}, {}
+    for number in range(rows):
+        compartment = f"compartment-{number % COMPARTMENTS}"
+        resource_type = RESOURCE_TYPES[number % len(RESOURCE_TYPES)]
+        resource_id = f"ocid1.resource.oc1.ap-mumbai-1.{number:060d}"
+        record = record_classes[resource_type](
+            display_name=f"resource-{number}", name=f"resource-{number}", id=resource_id,
+            compartment_id=f"ocid1.compartment.oc1..{number % COMPARTMENTS:060d}",
+            defined_tags={"Ops": {"CostCenter": str(number % 50), "Owner": f"user{number % 300}"}},
+            freeform_tags={"env": ("prod", "dev", "test")[number % 3]}
+        )
+        resources.setdefault(compartment, {}).setdefault(resource_type, []).append(record)
+        if number % 4 == 0:
+            findings.setdefault(compartment, []).append({
+                "Rule ID": "COMPUTE-001", "Severity": "MEDIUM", "Compartment": compartment,
+                "Resource Type": resource_type, "Resource Name": f"resource-{number}", "Resource ID": resource_id,
+                "Issue": f"Instance 'resource-{number}' is not using the latest platform image.",
+                "Recommendation": "Rebuild or update the instance from the newest platform image."
+            })
+    return resources, findings
+
+
+def rule_table(rows):
+    # A flat report like security_nsg_report.csv: one list per row
+    return [
+        [f"compartment-{number % COMPARTMENTS}", "Security List", f"security-list-{number // 20}",
+         ("Ingress", "Egress")[number % 2], ("6", "17", "all")[number % 3],
+         f"10.{number % 256}.{number // 256 % 256}.0/24", "-", "Open to all (Risky)" if number % 10 == 0 else "Restricted"]
+        for number in range(rows)
+    ]
+
+
+def write_inventory_workbook(table, path):
+    resources, findings = table
+    write_workbook(path, resources, findings, [], [])
+
+
+def write_inventory_json(table, path):
+    resources, findings = table
+    with open(path, "w") as file:
+        json.dump({"resources": resources, "findings": findings, "cloud_advisor_recommendations": [], "cloud_guard_findings": []},
+                  file, indent=4, default=to_json)
+
+
+def write_csv(rows, path):
+    with open(path, "w", newline="") as file:
+        writer = csv.writer(file)
+        writer.writerow(RULE_COLUMNS)
+        for row in rows:
+            writer.writerow(row)
+
+
+def write_openpyxl(rows, path, write_only=False):
+    workbook = Workbook(write_only=write_only)
+    sheet = workbook.create_sheet("Security Rules")
+    sheet.append(RULE_COLUMNS)
+    for row in rows:
+        sheet.append(row)
+    workbook.save(path)
+
+
+def write_pandas_excel(rows, path):
+    with pd.ExcelWriter(path, engine="openpyxl") as writer:
+        pd.DataFrame(rows, columns=RULE_COLUMNS).to_excel(writer, sheet_name="Security Rules", index=False)
+
+
+def write_pandas_csv(rows, path):
+    pd.DataFrame(rows, columns=RULE_COLUMNS).to_csv(path, index=False)
+
+
+def column_frame(rows):
+    # The same table as one list per column, the way a columnar writer would be fed
+    return pd.DataFrame({column: [row[position] for row in rows] for position, column in enumerate(RULE_COLUMNS)})
+
+
+def write_pandas_csv_columns(frame, path):
+    frame.to_csv(path, index=False)
+
+
+def write_parquet(frame, path):
+    frame.to_parquet(path, index=False)
+
+
+# Writer -> (table builder, write function, file extension). Table building is not timed.
+WRITERS = {
+    "inventory_workbook": (inventory_table, write_inventory_workbook, ".xlsx"),
+    "inventory_json": (inventory_table, write_inventory_json, ".json"),
+    "csv_writer": (rule_table, write_csv, ".csv"),
+    "openpyxl": (rule_table, write_openpyxl, ".xlsx"),
+    "openpyxl_write_only": (rule_table, lambda rows, path: write_openpyxl(rows, path, write_only=True), ".xlsx"),
+    "pandas_excel": (rule_table, write_pandas_excel, ".xlsx"),
+    "pandas_csv": (rule_table, write_pandas_csv, ".csv"),
+    "pandas_csv_columns": (lambda rows: column_frame(rule_table(rows)), write_pandas_csv_columns, ".csv"),
+    "parquet": (lambda rows: column_frame(rule_table(rows)), write_parquet, ".parquet")
+}
+
+
+def unavailable(writer):
+    # Why a writer cannot run here, or None
+    if writer == "parquet" and pyarrow is None:
+        return "needs pyarrow: pip install pyarrow"
+    return None
+
+
+def rss_mb():
+    # Current resident set size, from /proc where there is one
+    try:
+        with open("/proc/self/statm") as file:
+            return int(file.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2 ** 20
+    except OSError:
+        return peak_rss_mb()
+
+
+def peak_rss_mb():
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / 2 ** 20 if sys.platform == "darwin" else peak / 2 ** 10  # Bytes on macOS, KB on Linux
+
+
+def reset_peak_rss():
+    # Linux sets the peak (VmHWM) back to the current RSS when 5 is written to clear_refs
+    try:
+        with open("/proc/self/clear_refs", "w") as file:
+            file.write("5")
+        return True
+    except OSError:
+        return False
+
+
+def hwm_mb():
+    with open("/proc/self/status") as file:
+        for line in file:
+            if line.startswith("VmHWM:"):
+                return int(line.split()[1]) / 2 ** 10
+
+
+class RssSampler(threading.Thread):
+    # Highest RSS seen while running, for platforms where the peak cannot be reset
+
+    def __init__(self, interval=SAMPLE_INTERVAL):
+        super().__init__(daemon=True)
+        self.interval = interval
+        self.peak = rss_mb()
+        self.done = threading.Event()
+
+    def run(self):
+        while not self.done.wait(self.interval):
+            self.peak = max(self.peak, rss_mb())
+
+    def stop(self):
+        self.done.set()
+        self.join()
+        self.peak = max(self.peak, rss_mb())
+        return self.peak
+
+
+def measure(writer, rows, path):
+    # Runs in the child: build the table, then time one write of it. The writer's memory is the
+    # peak during the write alone, over the RSS it started from; building the table is left out.
+    build, write, _ = WRITERS[writer]
+    table = build(rows)
+    gc.collect()
+    build_peak = peak_rss_mb()
+    before = rss_mb()
+    sampler = None if reset_peak_rss() else RssSampler()
+    if sampler:
+        sampler.start()
+    started = time.perf_counter()
+    write(table, path)
+    seconds = time.perf_counter() - started
+    write_peak = sampler.stop() if sampler else hwm_mb()
+    return {
+        "writer": writer, "rows": rows, "seconds": round(seconds, 3),
+        "peak_rss_mb": round(max(build_peak, write_peak), 1), "writer_rss_mb": round(max(write_peak - before, 0), 1),
+        "output_mb": round(os.path.getsize(path) / 2 ** 20, 2)
+    }
+
+
+def run_case(writer, rows, repeat, work_dir):
+    # Best of the repeats for each measurement, each repeat in a fresh interpreter
+    path = os.path.join(work_dir, writer + WRITERS[writer][2])
+    runs = []
+    for _ in range(repeat):
+        completed = subprocess.run(
+            [sys.executable, os.path.abspath(__file__), "--child", writer, str(rows), path],
+            capture_output=True, text=True
+        )
+        if completed.returncode != 0:
+            return {"writer": writer, "rows": rows, "error": completed.stderr.strip().splitlines()[-1]}
+        runs.append(json.loads(completed.stdout.strip().splitlines()[-1]))
+        os.remove(path)
+    result = dict(runs[0])
+    for field in ("seconds", "peak_rss_mb", "writer_rss_mb", "output_mb"):
+        result[field] = min(run[field] for run in runs)
+    return result
+
+
+def regressions(results, baseline):
+    # Writers that got slower, use more memory or write bigger files than in the baseline, beyond
+    # the noise floors
+    previous = {(result["writer"], result["rows"]): result for result in baseline if "error" not in result}
+    found = []
+    for result in results:
+        old = previous.get((result["writer"], result["rows"]))
+        if old is None or "error" in result:
+            continue
+        for field, floor in (("seconds", MIN_SECONDS), ("writer_rss_mb", MIN_RSS_MB), ("output_mb", MIN_OUTPUT_MB)):
+            if result[field] > old[field] * (1 + TOLERANCE) and result[field] - old[field] > floor:
+                found.append(f"{result['writer']} at {result['rows']} rows: {field} {old[field]} -> {result[field]}")
+    return found
+
+
+def print_header():
+    print(f"{'Writer':<22}{'Rows':>10}{'Seconds':>10}{'Rows/s':>11}{'Peak MB':>10}{'Writer MB':>11}{'Output MB':>11}")
+
+
+def print_result(result):
+    if "error" in result:
+        print(f"{result['writer']:<22}{result['rows']:>10}  {result['error']}")
+        return
+    rate = result["rows"] / result["seconds"] if result["seconds"] else 0
+    print(f"{result['writer']:<22}{result['rows']:>10}{result['seconds']:>10.2f}{rate:>11.0f}"
+          f"{result['peak_rss_mb']:>10.1f}{result['writer_rss_mb']:>11.1f}{result['output_mb']:>11.2f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure the report writers on synthetic tables")
+    parser.add_argument("--writers", default=",".join(WRITERS), help="Comma separated writers to run")
+    parser.add_argument("--rows", default=DEFAULT_ROWS, help="Comma separated table sizes, e.g. 10000,100000,1000000")
+    parser.add_argument("--repeat", type=int, default=1, help="Runs per writer and size; the best of them is kept")
+    parser.add_argument("--output", default="writer_benchmark.json", help="Where the results are saved")
+    parser.add_argument("--baseline", help="Results of an earlier run to check for regressions")
+    parser.add_argument("--child", nargs=3, metavar=("WRITER", "ROWS", "PATH"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        writer, rows, path = args.child
+        print(json.dumps(measure(writer, int(rows), path)))
+        return
+
+    writers = [writer.strip() for writer in args.writers.split(",") if writer.strip()]
+    for writer in writers:
+        if writer not in WRITERS:
+            parser.error(f"unknown writer '{writer}'; choose from {', '.join(WRITERS)}")
+    sizes = [int(rows) for rows in args.rows.split(",")]
+    baseline = None
+    if args.baseline:
+        with open(args.baseline) as file:
+            baseline = json.load(file)
+
+    results = []
+    print_header()
+    with tempfile.TemporaryDirectory() as work_dir:
+        for rows in sizes:
+            for writer in writers:
+                reason = unavailable(writer)
+                result = {"writer": writer, "rows": rows, "error": reason} if reason else run_case(writer, rows, args.repeat, work_dir)
+                results.append(result)
+                print_result(result)
+    with open(args.output, "w") as file:
+        json.dump(results, file, indent=4)
+    print(f"Results saved to {args.output}")
+
+    if baseline is not None:
+        found = regressions(results, baseline)
+        for regression in found:
+            print(f"Regression: {regression}")
+        if found:
+            sys.exit(1)
+        print(f"No regressions against {args.baseline}")
+
+
+if __name__ == "__main__":
+    main()
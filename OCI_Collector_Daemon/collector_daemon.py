@@ -0,0 +1,295 @@
+import argparse
+import contextlib
+import json
+import os
+import random
+import runpy
+import shlex
+import sys
+import threading
+import time
+import traceback
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, unquote, urlsplit
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+
+from OCI_Common import compartments
+from OCI_Common.snapshots import iter_csv_snapshot, iter_json_rows, iter_json_snapshot, iter_xlsx_snapshot
+from result_index import FILTERS, ResultIndex
+
+# Runs the collectors from one long-lived process instead of cron. Each collector keeps its own
+# interval, stretched or shortened at random by the jitter so runs drift apart instead of lining
+# up, and only one collector runs at a time. Collectors run in this process, so SDK clients
+# (OCI_Common/clients.py), the compartment listing and imported modules stay warm between runs.
+# After every run the collector's output file is read back into an index that a local HTTP API
+# serves as JSON:
+#
+#     GET /status                                    collectors, last and next runs, record counts
+#     GET /resources?type=Compute Instances&tag=Ops.Owner=alice
+#     GET /resources/<ocid>                          every record of one resource
+#
+# /resources takes any of ocid, compartment, type, tag and collector, plus limit.
+
+HOST = "127.0.0.1"
+PORT = 8765
+JITTER = 0.1  # Fraction of an interval each run moves, either way
+COMPARTMENT_TTL = 900  # Seconds one compartment listing is shared by the collectors
+MAX_RESULTS = 1000  # Records returned by a query unless it asks for another limit
+
+# Every collector the daemon schedules: its script, default interval in seconds, the file it
+# writes into the data directory and how that file is read back into rows
+COLLECTORS = {
+    "resources": {
+        "script": "OCI_all_resources_collector with Cloudguard/collector_all_resorces.py", "interval": 3600,
+        "output": "oci_resources.json", "read": iter_json_snapshot
+    },
+    "orphans": {
+        "script": "OCI_Orphan_Resources_Collector/orphan version2.py", "interval": 6 * 3600,
+        "output": "unused_resources_report.xlsx", "read": iter_xlsx_snapshot
+    },
+    "security_lists": {
+        "script": "OCI_Security list/network_security.py", "interval": 3600,
+        "output": "security_nsg_report.csv", "read": lambda path: iter_csv_snapshot(path, "Security Rules")
+    },
+    "policies": {
+        "script": "OCI_Policy_Collector/policy.py", "interval": 6 * 3600,
+        "output": "iam_audit_report.xlsx", "read": lambda path: iter_xlsx_snapshot(path, all_sheets=True)
+    },
+    "vcns": {
+        "script": "OCI_VCN_Collector/Collector_vcn oci.py", "interval": 3600,
+        "output": "vcn_details.json", "read": lambda path: iter_json_rows(path, "VCNs")
+    },
+    "cloud_guard": {
+        "script": "OCI_all_resources_collector with Cloudguard/cloud_guard.py", "interval": 900,
+        "output": "cloud_guard_problems.json", "read": lambda path: iter_json_rows(path, "Cloud Guard Problems")
+    }
+}
+
+
+def format_time(timestamp):
+    return datetime.fromtimestamp(timestamp, timezone.utc).isoformat(timespec="seconds") if timestamp else None
+
+
+class Job:
+    __slots__ = ("name", "script", "args", "interval", "output", "read", "next_run", "last_run", "last_duration",
+                 "last_error", "runs", "index")
+
+    def __init__(self, name, args=None, interval=None):
+        collector = COLLECTORS[name]
+        self.name = name
+        self.script = os.path.join(REPO_ROOT, collector["script"])
+        self.args = args or []
+        self.interval = interval or collector["interval"]
+        self.output = collector["output"]
+        self.read = collector["read"]
+        self.next_run = None
+        self.last_run = None
+        self.last_duration = None
+        self.last_error = None
+        self.runs = 0
+        self.index = ResultIndex([])
+
+    def load(self):
+        # Swap in an index of the current output file
+        self.index = ResultIndex(self.read(self.output))
+
+    def status(self):
+        return {
+            "interval": self.interval,
+            "last_run": format_time(self.last_run),
+            "last_duration": round(self.last_duration, 1) if self.last_duration is not None else None,
+            "last_error": self.last_error,
+            "next_run": format_time(self.next_run),
+            "runs": self.runs,
+            "records": len(self.index)
+        }
+
+
+def run_script(job):
+    # The script runs as if started from the command line in the data directory, with its own
+    # folder on sys.path for its sibling modules; what it prints goes to <job>.log
+    argv, path = sys.argv, list(sys.path)
+    sys.argv = [job.script] + job.args
+    sys.path.insert(0, os.path.dirname(job.script))
+    try:
+        with open(f"{job.name}.log", "w") as log, contextlib.redirect_stdout(log):
+            try:
+                runpy.run_path(job.script, run_name="__main__")
+            except SystemExit as e:
+                if e.code not in (None, 0):
+                    return f"exited with {e.code}"
+            except Exception as e:
+                traceback.print_exc(file=log)
+                return f"{type(e).__name__}: {e}"
+    finally:
+        sys.argv = argv
+        sys.path[:] = path
+    return None
+
+
+class CollectorDaemon:
+    def __init__(self, jobs, jitter=JITTER):
+        self.jobs = {job.name: job for job in jobs}
+        self.jitter = jitter
+        self.stopped = threading.Event()
+
+    def next_interval(self, job):
+        return job.interval * random.uniform(1 - self.jitter, 1 + self.jitter)
+
+    def start(self):
+        # Results left by an earlier daemon are served at once, and a collector whose output is
+        # still fresh waits out the rest of its interval. The others start at random points in
+        # the first jitter window instead of all at once.
+        now = time.time()
+        for job in self.jobs.values():
+            if os.path.exists(job.output):
+                try:
+                    job.load()
+                    job.last_run = os.path.getmtime(job.output)
+                except Exception as e:
+                    print(f"[{job.name}] Could not read {job.output}: {e}")
+            if job.last_run:
+                job.next_run = max(now, job.last_run + self.next_interval(job))
+            else:
+                job.next_run = now + random.uniform(0, job.interval * self.jitter)
+
+    def run_job(self, job):
+        print(f"[{job.name}] Running {os.path.basename(job.script)}")
+        started = time.time()
+        error = run_script(job)
+        if error is None and not (os.path.exists(job.output) and os.path.getmtime(job.output) >= started):
+            error = f"{job.output} was not written, see {job.name}.log"
+        if error is None:
+            try:
+                job.load()
+            except Exception as e:
+                error = f"Could not read {job.output}: {e}"
+        job.runs += 1
+        job.last_duration = time.time() - started
+        job.last_error = error
+        if error is None:
+            job.last_run = started
+        job.next_run = time.time() + self.next_interval(job)
+        outcome = f"{len(job.index)} records" if error is None else f"failed: {error}"
+        print(f"[{job.name}] {outcome} in {job.last_duration:.1f}s; next run at {format_time(job.next_run)}")
+
+    def run(self):
+        # Collectors run one at a time, whichever is due first
+        self.start()
+        while not self.stopped.is_set():
+            job = min(self.jobs.values(), key=lambda job: job.next_run)
+            wait = job.next_run - time.time()
+            if wait > 0:
+                self.stopped.wait(wait)
+                continue
+            self.run_job(job)
+
+    def status(self):
+        return {"collectors": {name: job.status() for name, job in self.jobs.items()}}
+
+    def query(self, params):
+        unknown = set(params) - set(FILTERS) - {"collector", "limit"}
+        if unknown:
+            raise ValueError(f"Unknown parameters: {', '.join(sorted(unknown))}; use {', '.join(FILTERS)}, collector or limit")
+        names = [params["collector"]] if "collector" in params else list(self.jobs)
+        for name in names:
+            if name not in self.jobs:
+                raise ValueError(f"Unknown collector '{name}'")
+        limit = int(params.get("limit", MAX_RESULTS))
+        filters = {name: params.get(name) for name in FILTERS}
+        matches = []
+        for name in names:
+            for compartment, resource_type, record in self.jobs[name].index.query(filters):
+                matches.append({"collector": name, "compartment": compartment, "type": resource_type, "record": record})
+        return {"count": len(matches), "records": matches[:limit]}
+
+
+class QueryHandler(BaseHTTPRequestHandler):
+    daemon = None  # Set by serve()
+
+    def do_GET(self):
+        url = urlsplit(self.path)
+        params = {name: values[-1] for name, values in parse_qs(url.query).items()}
+        parts = [unquote(part) for part in url.path.split("/") if part]
+        try:
+            if parts == ["status"]:
+                self.send_json(200, self.daemon.status())
+            elif parts and parts[0] == "resources" and len(parts) <= 2:
+                if len(parts) == 2:
+                    params["ocid"] = parts[1]
+                self.send_json(200, self.daemon.query(params))
+            else:
+                self.send_json(404, {"error": f"No such endpoint: {url.path}"})
+        except ValueError as e:
+            self.send_json(400, {"error": str(e)})
+
+    def send_json(self, status, body):
+        data = json.dumps(body, default=str).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        # Queries are not logged; the daemon's output is kept for collector runs
+        pass
+
+
+def serve(daemon, host=HOST, port=PORT):
+    # The API runs on its own threads, so queries are answered while a collector runs
+    handler = type("Handler", (QueryHandler,), {"daemon": daemon})
+    server = ThreadingHTTPServer((host, port), handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def parse_settings(parser, values, convert):
+    # ["resources=1800", ...] -> {"resources": convert("1800")}
+    settings = {}
+    for value in values or []:
+        name, _, setting = value.partition("=")
+        if name not in COLLECTORS:
+            parser.error(f"unknown collector '{name}'; choose from {', '.join(COLLECTORS)}")
+        settings[name] = convert(setting)
+    return settings
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the OCI collectors on a schedule and serve their results over HTTP")
+    parser.add_argument("--collectors", default=",".join(COLLECTORS), help="Comma separated collectors to schedule")
+    parser.add_argument("--interval", action="append", metavar="NAME=SECONDS", help="Interval of one collector, e.g. cloud_guard=300")
+    parser.add_argument("--args", action="append", metavar="NAME=ARGS", help='Command line of one collector, e.g. resources="--backend async"')
+    parser.add_argument("--jitter", type=float, default=JITTER, help="Fraction of each interval a run may move either way")
+    parser.add_argument("--compartment-ttl", type=int, default=COMPARTMENT_TTL, help="Seconds the collectors share one compartment listing")
+    parser.add_argument("--data-dir", default="collector_data", help="Directory the collectors write their files to")
+    parser.add_argument("--host", default=HOST)
+    parser.add_argument("--port", type=int, default=PORT)
+    args = parser.parse_args()
+
+    intervals = parse_settings(parser, args.interval, int)
+    job_args = parse_settings(parser, args.args, shlex.split)
+    names = [name.strip() for name in args.collectors.split(",") if name.strip()]
+    for name in names:
+        if name not in COLLECTORS:
+            parser.error(f"unknown collector '{name}'; choose from {', '.join(COLLECTORS)}")
+    os.makedirs(args.data_dir, exist_ok=True)
+    os.chdir(args.data_dir)
+    compartments.CACHE_TTL = args.compartment_ttl
+
+    daemon = CollectorDaemon([Job(name, job_args.get(name), intervals.get(name)) for name in names], args.jitter)
+    server = serve(daemon, args.host, args.port)
+    print(f"Serving results on http://{args.host}:{args.port}/ from {os.getcwd()}")
+    try:
+        daemon.run()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,53 @@
+from OCI_Common.snapshots import record_ocid
+from OCI_Common.tag_index import tag_terms
+
+FILTERS = ("ocid", "compartment", "type", "tag")
+
+
+class ResultIndex:
+    # The records of one collector run, with a lookup table per filter. An index is built whole
+    # from a finished run and then swapped in, so a query never sees half of a run.
+
+    def __init__(self, rows):
+        self.records = []  # (compartment, resource type, record)
+        self.ocids = []
+        self.lookups = {name: {} for name in FILTERS}  # filter -> value -> record positions
+        for compartment, resource_type, record in rows:
+            position = len(self.records)
+            resource_id = record_ocid(record)
+            self.records.append((compartment, resource_type, record))
+            self.ocids.append(resource_id)
+            self._add("ocid", resource_id, position)
+            self._add("compartment", compartment, position)
+            self._add("type", resource_type, position)
+            for key in tag_terms(record):
+                self._add("tag", key, position)
+
+    def __len__(self):
+        return len(self.records)
+
+    def _add(self, name, value, position):
+        if value is not None:
+            self.lookups[name].setdefault(value, []).append(position)
+
+    def _matches(self, position, name, value):
+        compartment, resource_type, record = self.records[position]
+        if name == "ocid":
+            return self.ocids[position] == value
+        if name == "compartment":
+            return compartment == value
+        if name == "type":
+            return resource_type == value
+        return value in tag_terms(record)
+
+    def query(self, filters):
+        # Records matching every filter: the most selective filter's positions are read from its
+        # lookup table and checked against the others one record at a time
+        filters = {name: value for name, value in filters.items() if value is not None}
+        if not filters:
+            return list(self.records)
+        candidates = min((self.lookups[name].get(value, []) for name, value in filters.items()), key=len)
+        return [
+            self.records[position] for position in candidates
+            if all(self._matches(position, name, value) for name, value in filters.items())
+        ]
@@ -0,0 +1,3 @@
+# Shared helpers used by the collector scripts in this repository.
+# Scripts live in folders with spaces in their names, so each one adds the
+# repository root to sys.path before importing from OCI_Common.
@@ -0,0 +1,208 @@
+import asyncio
+import json
+import random
+from datetime import datetime, timezone
+
+import oci
+from oci._vendor import requests  # The SDK's own copy, which its signer is written against
+
+from OCI_Common.pagination import MAX_LIMIT, next_request, page_items, supports_limit
+
+try:
+    import aiohttp
+    import yarl
+except ImportError:
+    aiohttp = None
+
+MAX_IN_FLIGHT = 200  # Requests on the network at once, across every compartment
+MAX_COMPARTMENTS = 32  # Compartments scanned at once; bounds memory rather than the request rate
+MAX_ATTEMPTS = 6
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+
+def backoff(attempt):
+    # Exponential backoff with full jitter, so throttled requests do not come back in lockstep
+    return random.uniform(0, min(30, 0.5 * 2 ** attempt))
+
+
+def capture_request(request, allow_control_chars=None, operation_name=None, api_reference_link=None):
+    # Kept with the request so a failure reports the same context as the synchronous SDK
+    request.operation_name = operation_name
+    request.api_reference_link = api_reference_link
+    return request
+
+
+def service_error(client, status, headers, body, request):
+    try:
+        payload = json.loads(body)
+    except ValueError:
+        payload = {}
+    return oci.exceptions.ServiceError(
+        status, payload.get("code", "Unknown"), headers, payload.get("message", body.decode(errors="replace")),
+        original_request=request, operation_name=request.operation_name,
+        api_reference_link=request.api_reference_link, target_service=client.base_client.service,
+        request_endpoint=f"{request.method} {request.url}", client_version=oci.version.__version__,
+        timestamp=datetime.now(timezone.utc).isoformat()
+    )
+
+
+class AsyncOCI:
+    # Sends SDK requests over one shared aiohttp connection pool. Every SDK client is kept as a
+    # template whose operations validate their arguments and build the request exactly as usual
+    # but hand it back instead of sending it; the request is then signed with the client's own
+    # signer, sent without blocking, and the response is turned into the usual SDK models.
+
+    def __init__(self, config, client_classes, max_in_flight=MAX_IN_FLIGHT, endpoint=None, max_attempts=MAX_ATTEMPTS):
+        if aiohttp is None:
+            raise RuntimeError("The asyncio backend needs aiohttp: pip install aiohttp")
+        self.max_in_flight = max_in_flight
+        self.max_attempts = max_attempts
+        self.clients = {}
+        for key, client_class in client_classes.items():
+            kwargs = {"retry_strategy": oci.retry.NoneRetryStrategy()}
+            if endpoint:
+                kwargs["service_endpoint"] = endpoint
+            client = client_class(config, **kwargs)
+            client.base_client.request = capture_request
+            self.clients[key] = client
+        self.session = None
+        self.semaphore = None
+        self.requests_sent = 0
+
+    async def __aenter__(self):
+        connector = aiohttp.TCPConnector(limit=self.max_in_flight, limit_per_host=self.max_in_flight, ttl_dns_cache=300)
+        timeout = aiohttp.ClientTimeout(sock_connect=10, sock_read=60)
+        self.session = aiohttp.ClientSession(connector=connector, timeout=timeout)
+        self.semaphore = asyncio.Semaphore(self.max_in_flight)
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.session.close()
+
+    async def send(self, client, request):
+        signer = client.base_client.signer
+        if not request.enforce_content_headers:
+            signer = signer.without_content_headers
+        for attempt in range(self.max_attempts):
+            async with self.semaphore:
+                # Signed once a slot is free, so a long wait never leaves a stale date in the signature
+                prepared = requests.Request(
+                    request.method, request.url, params=request.query_params,
+                    headers=request.header_params, data=request.body
+                ).prepare()
+                signer(prepared)
+                try:
+                    async with self.session.request(
+                            prepared.method, yarl.URL(prepared.url, encoded=True),
+                            headers=dict(prepared.headers), data=prepared.body) as response:
+                        status, headers, body = response.status, response.headers, await response.read()
+                except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                    if attempt + 1 == self.max_attempts:
+                        raise oci.exceptions.RequestException(f"{request.method} {request.url}: {e!r}")
+                    status = None
+            self.requests_sent += 1
+            if status is not None and 200 <= status <= 299:
+                data = client.base_client.deserialize_response_data(body, request.response_type) if request.response_type else None
+                return oci.response.Response(status, headers, data, request)
+            if status is not None and (status not in RETRY_STATUSES or attempt + 1 == self.max_attempts):
+                raise service_error(client, status, headers, body, request)
+            await asyncio.sleep(backoff(attempt))
+
+    async def list_all(self, call):
+        client = self.clients[call.client]
+        operation = getattr(client, call.operation)
+        request = dict(call.kwargs)
+        if "limit" not in request and supports_limit(operation):
+            request["limit"] = MAX_LIMIT
+        items = []
+        while request is not None:
+            try:
+                response = await self.send(client, operation(*call.args, **request))
+            except oci.exceptions.ServiceError as e:
+                if e.status != 400 or "limit" not in request or "limit" in call.kwargs:
+                    raise
+                # Some services cap pages below MAX_LIMIT; fall back to their default size
+                del request["limit"]
+                continue
+            page = page_items(response.data)
+            if call.match is None:
+                items.extend(page)
+            elif any(call.match(item) for item in page):
+                return True
+            request = next_request(response, request)
+        return items if call.match is None else False
+
+    async def resolve(self, request):
+        if isinstance(request, list):
+            try:
+                async with asyncio.TaskGroup() as group:
+                    tasks = [group.create_task(self.resolve(item)) for item in request]
+            except ExceptionGroup as errors:
+                raise errors.exceptions[0]
+            return [task.result() for task in tasks]
+        try:
+            if request.paginated:
+                return await self.list_all(request)
+            client = self.clients[request.client]
+            response = await self.send(client, getattr(client, request.operation)(*request.args, **request.kwargs))
+            return response.data
+        except oci.exceptions.ServiceError as e:
+            if request.tolerant:
+                return e
+            raise
+
+
+def advance(steps, value, error):
+    # StopIteration cannot cross a thread boundary, so the end of the scan is returned as a flag
+    try:
+        return False, steps.throw(error) if error is not None else steps.send(value)
+    except StopIteration as stop:
+        return True, stop.value
+
+
+async def run_scan_async(aoci, scan, *args):
+    # Same protocol as calls.run_scan. The scan's own code runs in a worker thread, so the
+    # synchronous helpers it may use (BucketCache, ImageIndex) never block the event loop.
+    steps = scan(*args)
+    value, error = None, None
+    while True:
+        done, request = await asyncio.to_thread(advance, steps, value, error)
+        if done:
+            return request
+        try:
+            value, error = await aoci.resolve(request), None
+        except oci.exceptions.ServiceError as e:
+            value, error = None, e
+
+
+async def scan_compartments(aoci, compartments, units, max_compartments=MAX_COMPARTMENTS):
+    # units(compartment) lists the (scan, args) pairs for one compartment. Each compartment's scans
+    # run together in a task group; results come back in compartment and unit order, with a scan
+    # that failed on a service error returned as that error.
+    limit = asyncio.Semaphore(max_compartments)
+
+    async def guarded(scan, args):
+        try:
+            return await run_scan_async(aoci, scan, *args)
+        except oci.exceptions.ServiceError as e:
+            return e
+
+    async def scan_compartment(compartment):
+        async with limit:
+            async with asyncio.TaskGroup() as group:
+                tasks = [group.create_task(guarded(scan, args)) for scan, args in units(compartment)]
+            return [task.result() for task in tasks]
+
+    async with asyncio.TaskGroup() as group:
+        tasks = [group.create_task(scan_compartment(compartment)) for compartment in compartments]
+    return [task.result() for task in tasks]
+
+
+def run_compartment_scans(config, client_classes, compartments, units, max_in_flight=MAX_IN_FLIGHT, endpoint=None):
+    async def main():
+        async with AsyncOCI(config, client_classes, max_in_flight, endpoint) as aoci:
+            results = await scan_compartments(aoci, compartments, units)
+            print(f"Sent {aoci.requests_sent} requests with up to {max_in_flight} in flight")
+            return results
+
+    return asyncio.run(main())
@@ -0,0 +1,101 @@
+from concurrent.futures import ThreadPoolExecutor
+
+import oci
+
+from OCI_Common.pagination import paginate
+
+
+class BackupRecord:
+    __slots__ = ("id", "source_id", "kind", "name", "compartment_id", "size_in_gbs", "source_type", "time_created")
+
+    def __init__(self, id, source_id, kind, name, compartment_id, size_in_gbs, source_type, time_created):
+        self.id = id
+        self.source_id = source_id
+        self.kind = kind
+        self.name = name
+        self.compartment_id = compartment_id
+        self.size_in_gbs = size_in_gbs
+        self.source_type = source_type
+        self.time_created = time_created
+
+
+def backup_records(volume_backups, boot_volume_backups):
+    # Records for the available backups out of one volume and one boot volume backup listing
+    records = []
+    for backup in volume_backups:
+        if backup.lifecycle_state == "AVAILABLE":
+            records.append(BackupRecord(
+                backup.id, backup.volume_id, "Volume Backup", backup.display_name, backup.compartment_id,
+                backup.size_in_gbs, backup.source_type, backup.time_created
+            ))
+    for backup in boot_volume_backups:
+        if backup.lifecycle_state == "AVAILABLE":
+            records.append(BackupRecord(
+                backup.id, backup.boot_volume_id, "Boot Volume Backup", backup.display_name, backup.compartment_id,
+                backup.size_in_gbs, backup.source_type, backup.time_created
+            ))
+    return records
+
+
+def fetch_backups(blockstorage_client, compartment_id):
+    # One paginated pass over volume and boot volume backups in a compartment
+    return backup_records(
+        paginate(blockstorage_client.list_volume_backups, compartment_id=compartment_id),
+        paginate(blockstorage_client.list_boot_volume_backups, compartment_id=compartment_id)
+    )
+
+
+def fetch_policy_assignments(blockstorage_client, volume_ids, max_workers=8):
+    # Exact policy assignment per volume. There is no bulk listing for assignments,
+    # so only call this for the volumes the backup index cannot already vouch for.
+    def lookup(volume_id):
+        try:
+            assignments = blockstorage_client.get_volume_backup_policy_asset_assignment(volume_id).data
+        except oci.exceptions.ServiceError:
+            return volume_id, None
+        return volume_id, assignments[0].policy_id if assignments else None
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        return {volume_id: policy_id for volume_id, policy_id in executor.map(lookup, volume_ids) if policy_id}
+
+
+class BackupIndex:
+    # Backups keyed by source volume id so report rows are filled with dictionary lookups
+
+    def __init__(self, records=()):
+        self.latest = {}  # source volume id -> newest BackupRecord
+        self.scheduled = set()  # source volume ids with backups created by a backup policy
+        self.policies = {}  # source volume id -> backup policy id, when assignments were fetched
+        self.records = []
+        self.incomplete = False  # A backup listing failed, so a missing backup is not proof of none
+        for record in records:
+            self.add(record)
+
+    def add(self, record):
+        self.records.append(record)
+        current = self.latest.get(record.source_id)
+        if current is None or record.time_created > current.time_created:
+            self.latest[record.source_id] = record
+        if record.source_type == "SCHEDULED":
+            self.scheduled.add(record.source_id)
+
+    def last_backup_time(self, volume_id):
+        record = self.latest.get(volume_id)
+        return record.time_created if record else None
+
+    def last_backup_label(self, volume_id, format_time):
+        # Newest backup time, "Never", or "Unknown" when a failed listing may have held it
+        record = self.latest.get(volume_id)
+        if record:
+            return format_time(record.time_created)
+        return "Unknown" if self.incomplete else "Never"
+
+    def policy_label(self, volume_id):
+        return "Scheduled" if self.has_policy(volume_id) else "Unknown" if self.incomplete else "None"
+
+    def has_policy(self, volume_id):
+        return volume_id in self.policies or volume_id in self.scheduled
+
+    def orphaned(self, existing_volume_ids):
+        # Backups whose source volume or boot volume no longer exists
+        return [record for record in self.records if record.source_id not in existing_volume_ids]
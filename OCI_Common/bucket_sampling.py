@@ -0,0 +1,437 @@
+import argparse
+import bisect
+import datetime
+import math
+import random
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import oci
+
+OBJECT_FIELDS = "name,size,timeCreated,storageTier"
+DELIMITER = "/"
+MAX_DEPTH = 6  # Prefix levels to descend before sampling the keyspace directly
+MIN_CHILD_BUDGET = 8  # Calls given to each sampled child prefix
+DIRECTORY_PAGES = 3  # Pages of a delimiter listing before a prefix counts as flat
+MAX_SPLIT = 12  # Split on the next character only when at most this many are in use
+MAX_KEY_BITS = 50  # Positions are floats, so keep the keyspace within double precision
+
+SIZE_BUCKETS = [("< 1 MB", 1024 ** 2), ("1 MB - 100 MB", 100 * 1024 ** 2), ("100 MB - 1 GB", 1024 ** 3), ("> 1 GB", None)]
+AGE_BUCKETS = [("< 30 days", 30), ("30 - 90 days", 90), ("90 - 365 days", 365), ("> 1 year", None)]
+Z_95 = 1.96
+
+
+def classify(value, buckets):
+    for label, limit in buckets:
+        if limit is None or value < limit:
+            return label
+    return buckets[-1][0]
+
+
+class Keyspace:
+    # Maps object names to positions in [0, 1) and back. Names are ordered by their UTF-8 bytes,
+    # so after the prefix every object shares, each character is one digit of a fraction. Digits
+    # are ranks in the alphabet seen in the listed names, which keeps the positions dense: with raw
+    # byte values almost every start key would fall between two clusters of real names.
+
+    def __init__(self, base, names):
+        self.base = base
+        self.alphabet = sorted({char for name in names for char in name[len(base):]})
+        self.radix = len(self.alphabet) + 1  # Digit 0 is the end of the name
+        self.digits = max(1, int(MAX_KEY_BITS / math.log2(self.radix)))
+        self.scale = self.radix ** self.digits
+        self.resolution = 1.0 / self.scale
+
+    def position(self, name):
+        value = 0
+        suffix = name[len(self.base):]
+        for index in range(self.digits):
+            # Characters missing from the alphabet take the rank of the nearest smaller character
+            digit = bisect.bisect_right(self.alphabet, suffix[index]) if index < len(suffix) else 0
+            value = value * self.radix + digit
+        return value / self.scale
+
+    def key(self, position):
+        # Inverse of position; a zero digit ends the key, which only moves it earlier
+        value = min(int(position * self.scale), self.scale - 1)
+        digits = []
+        for _ in range(self.digits):
+            value, digit = divmod(value, self.radix)
+            digits.append(digit)
+        chars = []
+        for digit in reversed(digits):
+            if digit == 0:
+                break
+            chars.append(self.alphabet[digit - 1])
+        return self.base + "".join(chars)
+
+
+class Sample:
+    # Estimated totals for part of a bucket, their variances, the listed objects with the
+    # number of objects each one stands for, and the list calls spent on them
+    __slots__ = ("count", "count_variance", "bytes", "bytes_variance", "weighted", "exact", "calls")
+
+    def __init__(self, objects=(), exact=True):
+        objects = list(objects)
+        self.count = len(objects)
+        self.count_variance = 0.0
+        self.bytes = sum(obj.size or 0 for obj in objects)
+        self.bytes_variance = 0.0
+        self.weighted = [(obj, 1.0) for obj in objects]
+        self.exact = exact
+        self.calls = 0
+
+    def add(self, other, scale=1.0):
+        self.count += other.count * scale
+        self.count_variance += other.count_variance * scale * scale
+        self.bytes += other.bytes * scale
+        self.bytes_variance += other.bytes_variance * scale * scale
+        self.weighted.extend((obj, weight * scale) for obj, weight in other.weighted)
+        self.exact = self.exact and other.exact and scale == 1.0
+        self.calls += other.calls
+
+
+def ratio_total(values, widths, measure):
+    # Ratio estimate of a total over `measure` units of keyspace from windows of the given widths,
+    # and its variance. Windows are the sampling units.
+    count = len(values)
+    total_width = sum(widths)
+    if count == 0 or total_width <= 0:
+        return 0.0, 0.0
+    ratio = sum(values) / total_width
+    if count == 1:
+        return ratio * measure, 0.0
+    residuals = sum((value - ratio * width) ** 2 for value, width in zip(values, widths))
+    scale = measure / (total_width / count)
+    return ratio * measure, scale * scale * residuals / (count * (count - 1))
+
+
+class BucketSampler:
+    # Estimates a bucket from a bounded number of list_objects calls. Prefixes ("directories")
+    # are strata: when a prefix has too many objects for one page, its child prefixes are listed
+    # with a delimiter and a random subset of them is sampled (two-stage cluster sampling).
+    # Prefixes that are flat are sampled by position in their keyspace instead.
+
+    def __init__(self, object_storage_client, namespace, bucket_name, page_size=1000, max_workers=8, seed=None):
+        self.client = object_storage_client
+        self.namespace = namespace
+        self.bucket_name = bucket_name
+        self.page_size = page_size
+        self.max_workers = max_workers
+        self.rng = random.Random(seed)
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def list_page(self, prefix=None, start=None, end=None, limit=None, delimiter=None):
+        with self._lock:
+            self.calls += 1
+        return self.client.list_objects(
+            self.namespace, self.bucket_name, prefix=prefix or None, start=start or None, end=end,
+            limit=limit or self.page_size, delimiter=delimiter, fields=OBJECT_FIELDS
+        ).data
+
+    def sample_prefix(self, prefix, budget, depth=0):
+        # The returned sample counts the calls spent on it, so a caller can hand on what is left
+        page = self.list_page(prefix=prefix)
+        if not page.next_start_with:
+            sample = Sample(page.objects)
+            sample.calls = 1
+            return sample
+        initial = budget
+        budget -= 1
+        base = None
+        if depth < MAX_DEPTH and budget >= 2 + MIN_CHILD_BUDGET:
+            # Directories under the prefix are the natural strata
+            objects, prefixes, complete, calls = self.list_directories(prefix, min(DIRECTORY_PAGES, budget // MIN_CHILD_BUDGET))
+            budget -= calls
+            if complete and prefixes:
+                sample = self.sample_children(objects, prefixes, budget, depth)
+                sample.calls += initial - budget
+                return sample
+            # Otherwise split on the character after the shared prefix when only a few are in use,
+            # e.g. "big/", "img0..." and "small/" side by side
+            base, calls = self.shared_prefix(prefix, page.objects[0].name)
+            budget -= calls
+            if budget >= 2 * MIN_CHILD_BUDGET:
+                characters, calls = self.next_characters(prefix, base, MAX_SPLIT)
+                budget -= calls
+                if 1 < len(characters) <= MAX_SPLIT:
+                    direct = [obj for obj in page.objects[:1] if obj.name == base]
+                    sample = self.sample_children(direct, [base + char for char in characters], budget, depth)
+                    sample.calls += initial - budget
+                    return sample
+        sample = self.sample_keyspace(prefix, base, page.objects, budget)
+        sample.calls += initial - budget
+        return sample
+
+    def list_directories(self, prefix, max_pages):
+        # Objects directly under the prefix and its child prefixes, if they fit in max_pages pages
+        objects, prefixes = [], []
+        start = None
+        for calls in range(1, max_pages + 1):
+            page = self.list_page(prefix=prefix, start=start, delimiter=DELIMITER)
+            objects.extend(page.objects)
+            prefixes.extend(page.prefixes or [])
+            start = page.next_start_with
+            if not start:
+                return objects, prefixes, True, calls
+        return objects, prefixes, False, max_pages
+
+    def next_characters(self, prefix, base, limit):
+        # Distinct characters that follow the shared prefix, one single-object listing per
+        # character (a skip scan). Stops once more than `limit` are found.
+        characters = []
+        start = base + "\x01"
+        while len(characters) <= limit:
+            page = self.list_page(prefix=prefix, start=start, limit=1)
+            if not page.objects:
+                break
+            char = page.objects[0].name[len(base)]
+            characters.append(char)
+            start = base + chr(ord(char) + 1)
+        return characters, len(characters) + 1
+
+    def sample_children(self, objects, children, budget, depth):
+        # Objects directly under the prefix are exact; child prefixes are a simple random sample
+        # scaled by (all children / sampled children). At least two children are sampled so their
+        # spread gives a variance, and budget the sampled children leave unused (small prefixes
+        # are listed in one call) goes to further children drawn from the same random order.
+        order = self.rng.sample(children, len(children))
+        total = len(children)
+        sampled = min(total, max(2, budget // MIN_CHILD_BUDGET))
+        results = self.sample_each(order[:sampled], budget // sampled, depth)
+        spent = sum(result.calls for result in results)
+        while sampled < total:
+            extra = min(total - sampled, (budget - spent) // MIN_CHILD_BUDGET)
+            if extra < 1:
+                break
+            more = self.sample_each(order[sampled:sampled + extra], (budget - spent) // extra, depth)
+            results.extend(more)
+            spent += sum(result.calls for result in more)
+            sampled += extra
+
+        scale = total / sampled
+        sample = Sample(objects)
+        for result in results:
+            sample.add(result, scale)
+        # Between-children variance of the sampled totals, with the finite population correction
+        if sampled > 1:
+            for field in ("count", "bytes"):
+                values = [getattr(result, field) for result in results]
+                mean = sum(values) / sampled
+                spread = sum((value - mean) ** 2 for value in values) / (sampled - 1)
+                variance = getattr(sample, field + "_variance")
+                setattr(sample, field + "_variance", variance + total * total * (1 - sampled / total) * spread / sampled)
+        sample.exact = sample.exact and sampled == total
+        return sample
+
+    def sample_each(self, children, child_budget, depth):
+        if depth == 0:
+            with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+                return list(executor.map(lambda child: self.sample_prefix(child, child_budget, depth + 1), children))
+        return [self.sample_prefix(child, child_budget, depth + 1) for child in children]
+
+    def shared_prefix(self, prefix, first_name):
+        # Longest prefix of the first name that every object under `prefix` shares: a prefix is
+        # shared when nothing sorts after it with its last character incremented.
+        # Returns (shared prefix, calls).
+        shared, longest = len(prefix), len(first_name)
+        calls = 0
+        while shared < longest:
+            length = (shared + longest + 1) // 2
+            head = first_name[:length]
+            page = self.list_page(prefix=prefix, start=head[:-1] + chr(ord(head[-1]) + 1), limit=1)
+            calls += 1
+            if page.objects:
+                longest = length - 1
+            else:
+                shared = length
+        return first_name[:shared], calls
+
+    def find_last_name(self, prefix, base, names, probes):
+        # Binary search for the last object with single-object listings. A probe that finds
+        # an object jumps the lower bound to that object. Names with characters the keyspace
+        # does not know yet widen the alphabet, otherwise no start key could sort after them.
+        # Returns the keyspace built from every name seen, the last name and the probes listed.
+        keyspace = Keyspace(base, names)
+        last_name = names[-1]
+        low, high = keyspace.position(last_name), 1.0
+        for calls in range(probes):
+            if high - low <= keyspace.resolution:
+                break
+            middle = (low + high) / 2
+            page = self.list_page(prefix=prefix, start=keyspace.key(middle), limit=1)
+            if not page.objects:
+                high = middle
+                continue
+            # Names sharing the first digits map to the same position, so a probe can land before the best name so far
+            last_name = max(last_name, page.objects[0].name)
+            if not set(last_name[len(base):]) <= set(keyspace.alphabet):
+                high_key = keyspace.key(high) if high < 1.0 else None
+                keyspace = Keyspace(base, names + [last_name])
+                high = keyspace.position(high_key) if high_key else 1.0
+            low = max(middle, keyspace.position(last_name))
+        else:
+            calls = probes
+        return Keyspace(base, names + [last_name]), last_name, calls
+
+    def sample_keyspace(self, prefix, base, objects, budget):
+        # The keyspace between the first and last name is split into equal strata and one page is
+        # listed from a random start in each. Where a page runs into the next start its interval is
+        # known exactly; the remainders no page reached are estimated from fixed-width windows
+        # (bounded by `end`) placed at random inside them.
+        names = [obj.name for obj in objects]
+        spent = 0
+        if base is None:
+            base, spent = self.shared_prefix(prefix, names[0])
+            budget -= spent
+        probes = min(20, max(4, budget // 4))
+        keyspace, last_name, calls = self.find_last_name(prefix, base, names, probes)
+        spent += calls
+        pages = max(2, (budget - probes) // 2)
+
+        first = keyspace.position(names[0])
+        last = keyspace.position(last_name)
+        width = max(last - first, keyspace.resolution)
+        end_position = last + keyspace.resolution
+        starts = sorted({keyspace.key(first + width * (stratum + self.rng.random()) / pages) for stratum in range(1, pages)})
+        starts = [names[0]] + [start for start in starts if start > names[0]]
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            listed = list(executor.map(lambda start: self.list_page(prefix=prefix, start=start), starts[1:]))
+        pages_listed = [(objects, True)] + [(page.objects, bool(page.next_start_with)) for page in listed]
+        spent += len(listed)
+
+        # Keep each page's objects up to the next start, and note the part of the interval it did not reach
+        sample = Sample()
+        remainders = []
+        spans = []
+        for index, (page_objects, truncated) in enumerate(pages_listed):
+            upper = starts[index + 1] if index + 1 < len(starts) else None
+            inside = [obj for obj in page_objects if upper is None or obj.name < upper]
+            sample.add(Sample(inside))
+            if truncated and len(inside) == len(page_objects) and page_objects:
+                reached = page_objects[-1].name
+                low = keyspace.position(reached)
+                high = keyspace.position(upper) if upper else end_position
+                spans.append(low - keyspace.position(starts[index]))
+                if high > low:
+                    remainders.append((reached, low, high, upper))
+        sample.calls = spent
+        if not remainders:
+            return sample
+
+        # Windows a typical page wide, placed by stratified sampling over the concatenated remainders
+        measure = sum(high - low for _, low, high, _ in remainders)
+        window_width = sorted(spans)[len(spans) // 2] if spans else measure / pages
+        bounds = []
+        for stratum in range(pages):
+            offset = measure * (stratum + self.rng.random()) / pages
+            for reached, low, high, upper in remainders:
+                if offset < high - low:
+                    start_position = low + offset
+                    window_end = min(start_position + window_width, high)
+                    start = max(keyspace.key(start_position), reached + "\0")
+                    end = upper if window_end >= high and upper else keyspace.key(window_end)
+                    bounds.append((start, end, window_end - start_position))
+                    break
+                offset -= high - low
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            windows = list(executor.map(lambda bound: self.list_page(prefix=prefix, start=bound[0], end=bound[1]), bounds))
+
+        window_objects = []
+        widths = []
+        for (start, end, window_span), page in zip(bounds, windows):
+            if page.next_start_with and page.objects:
+                # More than a page inside the window: shrink it to the part that was listed
+                window_span = max(keyspace.position(page.objects[-1].name) - keyspace.position(start), keyspace.resolution)
+            window_objects.append([obj for obj in page.objects if not end or obj.name < end])
+            widths.append(window_span)
+
+        counts = [len(window) for window in window_objects]
+        sizes = [sum(obj.size or 0 for obj in window) for window in window_objects]
+        estimated = Sample(exact=False)
+        estimated.calls = len(windows)
+        estimated.count, estimated.count_variance = ratio_total(counts, widths, measure)
+        estimated.bytes, estimated.bytes_variance = ratio_total(sizes, widths, measure)
+        weight = measure / sum(widths) if sum(widths) > 0 else 0.0
+        estimated.weighted = [(obj, weight) for window in window_objects for obj in window]
+        sample.add(estimated)
+        return sample
+
+
+class BucketEstimate:
+    __slots__ = ("bucket_name", "exact", "sampled_objects", "object_count", "object_count_error",
+                 "total_bytes", "total_bytes_error", "size_histogram", "age_histogram", "tier_mix", "api_calls")
+
+    def as_dict(self):
+        return {name: getattr(self, name) for name in self.__slots__}
+
+
+def distribution(weighted, label_of, labels=None):
+    # Weighted share of each label with a 95% margin from the Kish effective sample size
+    total = sum(weight for _, weight in weighted)
+    effective = total * total / sum(weight * weight for _, weight in weighted) if weighted else 0
+    sums = {}
+    for obj, weight in weighted:
+        label = label_of(obj)
+        sums[label] = sums.get(label, 0.0) + weight
+    result = {}
+    for label in labels or sorted(sums):
+        share = sums.get(label, 0.0) / total if total else 0.0
+        error = Z_95 * math.sqrt(share * (1 - share) / effective) if effective else 0.0
+        result[label] = {"share": round(share, 4), "error": round(error, 4)}
+    return result
+
+
+def estimate_bucket(object_storage_client, namespace, bucket_name, budget=200, page_size=1000, max_workers=8, seed=None):
+    # Approximate object count, total bytes, size/age histograms and storage tier mix of a bucket
+    # from at most about `budget` list calls
+    sampler = BucketSampler(object_storage_client, namespace, bucket_name, page_size, max_workers, seed)
+    sample = sampler.sample_prefix("", budget)
+    now = datetime.datetime.now(datetime.timezone.utc)
+
+    estimate = BucketEstimate()
+    estimate.bucket_name = bucket_name
+    estimate.exact = sample.exact
+    estimate.sampled_objects = len(sample.weighted)
+    estimate.object_count = max(round(sample.count), len(sample.weighted))
+    estimate.object_count_error = round(Z_95 * math.sqrt(sample.count_variance))
+    estimate.total_bytes = round(sample.bytes)
+    estimate.total_bytes_error = round(Z_95 * math.sqrt(sample.bytes_variance))
+    estimate.size_histogram = distribution(sample.weighted, lambda obj: classify(obj.size or 0, SIZE_BUCKETS),
+                                           [label for label, _ in SIZE_BUCKETS])
+    estimate.age_histogram = distribution(
+        sample.weighted, lambda obj: classify((now - obj.time_created).days if obj.time_created else 0, AGE_BUCKETS),
+        [label for label, _ in AGE_BUCKETS]
+    )
+    estimate.tier_mix = distribution(sample.weighted, lambda obj: obj.storage_tier or "Standard")
+    estimate.api_calls = sampler.calls
+    return estimate
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Estimate object count, size and age distribution of a bucket by sampling")
+    parser.add_argument("bucket", nargs="+")
+    parser.add_argument("--budget", type=int, default=200, help="Approximate list calls per bucket")
+    parser.add_argument("--page-size", type=int, default=1000)
+    parser.add_argument("--seed", type=int)
+    args = parser.parse_args()
+
+    config = oci.config.from_file()
+    object_storage_client = oci.object_storage.ObjectStorageClient(config)
+    namespace = object_storage_client.get_namespace().data
+    for bucket_name in args.bucket:
+        estimate = estimate_bucket(object_storage_client, namespace, bucket_name, args.budget, args.page_size, seed=args.seed)
+        print(f"Bucket {bucket_name}: ~{estimate.object_count} objects (+/- {estimate.object_count_error}), "
+              f"~{estimate.total_bytes / 1024 ** 3:.2f} GB (+/- {estimate.total_bytes_error / 1024 ** 3:.2f}), "
+              f"{estimate.sampled_objects} objects sampled with {estimate.api_calls} calls")
+        for field in ("size_histogram", "age_histogram", "tier_mix"):
+            shares = ", ".join(f"{label}: {value['share']:.1%} +/- {value['error']:.1%}"
+                               for label, value in getattr(estimate, field).items())
+            print(f"  {field.replace('_', ' ').title()}: {shares}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import oci
+
+# Size and count are only returned when asked for explicitly
+BUCKET_FIELDS = ["approximateSize", "approximateCount"]
+DEFAULT_CACHE_PATH = "bucket_details.json"
+CACHE_MAX_AGE = 3600  # Seconds a cached bucket stays valid after it was fetched
+
+
+def bucket_row(bucket):
+    # Everything the collectors read from get_bucket, as a JSON friendly row
+    return {
+        "name": bucket.name,
+        "compartment_id": bucket.compartment_id,
+        "approximate_size": bucket.approximate_size,
+        "approximate_count": bucket.approximate_count,
+        "public_access_type": bucket.public_access_type,
+        "storage_tier": bucket.storage_tier,
+        "time_created": bucket.time_created.isoformat() if bucket.time_created else None
+    }
+
+
+def bucket_key(region, namespace, bucket_name):
+    # Bucket names are only unique within a namespace and region
+    return f"{region}/{namespace}/{bucket_name}"
+
+
+class BucketCache:
+    # One get_bucket call per bucket for the whole run, fetched on a shared thread pool.
+    # Concurrent requests for the same bucket wait on the same call instead of repeating it.
+    # The cache file holds buckets of every region and namespace it has seen, keyed by all three,
+    # each stamped with its own fetch time so a run in one region does not keep another's fresh.
+    # Failed reads are only remembered for the run and never written to the file.
+
+    def __init__(self, object_storage_client, namespace, region, path=DEFAULT_CACHE_PATH, max_age=CACHE_MAX_AGE, max_workers=8):
+        self.client = object_storage_client
+        self.namespace = namespace
+        self.region = region
+        self.path = path
+        self.details = {}  # bucket_key -> row, for the buckets that were read
+        self.fetched = {}  # bucket_key -> time the row was fetched, in epoch seconds
+        self._pending = {}
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=max_workers)
+        if path and os.path.exists(path):
+            with open(path) as file:
+                cached = json.load(file)
+            # Files from before entries carried a fetch time have nothing that can be dated, and are not reused
+            now = time.time()
+            for key, fetched in cached.get("fetched", {}).items():
+                row = cached["buckets"].get(key)
+                if row is not None and now - fetched < max_age:
+                    self.details[key] = row
+                    self.fetched[key] = fetched
+
+    def key(self, bucket_name):
+        return bucket_key(self.region, self.namespace, bucket_name)
+
+    def __contains__(self, bucket_name):
+        return self.key(bucket_name) in self.details
+
+    def peek(self, bucket_name):
+        # The cached row, without fetching a bucket that is not cached
+        return self.details.get(self.key(bucket_name))
+
+    def _fetch(self, bucket_name):
+        # A failed read resolves to None through its pending future, so it is not repeated this run
+        # but is not cached either, and the next run tries the bucket again
+        try:
+            bucket = self.client.get_bucket(self.namespace, bucket_name, fields=BUCKET_FIELDS).data
+        except oci.exceptions.ServiceError as e:
+            print(f"Could not read bucket {bucket_name}: {e.message}")
+            return None
+        row = bucket_row(bucket)
+        key = self.key(bucket_name)
+        self.details[key] = row
+        self.fetched[key] = time.time()
+        return row
+
+    def _submit(self, bucket_name):
+        with self._lock:
+            future = self._pending.get(bucket_name)
+            if future is None:
+                future = self._pending[bucket_name] = self._executor.submit(self._fetch, bucket_name)
+        return future
+
+    def prefetch(self, bucket_names):
+        # Start fetching every bucket that is not cached yet without waiting for the results
+        for bucket_name in bucket_names:
+            if bucket_name not in self:
+                self._submit(bucket_name)
+
+    def get(self, bucket_name):
+        if bucket_name in self:
+            return self.peek(bucket_name)
+        return self._submit(bucket_name).result()
+
+    def save(self):
+        if self.path:
+            with open(self.path, "w") as file:
+                json.dump({"buckets": self.details, "fetched": self.fetched}, file, indent=4)
+
+    def close(self):
+        self._executor.shutdown(wait=True)
+        self.save()
@@ -0,0 +1,88 @@
+import threading
+
+from OCI_Common.pagination import MAX_LIMIT
+
+CORE = "core"
+
+
+def listing_calls(items):
+    # Requests a listing takes: one per page of MAX_LIMIT items, and one when it is empty
+    return max(1, -(-len(items) // MAX_LIMIT))
+
+
+def request_calls(request, result):
+    # Requests made for one call yielded by a scan (OCI_Common/calls.py), judged by its result
+    if request.paginated and isinstance(result, list):
+        return listing_calls(result)
+    return 1
+
+
+class CallBudget:
+    # API calls of one run, per service and stage, against an optional limit. Work is claimed
+    # before it is sent, one call per request, and settled with the pages it really took.
+    # Optional stages are named in the order they are given up: once one is refused, it and every
+    # stage before it stay off for the rest of the run. The reserve keeps calls back for core
+    # work still to come, so optional stages cannot spend what the core listings need.
+
+    def __init__(self, limit=None, stages=()):
+        self.limit = limit
+        self.stages = list(stages)
+        self.spent = 0
+        self.reserve = 0
+        self.calls = {}  # (service, stage) -> calls
+        self.dropped = -1  # Position of the last stage given up
+        self.skipped = {}  # stage -> claims refused
+        self._lock = threading.Lock()
+
+    def claim_core(self, calls):
+        # Core work only stops at the limit itself, and draws on the reserve kept for it. Once core
+        # work is refused, every optional stage is given up too: the calls left cannot go to
+        # enrichment while whole compartments go unlisted.
+        with self._lock:
+            if self.limit is not None and self.spent + calls > self.limit:
+                self.skipped[CORE] = self.skipped.get(CORE, 0) + 1
+                if self.dropped < len(self.stages) - 1:
+                    self.dropped = len(self.stages) - 1
+                    print(f"Call budget: {self.spent} of {self.limit} calls spent; skipping the remaining compartments "
+                          f"and {', '.join(self.stages)}")
+                return False
+            self.reserve = max(0, self.reserve - calls)
+            self.spent += calls
+            return True
+
+    def claim(self, stage, calls):
+        if not calls:
+            return True
+        with self._lock:
+            position = self.stages.index(stage)
+            if position > self.dropped and (self.limit is None or self.spent + calls + self.reserve <= self.limit):
+                self.spent += calls
+                return True
+            if position > self.dropped:
+                self.dropped = position
+                print(f"Call budget: {self.spent} of {self.limit} calls spent; skipping {', '.join(self.stages[:position + 1])} from now on")
+            self.skipped[stage] = self.skipped.get(stage, 0) + 1
+            return False
+
+    def settle(self, service, stage, claimed, calls):
+        with self._lock:
+            self.spent += calls - claimed
+            self.calls[(service, stage)] = self.calls.get((service, stage), 0) + calls
+
+    def settle_batch(self, stages, requests, results):
+        # A yielded batch that was claimed at one call per request
+        for stage, request, result in zip(stages, requests, results):
+            self.settle(request.client, stage, 1, request_calls(request, result))
+
+    def by_service(self):
+        totals = {}
+        for (service, _), calls in self.calls.items():
+            totals[service] = totals.get(service, 0) + calls
+        return totals
+
+    def summary(self):
+        services = ", ".join(f"{service} {calls}" for service, calls in sorted(self.by_service().items()))
+        lines = [f"API calls: {sum(self.calls.values())} ({services})"]
+        if self.skipped:
+            lines.append("Skipped for the call budget: " + ", ".join(f"{stage} x{count}" for stage, count in self.skipped.items()))
+        return lines
@@ -0,0 +1,84 @@
+import oci
+
+from OCI_Common.pagination import paginate
+
+# A scan is a generator that yields the SDK calls it needs and receives their results:
+#
+#     volumes = yield listing("blockstorage", "list_volumes", compartment_id=compartment_id)
+#     vnics = yield [call("network", "get_vnic", vnic_id) for vnic_id in vnic_ids]
+#
+# Calls name the client by key, so the same scan runs on the synchronous SDK clients (run_scan)
+# or on the asyncio backend in OCI_Common/async_client.py. A failed call is raised inside the
+# scan at the yield, so scans handle service errors with an ordinary try/except; a call marked
+# tolerant() instead comes back as its ServiceError, so one failure does not sink a whole batch.
+# A listing wrapped in exists() comes back as True or False and stops paging at the first match.
+
+
+class Call:
+    __slots__ = ("client", "operation", "args", "kwargs", "paginated", "tolerant", "match")
+
+    def __init__(self, client, operation, args, kwargs, paginated):
+        self.client = client
+        self.operation = operation
+        self.args = args
+        self.kwargs = kwargs
+        self.paginated = paginated
+        self.tolerant = False
+        self.match = None
+
+    def __repr__(self):
+        return f"{self.client}.{self.operation}"
+
+
+def listing(client, operation, *args, **kwargs):
+    # Every item of a paginated list call, as a list
+    return Call(client, operation, args, kwargs, True)
+
+
+def call(client, operation, *args, **kwargs):
+    # The response data of a single request
+    return Call(client, operation, args, kwargs, False)
+
+
+def tolerant(request):
+    request.tolerant = True
+    return request
+
+
+def exists(request, predicate=None):
+    # Whether any item of a listing matches predicate (any item at all without one)
+    request.match = predicate or (lambda item: True)
+    return request
+
+
+def resolve(clients, request):
+    operation = getattr(clients[request.client], request.operation)
+    try:
+        if request.match is not None:
+            return any(request.match(item) for item in paginate(operation, *request.args, **request.kwargs))
+        if request.paginated:
+            return list(paginate(operation, *request.args, **request.kwargs))
+        return operation(*request.args, **request.kwargs).data
+    except oci.exceptions.ServiceError as e:
+        if request.tolerant:
+            return e
+        raise
+
+
+def run_scan(scan, clients, *args):
+    # Drive a scan with the synchronous SDK clients; a yielded list of calls is answered in order
+    steps = scan(*args)
+    value, error = None, None
+    while True:
+        try:
+            request = steps.throw(error) if error is not None else steps.send(value)
+        except StopIteration as stop:
+            return stop.value
+        try:
+            if isinstance(request, list):
+                value = [resolve(clients, item) for item in request]
+            else:
+                value = resolve(clients, request)
+            error = None
+        except oci.exceptions.ServiceError as e:
+            value, error = None, e
@@ -0,0 +1,20 @@
+import threading
+
+# SDK clients shared by everything in one process. A collector run on its own builds each client
+# once either way; under the collector daemon, the next run of any collector gets the same client
+# back, with its signer and open connections, instead of starting cold.
+CONFIG_KEYS = ("tenancy", "user", "fingerprint", "key_file", "region", "security_token_file")
+
+_clients = {}
+_lock = threading.Lock()
+
+
+def get_client(client_class, config, **kwargs):
+    # Clients are told apart by class, the config entries that identify the caller and the
+    # keyword arguments (service_endpoint, ...) they were built with
+    key = (client_class, tuple(config.get(name) for name in CONFIG_KEYS), tuple(sorted(kwargs.items())))
+    with _lock:
+        client = _clients.get(key)
+        if client is None:
+            client = _clients[key] = client_class(config, **kwargs)
+    return client
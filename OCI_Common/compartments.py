@@ -0,0 +1,132 @@
+import json
+import os
+import time
+
+import oci
+
+from OCI_Common.pagination import paginate
+
+ROOT_NAME = "Tenancy Root"
+# Seconds a compartment listing is reused by later calls in the same process. Off for one-shot
+# collectors; the collector daemon turns it on so its collectors share one listing.
+CACHE_TTL = 0
+
+_listings = {}  # tenancy OCID -> (time listed, rows)
+
+
+def fetch_compartments(identity_client, tenancy_id):
+    # Fetch every compartment in the tenancy as plain rows, root included
+    cached = _listings.get(tenancy_id)
+    if CACHE_TTL and cached and time.monotonic() - cached[0] < CACHE_TTL:
+        return [dict(row) for row in cached[1]]
+    compartments = paginate(
+        identity_client.list_compartments,
+        tenancy_id,
+        compartment_id_in_subtree=True,
+        access_level="ANY"
+    )
+
+    rows = [{"id": tenancy_id, "name": ROOT_NAME, "parent_id": None, "lifecycle_state": "ACTIVE"}]
+    for compartment in compartments:
+        rows.append({
+            "id": compartment.id,
+            "name": compartment.name,
+            "parent_id": compartment.compartment_id,
+            "lifecycle_state": compartment.lifecycle_state
+        })
+    if CACHE_TTL:
+        _listings[tenancy_id] = (time.monotonic(), [dict(row) for row in rows])
+    return rows
+
+
+def save_compartments(rows, path):
+    with open(path, "w") as file:
+        json.dump(rows, file, indent=4)
+
+
+def load_compartments(path):
+    with open(path) as file:
+        return json.load(file)
+
+
+def load_or_fetch_compartments(path, config=None, identity_client=None):
+    # Reuse a cached compartment list when present, otherwise fetch and cache it
+    if path and os.path.exists(path):
+        return load_compartments(path)
+
+    config = config or oci.config.from_file()
+    identity_client = identity_client or oci.identity.IdentityClient(config)
+    print("Fetching compartments...")
+    rows = fetch_compartments(identity_client, config["tenancy"])
+    if path:
+        save_compartments(rows, path)
+    return rows
+
+
+class CompartmentTree:
+    def __init__(self, rows):
+        self.root_id = None
+        self.parent = {}
+        self.name = {}
+        self.children = {}  # parent id -> {lowercase child name: child id}
+
+        for row in rows:
+            self.parent[row["id"]] = row.get("parent_id")
+            self.name[row["id"]] = row["name"]
+            if row.get("parent_id") is None:
+                self.root_id = row["id"]
+            else:
+                self.children.setdefault(row["parent_id"], {})[row["name"].lower()] = row["id"]
+
+        self._ancestors = {}
+
+    def __contains__(self, compartment_id):
+        return compartment_id in self.parent
+
+    def ancestors(self, compartment_id):
+        # The compartment itself followed by every parent up to the root
+        cached = self._ancestors.get(compartment_id)
+        if cached is not None:
+            return cached
+
+        chain = []
+        current = compartment_id
+        while current is not None and current not in chain:
+            chain.append(current)
+            current = self.parent.get(current)
+        self._ancestors[compartment_id] = chain
+        return chain
+
+    def is_ancestor(self, ancestor_id, compartment_id):
+        return ancestor_id in self.ancestors(compartment_id)
+
+    def path(self, compartment_id):
+        # Colon separated path from the root, as written in policy statements
+        if compartment_id == self.root_id:
+            return ROOT_NAME
+        names = [self.name.get(c, c) for c in reversed(self.ancestors(compartment_id)) if c != self.root_id]
+        return ":".join(names)
+
+    def resolve(self, path, relative_to=None):
+        # Resolve an OCID or an "A:B:C" path relative to a compartment (root by default)
+        if path in self.parent:
+            return path
+        if path == ROOT_NAME:
+            return self.root_id
+
+        current = relative_to if relative_to in self.parent else self.root_id
+        for part in path.split(":"):
+            current = self.children.get(current, {}).get(part.strip().strip("'\"").lower())
+            if current is None:
+                return None
+        return current
+
+    def subtree(self, compartment_id):
+        # All compartments at or below the given one
+        result = [compartment_id]
+        stack = [compartment_id]
+        while stack:
+            for child in self.children.get(stack.pop(), {}).values():
+                result.append(child)
+                stack.append(child)
+        return result
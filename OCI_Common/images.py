@@ -0,0 +1,108 @@
+import json
+import os
+import re
+import time
+
+import oci
+
+from OCI_Common.pagination import paginate
+
+DEFAULT_CACHE_PATH = "image_catalog.json"
+CACHE_MAX_AGE = 86400  # Platform images are published a few times a month
+
+# Platform image names look like "Oracle-Linux-8.9-aarch64-2024.01.26-0": OS and full version,
+# an optional variant (architecture, GPU, Minimal) that decides which shapes can boot the image,
+# then the build date and number
+BUILD_SUFFIX = re.compile(r"-\d{4}\.\d{2}\.\d{2}-\d+$")
+NAME_AND_VERSION = re.compile(r"^.*?-\d+(\.\d+)*(?=-|$)")
+
+
+def image_family(image):
+    variant = NAME_AND_VERSION.sub("", BUILD_SUFFIX.sub("", image.display_name or ""), count=1)
+    return f"{image.operating_system}|{image.operating_system_version}|{variant.strip('-')}"
+
+
+def image_row(image):
+    return {
+        "id": image.id,
+        "name": image.display_name,
+        "family": image_family(image),
+        # Platform images are not owned by any compartment
+        "platform": image.compartment_id is None,
+        "time_created": image.time_created.isoformat() if image.time_created else None
+    }
+
+
+def load_cache(path, region, max_age=CACHE_MAX_AGE):
+    # The saved catalog of a region, or None when there is none or it is too old. Age is counted
+    # from the listing, since saving lookups would refresh the file time.
+    if not path or not os.path.exists(path):
+        return None
+    with open(path) as file:
+        cached = json.load(file)
+    if cached.get("region") == region and time.time() - cached.get("built_at", 0) < max_age:
+        return cached
+    return None
+
+
+class ImageIndex:
+    # Platform images of one region grouped by family, built from a single paginated
+    # list_images and kept on disk, so "is this the newest image?" is a dictionary lookup.
+    # Images the listing no longer returns (older builds, custom images) are fetched once
+    # per image id, not once per instance.
+
+    def __init__(self, compute_client, tenancy_id, region, path=DEFAULT_CACHE_PATH, max_age=CACHE_MAX_AGE):
+        self.client = compute_client
+        self.tenancy_id = tenancy_id
+        self.region = region
+        self.path = path
+        self.images = {}  # image id -> row, or None when the image could not be read
+        self.latest = {}  # family -> id of the newest platform image
+        self.built_at = None
+        cached = load_cache(path, region, max_age)
+        if cached:
+            self.images.update(cached["images"])
+            self.latest.update(cached["latest"])
+            self.built_at = cached["built_at"]
+        if self.built_at is None:
+            self.build()
+
+    def build(self):
+        self.built_at = time.time()
+        count = 0
+        for image in paginate(self.client.list_images, compartment_id=self.tenancy_id, lifecycle_state="AVAILABLE"):
+            count += 1
+            row = image_row(image)
+            self.images[row["id"]] = row
+            current = self.images.get(self.latest.get(row["family"]))
+            if row["platform"] and (current is None or (row["time_created"] or "") > (current["time_created"] or "")):
+                self.latest[row["family"]] = row["id"]
+        print(f"Indexed {count} images in {len(self.latest)} platform image families")
+
+    def image(self, image_id):
+        if image_id not in self.images:
+            try:
+                self.images[image_id] = image_row(self.client.get_image(image_id).data)
+            except oci.exceptions.ServiceError as e:
+                print(f"Could not read image {image_id}: {e.message}")
+                self.images[image_id] = None
+        return self.images[image_id]
+
+    def newest(self, image_id):
+        # Newest platform image in the same family, or None for custom and unknown images
+        row = self.image(image_id)
+        if not row or not row["platform"]:
+            return None
+        return self.images.get(self.latest.get(row["family"]))
+
+    def is_latest(self, image_id):
+        # True or False for platform images, None when there is nothing to compare against
+        newest = self.newest(image_id)
+        if newest is None:
+            return None
+        return newest["id"] == image_id
+
+    def save(self):
+        if self.path:
+            with open(self.path, "w") as file:
+                json.dump({"region": self.region, "built_at": self.built_at, "images": self.images, "latest": self.latest}, file)
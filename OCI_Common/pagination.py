@@ -0,0 +1,63 @@
+from concurrent.futures import ThreadPoolExecutor
+
+import oci
+
+MAX_LIMIT = 1000  # Largest page most OCI list APIs accept
+
+
+def supports_limit(list_func):
+    # The SDK documents every keyword argument a call accepts
+    return ":param int limit:" in (list_func.__doc__ or "")
+
+
+def page_items(data):
+    # Most list calls return a plain list; newer APIs (Cloud Guard, Optimizer, ...) wrap the page
+    # in a collection with .items, and list_objects returns a ListObjects wrapper
+    if isinstance(data, oci.object_storage.models.ListObjects):
+        return data.objects
+    return data if isinstance(data, list) else data.items
+
+
+def next_request(response, request):
+    # Keyword arguments for the following page, or None after the last one
+    if isinstance(response.data, oci.object_storage.models.ListObjects):
+        return dict(request, start=response.data.next_start_with) if response.data.next_start_with else None
+    return dict(request, page=response.next_page) if response.has_next_page else None
+
+
+def paginate(list_func, *args, limit=MAX_LIMIT, prefetch=True, **kwargs):
+    # Yield the items of a paginated list call as pages arrive, asking for the largest page the
+    # call allows. With prefetch, page N+1 is requested in the background as soon as page N
+    # arrives, so the network wait overlaps with whatever the caller does with page N.
+    # Stopping early (break, any(), next()) discards at most the one page in flight.
+    request = dict(kwargs)
+    if limit and "limit" not in request and supports_limit(list_func):
+        request["limit"] = limit
+
+    def fetch(request):
+        try:
+            return list_func(*args, **request)
+        except oci.exceptions.ServiceError as e:
+            if e.status != 400 or "limit" not in request or "limit" in kwargs:
+                raise
+            # Some services cap pages below MAX_LIMIT; fall back to their default size
+            del request["limit"]
+            return list_func(*args, **request)
+
+    if not prefetch:
+        while request is not None:
+            response = fetch(request)
+            yield from page_items(response.data)
+            request = next_request(response, request)
+        return
+
+    executor = ThreadPoolExecutor(max_workers=1)
+    try:
+        future = executor.submit(fetch, request)
+        while future is not None:
+            response = future.result()
+            request = next_request(response, request)
+            future = executor.submit(fetch, request) if request is not None else None
+            yield from page_items(response.data)
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,61 @@
+import sys
+
+# Compact records for collected resources. A retained SDK model keeps every field of the API
+# response in an instance __dict__, next to its own swagger_types and attribute_map dicts, so a
+# few hundred thousand of them take gigabytes. A record copies out only the fields the collector
+# reports and its rules read, into __slots__. String values that repeat across rows are interned,
+# so every row of a compartment points at one copy of its name and OCID.
+INTERNED_FIELDS = frozenset({
+    "compartment", "compartment_id", "region", "availability_domain", "lifecycle_state",
+    "shape", "shape_name", "db_workload", "bucket_name", "storage_tier"
+})
+
+
+class Record:
+    # Base for the classes made by record_type(). EXPORT maps each output key (JSON field or
+    # sheet column) to the record field it comes from.
+    __slots__ = ()
+    EXPORT = {}
+
+    def __init__(self, model=None, **values):
+        # Fields not given as values are read from the model
+        for field in self.__slots__:
+            value = values[field] if field in values else getattr(model, field, None)
+            if type(value) is str and field in INTERNED_FIELDS:
+                value = sys.intern(value)
+            setattr(self, field, value)
+
+    def get(self, key, default=None):
+        field = self.EXPORT.get(key)
+        return getattr(self, field) if field else default
+
+    def as_dict(self):
+        return {key: getattr(self, field) for key, field in self.EXPORT.items()}
+
+
+_record_types = {}
+
+
+def record_type(resource_type, fields, export=None):
+    # Record class for one resource type, e.g. "Compute Instances" -> ComputeInstancesRecord.
+    # The fields are the export fields followed by any others, without duplicates; classes are
+    # shared by every collector asking for the same layout.
+    export = dict(export or {})
+    fields = tuple(dict.fromkeys(list(export.values()) + list(fields)))
+    key = (resource_type, fields, tuple(export.items()))
+    if key not in _record_types:
+        name = "".join(word.capitalize() for word in resource_type.split()) + "Record"
+        _record_types[key] = type(name, (Record,), {"__slots__": fields, "EXPORT": export})
+    return _record_types[key]
+
+
+ObjectRecord = record_type(
+    "Bucket Objects", (), {"bucket_name": "bucket_name", "object_name": "object_name"}
+)
+
+
+def to_json(value):
+    # default= hook for json.dump, so records are expanded one at a time as the file is written
+    if hasattr(value, "as_dict"):
+        return value.as_dict()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
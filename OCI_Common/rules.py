@@ -0,0 +1,204 @@
+import json
+import os
+import re
+
+import numpy as np
+import pandas as pd
+
+from OCI_Common.records import record_type
+
+DEFAULT_RULES_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "best_practice_rules.json")
+SEVERITIES = ["CRITICAL", "HIGH", "MEDIUM", "LOW", "INFO"]
+DEFAULT_RECOMMENDATION = "Refer to OCI best practices."
+FINDING_COLUMNS = ["Rule ID", "Severity", "Compartment", "Resource Type", "Resource Name", "Resource ID", "Issue", "Recommendation"]
+
+PLACEHOLDER = re.compile(r"\{([\w.]+)\}")
+
+
+def _startswith(series, value):
+    prefixes = tuple(value) if isinstance(value, list) else value
+    return series.str.startswith(prefixes, na=False)
+
+
+def _compare(operator):
+    return lambda series, value: operator(pd.to_numeric(series, errors="coerce"), value).fillna(False)
+
+
+# Every operator maps a whole column to a boolean mask in one call
+OPERATORS = {
+    "eq": lambda series, value: series.to_numpy() == value,
+    "ne": lambda series, value: series.to_numpy() != value,
+    "in": lambda series, value: series.isin(value),
+    "not_in": lambda series, value: ~series.isin(value),
+    "startswith": _startswith,
+    "not_startswith": lambda series, value: ~_startswith(series, value),
+    "contains": lambda series, value: series.map(lambda item: bool(item) and value in item),
+    "not_contains": lambda series, value: series.map(lambda item: not item or value not in item),
+    "missing": lambda series, value: series.isna() == bool(value),
+    "empty": lambda series, value: series.map(lambda item: not item) == bool(value),
+    "is_true": lambda series, value: series.map(bool),
+    "is_false": lambda series, value: series.map(lambda item: not item),
+    "lt": _compare(lambda left, right: left < right),
+    "le": _compare(lambda left, right: left <= right),
+    "gt": _compare(lambda left, right: left > right),
+    "ge": _compare(lambda left, right: left >= right),
+}
+
+
+class RuleError(ValueError):
+    pass
+
+
+def load_rules(path=DEFAULT_RULES_PATH, profile=None):
+    # Rules without "profiles" apply to every collector; the others only to the listed ones
+    with open(path) as file:
+        rules = json.load(file)["rules"]
+    seen = set()
+    for rule in rules:
+        for key in ("id", "resource_type", "severity", "message"):
+            if key not in rule:
+                raise RuleError(f"Rule {rule.get('id', '?')} is missing '{key}'")
+        if rule["id"] in seen:
+            raise RuleError(f"Duplicate rule id {rule['id']}")
+        seen.add(rule["id"])
+        if rule["severity"] not in SEVERITIES:
+            raise RuleError(f"Rule {rule['id']} has unknown severity {rule['severity']}")
+        for condition in rule.get("where", []) + rule.get("any", []):
+            if condition.get("op") not in OPERATORS:
+                raise RuleError(f"Rule {rule['id']} uses unknown operator {condition.get('op')}")
+    return [rule for rule in rules if profile is None or "profiles" not in rule or profile in rule["profiles"]]
+
+
+def rule_fields(rules, resource_type):
+    # Top-level fields read by the rules for one resource type, in conditions and messages,
+    # after the ones every finding reports
+    fields = ["display_name", "name", "id", "compartment"]
+    for rule in rules:
+        if rule["resource_type"] != resource_type:
+            continue
+        paths = [condition["field"] for condition in rule.get("where", []) + rule.get("any", [])]
+        paths += PLACEHOLDER.findall(rule["message"])
+        fields.extend(path.split(".")[0] for path in paths)
+    return list(dict.fromkeys(fields))
+
+
+def resolve(item, path):
+    # Follow a dotted path through SDK models (attributes) and dicts (keys)
+    for part in path.split("."):
+        if item is None:
+            return None
+        item = item.get(part) if isinstance(item, dict) else getattr(item, part, None)
+    return item
+
+
+class ResourceTable:
+    # Records of one resource type as collected by discovery (see ResourceTables.record).
+    # Each field a rule needs is extracted once as a column.
+
+    def __init__(self):
+        self.rows = []
+        self.columns = {}
+        self.masks = {}  # (field, op, value) -> mask, shared by rules with the same condition
+
+    def __len__(self):
+        return len(self.rows)
+
+    def add(self, record):
+        self.extend([record])
+
+    def extend(self, records):
+        self.rows.extend(records)
+        self.columns.clear()
+        self.masks.clear()
+
+    def column(self, path):
+        if path not in self.columns:
+            self.columns[path] = pd.Series([resolve(row, path) for row in self.rows], dtype=object)
+        return self.columns[path]
+
+    def mask(self, condition):
+        key = (condition["field"], condition["op"], json.dumps(condition.get("value")))
+        if key not in self.masks:
+            result = OPERATORS[condition["op"]](self.column(condition["field"]), condition.get("value"))
+            self.masks[key] = np.asarray(result, dtype=bool)
+        return self.masks[key]
+
+
+class ResourceTables(dict):
+    # ResourceTable per resource type. Records for a type keep its export fields (output key ->
+    # model field) and the fields the loaded rules read, so no SDK model outlives its listing.
+
+    def __init__(self, rules, export_fields):
+        super().__init__()
+        self.rules = rules
+        self.export_fields = export_fields
+        self.record_types = {}
+
+    def __missing__(self, resource_type):
+        table = self[resource_type] = ResourceTable()
+        return table
+
+    def record(self, resource_type, model, compartment, **facts):
+        # Facts gathered by the scan (attachments, cached bucket details, ...) take precedence
+        # over model fields of the same name; facts no rule reads are dropped
+        record_class = self.record_types.get(resource_type)
+        if record_class is None:
+            record_class = self.record_types[resource_type] = record_type(
+                resource_type, rule_fields(self.rules, resource_type),
+                self.export_fields.get(resource_type)
+            )
+        return record_class(model, compartment=compartment, **facts)
+
+
+def rule_mask(rule, table):
+    # All "where" conditions must hold, and at least one "any" condition when there are some
+    mask = np.ones(len(table), dtype=bool)
+    for condition in rule.get("where", []):
+        mask &= table.mask(condition)
+    if rule.get("any"):
+        mask &= np.logical_or.reduce([table.mask(condition) for condition in rule["any"]])
+    return mask
+
+
+def render(template, table, indexes):
+    # Fill a message template for all matched rows, one cached column per placeholder
+    parts = PLACEHOLDER.split(template)  # literal, field, literal, field, ...
+    values = [table.column(field).to_numpy()[indexes] for field in parts[1::2]]
+    messages = []
+    for row in zip(*values) if values else [()] * len(indexes):
+        pieces = [parts[0]]
+        for value, literal in zip(row, parts[2::2]):
+            pieces.append(str(value))
+            pieces.append(literal)
+        messages.append("".join(pieces))
+    return messages
+
+
+def evaluate_rules(rules, tables):
+    # Structured findings for every rule over every collected table, most severe first
+    records = []
+    for rule in sorted(rules, key=lambda rule: SEVERITIES.index(rule["severity"])):
+        table = tables.get(rule["resource_type"])
+        if not table:
+            continue
+        indexes = np.flatnonzero(rule_mask(rule, table))
+        if len(indexes) == 0:
+            continue
+        names = table.column("display_name").to_numpy()[indexes]
+        fallback_names = table.column("name").to_numpy()[indexes]
+        ids = table.column("id").to_numpy()[indexes]
+        compartments = table.column("compartment").to_numpy()[indexes]
+        recommendation = rule.get("recommendation", DEFAULT_RECOMMENDATION)
+        for name, fallback_name, resource_id, compartment, message in zip(
+                names, fallback_names, ids, compartments, render(rule["message"], table, indexes)):
+            records.append({
+                "Rule ID": rule["id"],
+                "Severity": rule["severity"],
+                "Compartment": compartment,
+                "Resource Type": rule["resource_type"],
+                "Resource Name": name or fallback_name,
+                "Resource ID": resource_id,
+                "Issue": message,
+                "Recommendation": recommendation
+            })
+    return records
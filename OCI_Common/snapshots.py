@@ -0,0 +1,343 @@
+import csv
+import json
+import os
+import re
+
+import numpy as np
+import openpyxl
+
+CHUNK_SIZE = 1 << 22  # Bytes read at a time
+NON_WHITESPACE = re.compile(r"\S")
+SEPARATOR = re.compile(r"\s*,\s*")
+
+
+class JsonStream:
+    # Incremental reader for one large JSON document. Objects and arrays are walked a token at
+    # a time while each leaf value (a resource record, say) is decoded whole by the C decoder,
+    # so memory stays at about one chunk whatever the file size. The file is read as bytes and
+    # decoded one byte per character, so every value also has its byte offset in the file.
+
+    def __init__(self, file, chunk_size=CHUNK_SIZE):
+        self.file = file
+        self.chunk_size = chunk_size
+        self.buffer = ""
+        self.pos = 0
+        self.offset = 0  # File offset of buffer[0]
+        self.ascii = True
+        self.eof = False
+        self.decoder = json.JSONDecoder()
+
+    def _fill(self):
+        chunk = self.file.read(self.chunk_size)
+        if not chunk:
+            self.eof = True
+            return False
+        # Until a non-ASCII byte turns up, the one-byte decoding is the real text
+        self.ascii = self.ascii and chunk.isascii()
+        self.offset += self.pos
+        self.buffer = self.buffer[self.pos:] + chunk.decode("latin-1")
+        self.pos = 0
+        return True
+
+    def peek(self):
+        while True:
+            match = NON_WHITESPACE.search(self.buffer, self.pos)
+            if match:
+                self.pos = match.start()
+                return self.buffer[self.pos]
+            self.pos = len(self.buffer)
+            if not self._fill():
+                raise ValueError("Unexpected end of JSON document")
+
+    def take(self, char):
+        if self.peek() != char:
+            raise ValueError(f"Expected '{char}' but found '{self.buffer[self.pos]}' at byte {self.offset + self.pos}")
+        self.pos += 1
+
+    def raw(self):
+        # The next value with its source text and the byte offset of that text
+        start = self.peek()
+        while True:
+            try:
+                value, end = self.decoder.raw_decode(self.buffer, self.pos)
+            except json.JSONDecodeError:
+                # The value runs past the end of the buffer
+                if not self._fill():
+                    raise
+                continue
+            # A number or literal that ends with the buffer may continue in the next chunk
+            if end == len(self.buffer) and start not in '{["' and self._fill():
+                continue
+            text = self.buffer[self.pos:end]
+            offset = self.offset + self.pos
+            self.pos = end
+            if not self.ascii:
+                value = json.loads(text.encode("latin-1"))
+            return value, text, offset
+
+    def value(self):
+        return self.raw()[0]
+
+    def members(self):
+        # Keys of an object; the caller reads or skips each value before asking for the next key
+        self.take("{")
+        if self.peek() == "}":
+            self.pos += 1
+            return
+        while True:
+            key = self.value()
+            self.take(":")
+            yield key
+            if self.peek() == ",":
+                self.pos += 1
+                continue
+            self.take("}")
+            return
+
+    def elements(self):
+        # Positions of an array's elements; the caller reads or skips each one
+        self.take("[")
+        if self.peek() == "]":
+            self.pos += 1
+            return
+        while True:
+            yield
+            if self.peek() == ",":
+                self.pos += 1
+                continue
+            self.take("]")
+            return
+
+    def values(self):
+        # (value, text, offset) for each element of an array. This is the hot loop of a snapshot
+        # read, so elements are decoded straight from the buffer, and only an element that
+        # reaches the end of the buffer goes through raw(), which reads more of the file.
+        decode = self.decoder.raw_decode
+        separator = SEPARATOR.match
+        self.take("[")
+        if self.peek() == "]":
+            self.pos += 1
+            return
+        while True:
+            buffer, pos = self.buffer, self.pos
+            try:
+                value, end = decode(buffer, pos)
+                complete = end < len(buffer)
+            except json.JSONDecodeError:
+                complete = False
+            if complete:
+                text = buffer[pos:end]
+                self.pos = end
+                if not self.ascii:
+                    value = json.loads(text.encode("latin-1"))
+                yield value, text, self.offset + pos
+            else:
+                yield self.raw()
+            match = separator(self.buffer, self.pos)
+            if match and match.end() < len(self.buffer):
+                self.pos = match.end()
+                continue
+            if self.peek() == ",":
+                self.pos += 1
+                self.peek()
+                continue
+            self.take("]")
+            return
+
+    def _pretty_spans(self):
+        # Elements of a pretty-printed array of objects (json.dump with indent, as the collectors
+        # write), found in the whole buffer at once. JSON strings cannot hold a raw newline, so a
+        # newline, the element's indent and "}" only occur where an element at that depth ends.
+        # Yields the complete elements in the buffer and stops after the last one.
+        buffer, pos = self.buffer, self.pos
+        line_start = buffer.rfind("\n", 0, pos) + 1
+        indent = pos - line_start
+        if not line_start or buffer.count(" ", line_start, pos) != indent or not buffer.startswith("{\n", pos):
+            return
+        data = np.frombuffer(buffer.encode("latin-1"), dtype=np.uint8)
+        ends = np.flatnonzero(data[pos:] == ord("}")) + pos
+        ends = ends[ends - indent - 1 >= pos]
+        found = data[ends - indent - 1] == ord("\n")
+        for column in range(1, indent + 1):
+            found &= data[ends - column] == ord(" ")
+        ends = ends[found] + 1
+        # The next element must follow as ",", a newline, the same indent and "{" plus a newline
+        starts = ends + 2 + indent
+        follows = starts + 1 < len(data)
+        ends, starts = ends[follows], starts[follows]
+        follows = (data[ends] == ord(",")) & (data[ends + 1] == ord("\n")) & (data[starts] == ord("{")) & (data[starts + 1] == ord("\n"))
+        for column in range(1, indent + 1):
+            follows &= data[starts - column] == ord(" ")
+        # Elements are taken up to the first end that is not followed by another element
+        count = int(np.argmin(follows)) if not follows.all() else len(follows)
+        if count < len(ends):
+            count += 1
+        starts = [pos] + starts[:count - 1].tolist()
+        ends = ends[:count].tolist()
+        offset = self.offset
+        for start, end in zip(starts, ends):
+            yield buffer[start:end], offset + start
+        if ends:
+            self.pos = ends[-1]
+
+    def spans(self):
+        # (text, offset) for each element of an array, without decoding pretty-printed ones
+        self.take("[")
+        if self.peek() == "]":
+            self.pos += 1
+            return
+        while True:
+            yielded = False
+            for span in self._pretty_spans():
+                yielded = True
+                yield span
+            if not yielded:
+                _, text, offset = self.raw()
+                yield text, offset
+            if self.peek() == ",":
+                self.pos += 1
+                self.peek()
+                continue
+            self.take("]")
+            return
+
+    def skip(self):
+        char = self.peek()
+        if char == "{":
+            for _ in self.members():
+                self.skip()
+        elif char == "[":
+            for _ in self.elements():
+                self.value()
+        else:
+            self.value()
+
+
+def iter_json_records(path):
+    # (compartment, resource type, record, text, offset) for every resource and finding in an
+    # oci_resources.json; text is the record's JSON as written and offset its position in the file
+    with open(path, "rb") as file:
+        stream = JsonStream(file)
+        for section in stream.members():
+            if section == "resources":
+                for compartment in stream.members():
+                    for resource_type in stream.members():
+                        for record, text, offset in stream.values():
+                            yield compartment, resource_type, record, text, offset
+            elif section == "findings":
+                for compartment in stream.members():
+                    for record, text, offset in stream.values():
+                        yield compartment, "Findings", record, text, offset
+            else:
+                stream.skip()
+
+
+def iter_json_spans(path):
+    # (compartment, resource type, text, offset) for every record of an oci_resources.json,
+    # without decoding the records; text is the record's JSON as written, one character per byte
+    with open(path, "rb") as file:
+        stream = JsonStream(file)
+        for section in stream.members():
+            if section == "resources":
+                for compartment in stream.members():
+                    for resource_type in stream.members():
+                        for text, offset in stream.spans():
+                            yield compartment, resource_type, text, offset
+            elif section == "findings":
+                for compartment in stream.members():
+                    for text, offset in stream.spans():
+                        yield compartment, "Findings", text, offset
+            else:
+                stream.skip()
+
+
+def skipped_compartments(path):
+    # Compartments a collector run skipped when its call budget ran out. The run has no records for
+    # them, which does not mean their resources are gone. The collector writes the list ahead of
+    # the resources, so only the start of a JSON run is read.
+    if path.lower().endswith(".xlsx"):
+        workbook = openpyxl.load_workbook(path, read_only=True)
+        try:
+            if "Skipped Compartments" not in workbook.sheetnames:
+                return set()
+            rows = workbook["Skipped Compartments"].iter_rows(min_row=2, values_only=True)
+            return {row[0] for row in rows if row and row[0]}
+        finally:
+            workbook.close()
+    with open(path, "rb") as file:
+        stream = JsonStream(file)
+        for section in stream.members():
+            if section != "skipped_compartments":
+                return set()
+            return {stream.value() for _ in stream.elements()}
+    return set()
+
+
+def iter_json_snapshot(path):
+    for compartment, resource_type, record, _, _ in iter_json_records(path):
+        yield compartment, resource_type, record
+
+
+def read_record(file, offset, length):
+    # One record back out of a JSON snapshot, by the offset and length its span was read at.
+    # A positioned read, since mapping the file would pull whole page-cache folios in per record.
+    return json.loads(os.pread(file.fileno(), length, offset))
+
+
+def iter_json_rows(path, resource_type):
+    # (compartment, resource type, record) for a JSON list of rows that each name their
+    # compartment, as vcn_details.json and cloud_guard_problems.json are written
+    with open(path) as file:
+        rows = json.load(file)
+    for row in rows:
+        row = dict(row)
+        yield row.pop("compartment", None), resource_type, row
+
+
+def record_ocid(record):
+    # The OCID a record describes: its id, or the first *_ocid field that holds one
+    for field, value in record.items():
+        if (field == "id" or field.endswith("_ocid")) and isinstance(value, str) and value.startswith("ocid1."):
+            return value
+    return None
+
+
+def field_name(header):
+    # "Volume OCID" -> "volume_ocid", "ID" -> "id"
+    return re.sub(r"\W+", "_", str(header).strip()).strip("_").lower()
+
+
+def iter_xlsx_snapshot(path, all_sheets=False):
+    # (compartment, sheet name, record) for every row of the sheets that have a Compartment column.
+    # With all_sheets, tenancy-wide sheets without one (IAM users, say) are read too, with no compartment.
+    workbook = openpyxl.load_workbook(path, read_only=True)
+    try:
+        for sheet in workbook.worksheets:
+            rows = sheet.iter_rows(values_only=True)
+            header = next(rows, None)
+            if not header or ("Compartment" not in header and not all_sheets):
+                continue
+            compartment_column = header.index("Compartment") if "Compartment" in header else None
+            fields = [(position, field_name(name)) for position, name in enumerate(header)
+                      if name is not None and position != compartment_column]
+            for row in rows:
+                compartment = row[compartment_column] if compartment_column is not None else None
+                if compartment is None and (compartment_column is not None or not any(row)):
+                    continue
+                yield compartment, sheet.title, {field: row[position] for position, field in fields}
+    finally:
+        workbook.close()
+
+
+def iter_csv_snapshot(path, resource_type):
+    # (compartment, resource type, record) for every row of a CSV report with a Compartment column
+    with open(path, newline="") as file:
+        for row in csv.DictReader(file):
+            compartment = row.pop("Compartment", None)
+            yield compartment, resource_type, {field_name(header): value for header, value in row.items()}
+
+
+def iter_snapshot(path):
+    if path.lower().endswith(".xlsx"):
+        return iter_xlsx_snapshot(path)
+    return iter_json_snapshot(path)
@@ -0,0 +1,298 @@
+import os
+import re
+from array import array
+
+import numpy as np
+
+from OCI_Common.snapshots import record_ocid
+
+# Inverted index of the tags on every collected resource. Each tag term maps to a posting list,
+# the sorted positions of the resources carrying it:
+#
+#     Namespace.Key          the defined tag, whatever its value
+#     Namespace.Key=Value    the defined tag with that value
+#     Key, Key=Value         the same for free-form tags
+#
+# Queries combine terms with AND, OR, NOT and parentheses, and every posting list involved
+# becomes one boolean mask over all resources, so a query or a compliance scan over a few
+# hundred thousand resources is a handful of numpy operations.
+
+TOKEN_PATTERN = re.compile(
+    r"""\s*(\(|\)|'[^']*'|"[^"]*"|[^\s()='"]+(?:=(?:'[^']*'|"[^"]*"|[^\s()]*))?)"""
+)
+OPERATORS = ("AND", "OR", "NOT")
+
+
+class TagQueryError(ValueError):
+    pass
+
+
+def tag_terms(record):
+    # "Namespace.Key" and "Namespace.Key=Value" for defined tags, "Key" and "Key=Value" for free-form ones
+    terms = []
+    defined_tags = record.get("defined_tags")
+    if isinstance(defined_tags, dict):
+        for namespace, tags in defined_tags.items():
+            for key, value in (tags or {}).items():
+                terms += [f"{namespace}.{key}", f"{namespace}.{key}={value}"]
+    freeform_tags = record.get("freeform_tags")
+    if isinstance(freeform_tags, dict):
+        for key, value in freeform_tags.items():
+            terms += [key, f"{key}={value}"]
+    return terms
+
+
+def is_taggable(record):
+    # Only records exported with their tags are indexed; a record without the fields (a bucket
+    # object, a finding) says nothing about whether the resource is tagged
+    return "defined_tags" in record or "freeform_tags" in record
+
+
+def record_name(record):
+    return record.get("name") or record.get("display_name") or record.get("vcn_name") or record.get("resource_name")
+
+
+def index_path(inventory_path):
+    # oci_resources.json -> oci_resources.tags.npz, next to the inventory it indexes
+    return os.path.splitext(inventory_path)[0] + ".tags.npz"
+
+
+def _pack(values):
+    # Strings as one NUL separated UTF-8 buffer, so the index file needs no pickling
+    return np.frombuffer("\0".join(value or "" for value in values).encode("utf-8"), dtype=np.uint8)
+
+
+def _unpack(buffer, count):
+    values = buffer.tobytes().decode("utf-8").split("\0") if count else []
+    return [value or None for value in values]
+
+
+class Term:
+    __slots__ = ("term",)
+
+    def __init__(self, term):
+        self.term = term
+
+    def evaluate(self, index):
+        return index.mask(self.term)
+
+
+class Not:
+    __slots__ = ("child",)
+
+    def __init__(self, child):
+        self.child = child
+
+    def evaluate(self, index):
+        return ~self.child.evaluate(index)
+
+
+class AllOf:
+    __slots__ = ("children",)
+
+    def __init__(self, children):
+        self.children = children
+
+    def evaluate(self, index):
+        mask = self.children[0].evaluate(index)
+        for child in self.children[1:]:
+            mask &= child.evaluate(index)
+        return mask
+
+
+class AnyOf:
+    __slots__ = ("children",)
+
+    def __init__(self, children):
+        self.children = children
+
+    def evaluate(self, index):
+        mask = self.children[0].evaluate(index)
+        for child in self.children[1:]:
+            mask |= child.evaluate(index)
+        return mask
+
+
+def unquote(term):
+    # 'Ops.Owner=alice smith' or Ops.Owner="alice smith" -> Ops.Owner=alice smith
+    if term[0] in "'\"":
+        return term[1:-1]
+    key, equals, value = term.partition("=")
+    if value[:1] in ("'", '"'):
+        value = value[1:-1]
+    return key + equals + value
+
+
+def tokenize(expression):
+    tokens = []
+    position = 0
+    expression = expression.strip()
+    while position < len(expression):
+        match = TOKEN_PATTERN.match(expression, position)
+        if not match:
+            raise TagQueryError(f"Unexpected character at {position} in '{expression}'")
+        tokens.append(match.group(1))
+        position = match.end()
+    return tokens
+
+
+def compile_query(expression):
+    # Compile a tag query such as Ops.CostCenter AND (env=prod OR NOT Ops.Owner)
+    tokens = tokenize(expression)
+    if not tokens:
+        raise TagQueryError("Empty tag query")
+    node, position = _parse_any(tokens, 0)
+    if position != len(tokens):
+        raise TagQueryError(f"Unexpected '{tokens[position]}' in '{expression}'")
+    return node
+
+
+def _keyword(tokens, position):
+    return tokens[position].upper() if position < len(tokens) else None
+
+
+def _parse_any(tokens, position):
+    children = []
+    while True:
+        node, position = _parse_all(tokens, position)
+        children.append(node)
+        if _keyword(tokens, position) != "OR":
+            return (children[0] if len(children) == 1 else AnyOf(children)), position
+        position += 1
+
+
+def _parse_all(tokens, position):
+    children = []
+    while True:
+        node, position = _parse_not(tokens, position)
+        children.append(node)
+        if _keyword(tokens, position) != "AND":
+            return (children[0] if len(children) == 1 else AllOf(children)), position
+        position += 1
+
+
+def _parse_not(tokens, position):
+    if position >= len(tokens):
+        raise TagQueryError("Tag query ends where a tag was expected")
+    token = tokens[position]
+    if token.upper() == "NOT":
+        node, position = _parse_not(tokens, position + 1)
+        return Not(node), position
+    if token == "(":
+        node, position = _parse_any(tokens, position + 1)
+        if position >= len(tokens) or tokens[position] != ")":
+            raise TagQueryError("Missing ')' in tag query")
+        return node, position + 1
+    if token == ")" or token.upper() in OPERATORS:
+        raise TagQueryError(f"Expected a tag, found '{token}'")
+    return Term(unquote(token)), position + 1
+
+
+class TagIndex:
+    # Resources are numbered in the order they were indexed. Per resource the index keeps its
+    # OCID (or name, for buckets), name and integer codes for its resource type and compartment;
+    # per tag term, a sorted uint32 array of resource numbers.
+
+    def __init__(self, ids, names, types, compartments, type_codes, compartment_codes, postings):
+        self.ids = ids
+        self.names = names
+        self.types = types
+        self.compartments = compartments
+        self.type_codes = type_codes
+        self.compartment_codes = compartment_codes
+        self.postings = postings  # term -> positions
+
+    def __len__(self):
+        return len(self.ids)
+
+    @classmethod
+    def from_rows(cls, rows):
+        # rows are (compartment, resource type, record) as the snapshot readers yield them
+        ids, names = [], []
+        types, compartments = {}, {}
+        type_codes, compartment_codes = array("I"), array("I")
+        postings = {}
+        for compartment, resource_type, record in rows:
+            if not is_taggable(record):
+                continue
+            position = len(ids)
+            ids.append(record_ocid(record) or record.get("id") or record_name(record))
+            names.append(record_name(record))
+            type_codes.append(types.setdefault(resource_type, len(types)))
+            compartment_codes.append(compartments.setdefault(compartment, len(compartments)))
+            for term in dict.fromkeys(tag_terms(record)):
+                postings.setdefault(term, array("I")).append(position)
+        return cls(
+            ids, names, list(types), list(compartments),
+            np.frombuffer(type_codes, dtype=np.uint32), np.frombuffer(compartment_codes, dtype=np.uint32),
+            {term: np.frombuffer(positions, dtype=np.uint32) for term, positions in postings.items()}
+        )
+
+    def save(self, path):
+        terms = list(self.postings)
+        offsets = np.zeros(len(terms) + 1, dtype=np.int64)
+        offsets[1:] = np.cumsum([len(self.postings[term]) for term in terms])
+        with open(path + ".tmp", "wb") as file:
+            np.savez(
+                file,
+                counts=np.array([len(self.ids), len(self.types), len(self.compartments), len(terms)], dtype=np.int64),
+                ids=_pack(self.ids), names=_pack(self.names),
+                types=_pack(self.types), compartments=_pack(self.compartments),
+                type_codes=self.type_codes, compartment_codes=self.compartment_codes,
+                terms=_pack(terms), offsets=offsets,
+                positions=np.concatenate([self.postings[term] for term in terms]) if terms else np.zeros(0, dtype=np.uint32)
+            )
+        os.replace(path + ".tmp", path)
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as data:
+            resources, type_count, compartment_count, term_count = (int(count) for count in data["counts"])
+            offsets, positions = data["offsets"], data["positions"]
+            terms = _unpack(data["terms"], term_count)
+            return cls(
+                _unpack(data["ids"], resources), _unpack(data["names"], resources),
+                _unpack(data["types"], type_count), _unpack(data["compartments"], compartment_count),
+                data["type_codes"], data["compartment_codes"],
+                {term: positions[offsets[number]:offsets[number + 1]] for number, term in enumerate(terms)}
+            )
+
+    def mask(self, term):
+        mask = np.zeros(len(self.ids), dtype=bool)
+        positions = self.postings.get(term)
+        if positions is not None:
+            mask[positions] = True
+        return mask
+
+    def type_mask(self, resource_types):
+        codes = [self.types.index(resource_type) for resource_type in resource_types if resource_type in self.types]
+        return np.isin(self.type_codes, codes)
+
+    def query(self, expression):
+        # Positions of the resources matching a tag query
+        return np.flatnonzero(compile_query(expression).evaluate(self))
+
+    def compliance(self, required, scope=None):
+        # Which resources fail each requirement, a tag query each ("Ops.CostCenter", or
+        # "Ops.Env=prod OR Ops.Env=dev"), among the resources in scope (a mask, default all).
+        # Returns the positions checked and a (resources x requirements) mask of failures.
+        positions = np.flatnonzero(scope) if scope is not None else np.arange(len(self.ids))
+        missing = np.empty((len(positions), len(required)), dtype=bool)
+        for column, expression in enumerate(required):
+            missing[:, column] = ~compile_query(expression).evaluate(self)[positions]
+        return positions, missing
+
+    def compliance_summary(self, positions, missing):
+        # Per compartment: resources checked, resources failing any requirement and failures per
+        # requirement, as one bincount over the compartment codes each
+        codes = self.compartment_codes[positions]
+        size = len(self.compartments)
+        checked = np.bincount(codes, minlength=size)
+        failing = np.bincount(codes, weights=missing.any(axis=1), minlength=size).astype(np.int64)
+        per_requirement = np.stack(
+            [np.bincount(codes, weights=missing[:, column], minlength=size) for column in range(missing.shape[1])], axis=1
+        ).astype(np.int64) if missing.shape[1] else np.zeros((size, 0), dtype=np.int64)
+        return [
+            (self.compartments[code], int(checked[code]), int(failing[code]), per_requirement[code].tolist())
+            for code in np.flatnonzero(checked)
+        ]
@@ -0,0 +1,289 @@
+import argparse
+import csv
+import datetime
+import os
+import sys
+from concurrent.futures import ThreadPoolExecutor
+
+import oci
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from OCI_Common.backups import BackupIndex, fetch_backups
+from OCI_Common.compartments import fetch_compartments
+from OCI_Common.pagination import paginate
+from metric_store import MetricStore
+
+MAX_WORKERS = 16
+AGENT_NAMESPACE = "oci_computeagent"
+DATAPOINT_LIMIT = 100000  # Datapoints Monitoring returns for one query
+STREAM_LIMIT = 2000  # Metric streams (instances, here) one query returns
+
+# (report column, metric, statistic). Every query is grouped by resourceId, so one call
+# returns the series of every instance in the compartment.
+METRICS = [
+    ("CPU Utilization (%)", "CpuUtilization", "mean"),
+    ("Memory Utilization (%)", "MemoryUtilization", "mean"),
+    ("Network Bytes In", "NetworksBytesIn", "sum"),
+    ("Network Bytes Out", "NetworksBytesOut", "sum"),
+]
+
+OLDER_GENERATION_SHAPES = (
+    "VM.Standard1.", "BM.Standard1.", "VM.Standard2.", "BM.Standard2.", "VM.Standard.B1.", "BM.Standard.B1.",
+    "VM.Standard.E2.", "BM.Standard.E2.", "VM.DenseIO1.", "BM.DenseIO1.", "VM.DenseIO2.", "BM.DenseIO2."
+)
+
+
+def list_all(list_func, *args, **kwargs):
+    return list(paginate(list_func, *args, **kwargs))
+
+
+def store_interval(window_minutes):
+    # Interval of the datapoints kept for the metric store: a minute for short windows, coarser for
+    # longer ones so a query returning the most streams stays under the datapoint limit
+    minutes = max(1, -(-window_minutes // (DATAPOINT_LIMIT // STREAM_LIMIT)))
+    if minutes <= 60:
+        return f"{minutes}m"
+    if minutes <= 24 * 60:
+        return f"{-(-minutes // 60)}h"
+    return "1d"
+
+
+def window_interval(window_minutes):
+    # The window as a single Monitoring interval (1m-60m, whole hours up to 24h), or None when
+    # no interval spans it exactly
+    if window_minutes <= 60:
+        return f"{window_minutes}m"
+    if window_minutes % 60 == 0 and window_minutes <= 24 * 60:
+        return f"{window_minutes // 60}h"
+    return None
+
+
+def interval_seconds(interval):
+    return int(interval[:-1]) * {"m": 60, "h": 3600, "d": 86400}[interval[-1]]
+
+
+def metric_query(metric, statistic, interval):
+    return f"{metric}[{interval}].groupBy(resourceId).{statistic}()"
+
+
+def fetch_metric(monitoring_client, compartment_id, metric, statistic, window_minutes, end_time, interval):
+    # Datapoints per resourceId for one (compartment, namespace, metric), one per interval
+    details = oci.monitoring.models.SummarizeMetricsDataDetails(
+        namespace=AGENT_NAMESPACE,
+        query=metric_query(metric, statistic, interval),
+        start_time=end_time - datetime.timedelta(minutes=window_minutes),
+        end_time=end_time,
+        resolution=interval
+    )
+    series = monitoring_client.summarize_metrics_data(compartment_id, details).data
+    points = {}
+    for item in series:
+        resource_id = (item.dimensions or {}).get("resourceId")
+        if resource_id and item.aggregated_datapoints:
+            points[resource_id] = [(point.timestamp, point.value) for point in item.aggregated_datapoints]
+    return points
+
+
+def reduce_points(points, statistic):
+    values = [value for _, value in points]
+    return sum(values) if statistic == "sum" else sum(values) / len(values)
+
+
+def fetch_inventory(clients, compartment_id, availability_domains):
+    # Instance rows for one compartment from bulk listings only: VNIC attachments, private IPs
+    # per subnet, public IPs, boot volume attachments and backups are joined in memory
+    compute_client = clients["compute"]
+    network_client = clients["network"]
+    blockstorage_client = clients["blockstorage"]
+
+    instances = [
+        instance for instance in list_all(compute_client.list_instances, compartment_id=compartment_id)
+        if instance.lifecycle_state not in ("TERMINATING", "TERMINATED")
+    ]
+    if not instances:
+        return []
+
+    vnic_instance = {
+        attachment.vnic_id: attachment.instance_id
+        for attachment in list_all(compute_client.list_vnic_attachments, compartment_id=compartment_id)
+        if attachment.lifecycle_state == "ATTACHED"
+    }
+    private_ips = {}  # instance id -> primary private IP
+    private_ip_instance = {}  # private IP id -> instance id
+    for subnet in list_all(network_client.list_subnets, compartment_id=compartment_id):
+        for private_ip in paginate(network_client.list_private_ips, subnet_id=subnet.id):
+            instance_id = vnic_instance.get(private_ip.vnic_id)
+            if instance_id:
+                private_ip_instance[private_ip.id] = instance_id
+                if private_ip.is_primary or instance_id not in private_ips:
+                    private_ips[instance_id] = private_ip.ip_address
+
+    # Ephemeral public IPs are listed per availability domain, reserved ones for the region
+    public_ip_listings = [list_all(network_client.list_public_ips, scope="REGION", compartment_id=compartment_id)]
+    for availability_domain in availability_domains:
+        public_ip_listings.append(list_all(
+            network_client.list_public_ips, scope="AVAILABILITY_DOMAIN",
+            availability_domain=availability_domain, compartment_id=compartment_id
+        ))
+    public_ips = {}
+    for listing in public_ip_listings:
+        for public_ip in listing:
+            instance_id = private_ip_instance.get(public_ip.private_ip_id or public_ip.assigned_entity_id)
+            if instance_id:
+                public_ips[instance_id] = public_ip.ip_address
+
+    boot_volumes = {}  # instance id -> boot volume
+    for availability_domain in availability_domains:
+        volumes = {
+            volume.id: volume for volume in list_all(
+                blockstorage_client.list_boot_volumes, availability_domain=availability_domain, compartment_id=compartment_id
+            )
+        }
+        for attachment in list_all(compute_client.list_boot_volume_attachments, availability_domain, compartment_id):
+            if attachment.lifecycle_state == "ATTACHED" and attachment.boot_volume_id in volumes:
+                boot_volumes[attachment.instance_id] = volumes[attachment.boot_volume_id]
+    backup_index = BackupIndex(fetch_backups(blockstorage_client, compartment_id))
+
+    rows = []
+    for instance in instances:
+        boot_volume = boot_volumes.get(instance.id)
+        public_ip = public_ips.get(instance.id)
+        rows.append({
+            "Instance Name": instance.display_name,
+            "Instance ID": instance.id,
+            "State": instance.lifecycle_state,
+            "Shape": instance.shape,
+            "Fault Domain": instance.fault_domain,
+            "Public IP": public_ip or "",
+            "Private IP": private_ips.get(instance.id, ""),
+            "Network Type": "Public" if public_ip else "Private",
+            "Volume Encryption": "Customer Managed Key" if boot_volume and boot_volume.kms_key_id else "Not Encrypted",
+            "Backup Configured": "Configured" if boot_volume and backup_index.has_policy(boot_volume.id) else "Not Configured",
+            "Older Generation Shape": "Yes" if instance.shape.startswith(OLDER_GENERATION_SHAPES) else "No",
+            "Tags": str(instance.freeform_tags or {}),
+            "OCPUs": instance.shape_config.ocpus if instance.shape_config else "",
+            "Memory (GB)": instance.shape_config.memory_in_gbs if instance.shape_config else ""
+        })
+    return rows
+
+
+def report_columns(window_minutes):
+    window = f"({window_minutes}min)"
+    return [
+        "Instance Name", "Instance ID", "State", "Shape", "Fault Domain",
+        f"CPU Utilization (%) {window}", f"Memory Utilization (%) {window}", f"Network Utilization (MB) {window}",
+        "Public IP", "Private IP", "Network Type", "Volume Encryption", "Backup Configured", "Older Generation Shape", "Tags",
+        "OCPUs", "Memory (GB)"
+    ]
+
+
+def join_metrics(rows, metrics, window_minutes):
+    # Fill the metric columns from the per-resourceId results; instances without an agent stay empty
+    window = f"({window_minutes}min)"
+    for row in rows:
+        instance_id = row["Instance ID"]
+        cpu = metrics["CPU Utilization (%)"].get(instance_id)
+        memory = metrics["Memory Utilization (%)"].get(instance_id)
+        bytes_in = metrics["Network Bytes In"].get(instance_id)
+        bytes_out = metrics["Network Bytes Out"].get(instance_id)
+        row[f"CPU Utilization (%) {window}"] = round(cpu, 2) if cpu is not None else ""
+        row[f"Memory Utilization (%) {window}"] = round(memory, 2) if memory is not None else ""
+        if bytes_in is None and bytes_out is None:
+            row[f"Network Utilization (MB) {window}"] = ""
+        else:
+            row[f"Network Utilization (MB) {window}"] = round(((bytes_in or 0) + (bytes_out or 0)) / (1024 * 1024), 2)
+    return rows
+
+
+def collect_compute_metrics(config, compartments, window_minutes=10, max_workers=MAX_WORKERS, store=None):
+    clients = {
+        "compute": oci.core.ComputeClient(config),
+        "network": oci.core.VirtualNetworkClient(config),
+        "blockstorage": oci.core.BlockstorageClient(config),
+        "monitoring": oci.monitoring.MonitoringClient(config)
+    }
+    identity_client = oci.identity.IdentityClient(config)
+    availability_domains = [ad.name for ad in identity_client.list_availability_domains(config["tenancy"]).data]
+    end_time = datetime.datetime.now(datetime.timezone.utc)
+    # One aggregated datapoint over the whole window, unless every datapoint is kept for the store
+    # or no interval spans the window (e.g. 90 minutes); then the window is reduced locally
+    single = window_interval(window_minutes) if store is None else None
+    interval = single or store_interval(window_minutes)
+
+    # Metric queries and inventory listings for every compartment are independent units of work
+    metrics = {column: {} for column, _, _ in METRICS}
+    statistics = {column: (metric, statistic) for column, metric, statistic in METRICS}
+    rows = []
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        metric_futures = []
+        inventory_futures = []
+        for compartment in compartments:
+            inventory_futures.append((compartment, executor.submit(fetch_inventory, clients, compartment["id"], availability_domains)))
+            for column, metric, statistic in METRICS:
+                metric_futures.append((compartment, column, executor.submit(
+                    fetch_metric, clients["monitoring"], compartment["id"], metric, statistic, window_minutes, end_time, interval
+                )))
+
+        for compartment, future in inventory_futures:
+            try:
+                rows.extend(future.result())
+            except oci.exceptions.ServiceError as e:
+                print(f"Error listing instances in compartment {compartment['name']}: {e.message}")
+        for compartment, column, future in metric_futures:
+            try:
+                points = future.result()
+            except oci.exceptions.ServiceError as e:
+                print(f"Error querying {column} in compartment {compartment['name']}: {e.message}")
+                continue
+            metric, statistic = statistics[column]
+            for resource_id, resource_points in points.items():
+                if single:
+                    # The latest aggregated datapoint
+                    metrics[column][resource_id] = max(resource_points, key=lambda point: point[0])[1]
+                    continue
+                metrics[column][resource_id] = reduce_points(resource_points, statistic)
+                if store is not None:
+                    store.append(resource_id, metric, *zip(*resource_points), interval=interval_seconds(interval))
+
+    if store is not None:
+        store.save()
+        print(f"Appended the {interval} datapoints to the metric store in {store.path}")
+    print(f"Queried {len(metric_futures)} metric series for {len(rows)} instances")
+    return join_metrics(rows, metrics, window_minutes)
+
+
+def write_metrics_csv(rows, path, window_minutes):
+    with open(path, "w", newline="") as file:
+        writer = csv.DictWriter(file, fieldnames=report_columns(window_minutes))
+        writer.writeheader()
+        writer.writerows(rows)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Collect compute utilization for every instance with grouped Monitoring queries")
+    parser.add_argument("--compartment", help="Only this compartment name (default: every active compartment)")
+    parser.add_argument("--window-minutes", type=int, default=10, help="Aggregation window for the metric columns")
+    parser.add_argument("--output", help="Default: <region>_Compute_compute_metrics.csv")
+    parser.add_argument("--max-workers", type=int, default=MAX_WORKERS)
+    parser.add_argument("--store", help="Also append the datapoints (one a minute for windows up to 50 minutes) to the local metric store in this directory")
+    args = parser.parse_args()
+    if args.window_minutes < 1:
+        parser.error("--window-minutes must be at least 1")
+
+    config = oci.config.from_file()
+    identity_client = oci.identity.IdentityClient(config)
+    print("Fetching compartments...")
+    compartments = [c for c in fetch_compartments(identity_client, config["tenancy"]) if c["lifecycle_state"] == "ACTIVE"]
+    if args.compartment:
+        compartments = [c for c in compartments if c["name"] == args.compartment]
+
+    store = MetricStore(args.store) if args.store else None
+    rows = collect_compute_metrics(config, compartments, args.window_minutes, args.max_workers, store)
+    output = args.output or f"{config['region']}_Compute_compute_metrics.csv"
+    write_metrics_csv(rows, output, args.window_minutes)
+    print(f"Compute metrics saved to {output}")
+
+
+if __name__ == "__main__":
+    main()
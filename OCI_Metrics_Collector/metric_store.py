@@ -0,0 +1,277 @@
+import argparse
+import datetime
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+DEFAULT_STORE_PATH = "metric_store"
+
+RAW_DTYPE = np.dtype([("ts", "<i8"), ("value", "<f8")])
+ROLLUP_DTYPE = np.dtype([("ts", "<i8"), ("count", "<u4"), ("min", "<f8"), ("max", "<f8"), ("avg", "<f8"), ("p95", "<f8")])
+
+COLUMN_NAMES = {"ts": "Time", "value": "Value", "count": "Count", "min": "Min", "max": "Max", "avg": "Avg", "p95": "P95"}
+
+# Rollup level -> bucket width in seconds
+LEVELS = {"1m": 60, "1h": 3600, "1d": 86400}
+DEFAULT_INTERVAL = 60  # Seconds per datapoint in series appended before intervals were recorded
+
+# Level -> calendar unit of one chunk file. Raw and minute data are split by month so old
+# chunks can be dropped whole; hourly and daily rollups stay small enough to keep together.
+CHUNK_UNITS = {"raw": "M", "1m": "M", "1h": "Y", "1d": None}
+
+
+def to_epoch(value):
+    if isinstance(value, datetime.datetime):
+        if value.tzinfo is None:
+            value = value.replace(tzinfo=datetime.timezone.utc)
+        return int(value.timestamp())
+    return int(value)
+
+
+def chunk_keys(level, ts):
+    # Chunk file name for every timestamp, e.g. "2025-01" for monthly chunks
+    unit = CHUNK_UNITS[level]
+    if unit is None:
+        return np.full(len(ts), "all")
+    return np.datetime_as_string(np.asarray(ts, dtype="<i8").astype("datetime64[s]").astype(f"datetime64[{unit}]"))
+
+
+def read_chunk(path, dtype):
+    # Memory-mapped view of a chunk; callers copy the slice they need
+    count = os.path.getsize(path) // dtype.itemsize
+    if count == 0:
+        return np.empty(0, dtype)
+    return np.memmap(path, dtype=dtype, mode="r", shape=(count,))
+
+
+def rollup(points, width):
+    # min/max/avg/p95 per bucket of raw points. Sorting by (bucket, value) puts each bucket's
+    # values in order, so every statistic is a vectorized lookup at the bucket offsets.
+    if len(points) == 0:
+        return np.empty(0, ROLLUP_DTYPE)
+    buckets = points["ts"] - points["ts"] % width
+    order = np.lexsort((points["value"], buckets))
+    values = points["value"][order]
+    buckets = buckets[order]
+    starts = np.flatnonzero(np.r_[True, buckets[1:] != buckets[:-1]])
+    counts = np.diff(np.r_[starts, len(values)])
+
+    records = np.empty(len(starts), ROLLUP_DTYPE)
+    records["ts"] = buckets[starts]
+    records["count"] = counts
+    records["min"] = values[starts]
+    records["max"] = values[starts + counts - 1]
+    records["avg"] = np.add.reduceat(values, starts) / counts
+    records["p95"] = values[starts + np.ceil(counts * 0.95).astype(np.int64) - 1]  # nearest rank
+    return records
+
+
+def choose_level(start, end):
+    # Coarsest level that still gives a useful number of points for the range
+    span = to_epoch(end) - to_epoch(start)
+    if span <= 6 * 3600:
+        return "1m"
+    if span <= 31 * 86400:
+        return "1h"
+    return "1d"
+
+
+class MetricStore:
+    # Append-only time-series store with one directory of fixed-size record chunks per
+    # (resource, metric) and level. Chunks are only ever appended to, except that the newest
+    # rollup record is rewritten while its bucket is still filling. One writer at a time;
+    # readers memory-map the chunks and never call the Monitoring API.
+
+    def __init__(self, path=DEFAULT_STORE_PATH):
+        self.path = path
+        self.index_path = os.path.join(path, "series.json")
+        self.intervals_path = os.path.join(path, "intervals.json")
+        self.series = {}  # "resource id|metric" -> series id
+        self.intervals = {}  # series id -> [[first ts, seconds per datapoint], ...], one entry per change
+        if os.path.exists(self.index_path):
+            with open(self.index_path) as file:
+                self.series = json.load(file)
+        if os.path.exists(self.intervals_path):
+            with open(self.intervals_path) as file:
+                self.intervals = json.load(file)
+        self.last_ts = {}  # series id -> newest raw timestamp
+
+    def series_id(self, resource_id, metric, create=False):
+        key = f"{resource_id}|{metric}"
+        series_id = self.series.get(key)
+        if series_id is None and create:
+            series_id = self.series[key] = f"{len(self.series):07d}"
+        return series_id
+
+    def resources(self, metric):
+        return [key.rsplit("|", 1)[0] for key in self.series if key.rsplit("|", 1)[1] == metric]
+
+    def save(self):
+        os.makedirs(self.path, exist_ok=True)
+        with open(self.index_path, "w") as file:
+            json.dump(self.series, file)
+        with open(self.intervals_path, "w") as file:
+            json.dump(self.intervals, file)
+
+    def _chunks(self, level, series_id, first_key=None, last_key=None):
+        directory = os.path.join(self.path, level, series_id)
+        if not os.path.isdir(directory):
+            return []
+        keys = sorted(name[:-4] for name in os.listdir(directory) if name.endswith(".bin"))
+        return [
+            os.path.join(directory, f"{key}.bin") for key in keys
+            if (first_key is None or key >= first_key) and (last_key is None or key <= last_key)
+        ]
+
+    def _last(self, level, series_id):
+        chunks = self._chunks(level, series_id)
+        if not chunks:
+            return None, None
+        records = read_chunk(chunks[-1], RAW_DTYPE if level == "raw" else ROLLUP_DTYPE)
+        return chunks[-1], (np.array(records[-1]) if len(records) else None)
+
+    def _read(self, level, series_id, start, end):
+        # Records with start <= ts < end, searched inside each chunk with binary search
+        dtype = RAW_DTYPE if level == "raw" else ROLLUP_DTYPE
+        first_key, last_key = chunk_keys(level, [start, end])
+        parts = []
+        for path in self._chunks(level, series_id, first_key, last_key):
+            records = read_chunk(path, dtype)
+            low, high = np.searchsorted(records["ts"], [start, end])
+            if high > low:
+                parts.append(np.array(records[low:high]))
+        return np.concatenate(parts) if parts else np.empty(0, dtype)
+
+    def _append_records(self, level, series_id, records):
+        directory = os.path.join(self.path, level, series_id)
+        os.makedirs(directory, exist_ok=True)
+        keys = chunk_keys(level, records["ts"])
+        for key in np.unique(keys):
+            with open(os.path.join(directory, f"{key}.bin"), "ab") as file:
+                file.write(records[keys == key].tobytes())
+
+    def _write_rollups(self, level, series_id, records):
+        path, last = self._last(level, series_id)
+        if last is not None and len(records) and records["ts"][0] == last["ts"]:
+            # The newest bucket was still open: rewrite it in place
+            with open(path, "r+b") as file:
+                file.seek(-ROLLUP_DTYPE.itemsize, os.SEEK_END)
+                file.write(records[:1].tobytes())
+            records = records[1:]
+        if len(records):
+            self._append_records(level, series_id, records)
+
+    def append(self, resource_id, metric, timestamps, values, interval=None):
+        # Points at or before the newest stored timestamp are dropped, so overlapping
+        # collection windows can be appended as they are. interval is the seconds each
+        # datapoint covers, which sums (e.g. bytes) need to become rates.
+        points = np.empty(len(timestamps), RAW_DTYPE)
+        if isinstance(timestamps, np.ndarray) and timestamps.dtype.kind == "i":
+            points["ts"] = timestamps
+        else:
+            points["ts"] = [to_epoch(ts) for ts in timestamps]
+        points["value"] = values
+        points = np.sort(points[~np.isnan(points["value"])], order="ts")
+        points = points[np.r_[True, points["ts"][1:] != points["ts"][:-1]]] if len(points) else points
+
+        series_id = self.series_id(resource_id, metric, create=True)
+        if series_id not in self.last_ts:
+            _, last = self._last("raw", series_id)
+            self.last_ts[series_id] = int(last["ts"]) if last is not None else None
+        if self.last_ts[series_id] is not None:
+            points = points[points["ts"] > self.last_ts[series_id]]
+        if len(points) == 0:
+            return 0
+
+        self._append_records("raw", series_id, points)
+        self.last_ts[series_id] = int(points["ts"][-1])
+        history = self.intervals.setdefault(series_id, [])
+        if interval and (not history or history[-1][1] != interval):
+            # From the minute of the first new point, so its 1m rollup already reads the new interval
+            first = int(points["ts"][0])
+            history.append([first - first % LEVELS["1m"], int(interval)])
+        # Rebuild only the buckets the new points fall in, from the raw points of those buckets
+        for level, width in LEVELS.items():
+            first_bucket = int(points["ts"][0]) - int(points["ts"][0]) % width
+            raw = self._read("raw", series_id, first_bucket, self.last_ts[series_id] + 1)
+            self._write_rollups(level, series_id, rollup(raw, width))
+        return len(points)
+
+    def interval_seconds(self, resource_id, metric, timestamps):
+        # Seconds the stored datapoint at each timestamp covers
+        history = self.intervals.get(self.series_id(resource_id, metric)) or []
+        seconds = np.array([DEFAULT_INTERVAL] + [entry[1] for entry in history], dtype=np.float64)
+        firsts = np.array([entry[0] for entry in history], dtype=np.int64)
+        return seconds[np.searchsorted(firsts, timestamps, side="right")]
+
+    def query(self, resource_id, metric, start, end, level="1h"):
+        # Structured array of records in [start, end) at one level ("raw", "1m", "1h" or "1d")
+        series_id = self.series_id(resource_id, metric)
+        if series_id is None:
+            return np.empty(0, RAW_DTYPE if level == "raw" else ROLLUP_DTYPE)
+        return self._read(level, series_id, to_epoch(start), to_epoch(end))
+
+    def query_frame(self, metric, start, end, level=None, resource_ids=None):
+        # One row per (resource, bucket) across many resources
+        level = level or choose_level(start, end)
+        frames = []
+        for resource_id in resource_ids or self.resources(metric):
+            records = self.query(resource_id, metric, start, end, level)
+            if len(records):
+                frame = pd.DataFrame(records)
+                frame.insert(0, "Resource ID", resource_id)
+                frames.append(frame)
+        if not frames:
+            return pd.DataFrame(columns=["Resource ID", "Time"])
+        frame = pd.concat(frames, ignore_index=True)
+        frame["ts"] = pd.to_datetime(frame["ts"], unit="s", utc=True)
+        return frame.rename(columns=COLUMN_NAMES)
+
+    def summary(self, metric, start, end, level=None, resource_ids=None):
+        # Per-resource statistics over the range. P95 is the 95th percentile of the bucket
+        # p95 values, which is an approximation once buckets are coarser than raw points.
+        frame = self.query_frame(metric, start, end, level or choose_level(start, end), resource_ids)
+        if frame.empty or "Avg" not in frame:
+            return pd.DataFrame(columns=["Resource ID", "Samples", "Min", "Max", "Avg", "P95"])
+        frame["Weighted"] = frame["Avg"] * frame["Count"]
+        grouped = frame.groupby("Resource ID")
+        result = pd.DataFrame({
+            "Samples": grouped["Count"].sum(),
+            "Min": grouped["Min"].min(),
+            "Max": grouped["Max"].max(),
+            "Avg": grouped["Weighted"].sum() / grouped["Count"].sum(),
+            "P95": grouped["P95"].quantile(0.95)
+        })
+        return result.round(2).reset_index()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Query the local metric store without calling OCI Monitoring")
+    parser.add_argument("--store", default=DEFAULT_STORE_PATH)
+    parser.add_argument("--metric", required=True, help="Metric name, e.g. CpuUtilization")
+    parser.add_argument("--days", type=float, default=30, help="Range ending now")
+    parser.add_argument("--level", choices=["raw", "1m", "1h", "1d"], help="Default: chosen from the range")
+    parser.add_argument("--resource", action="append", help="Resource OCID (repeatable, default: all)")
+    parser.add_argument("--summary", action="store_true", help="One row per resource instead of one per bucket")
+    parser.add_argument("--output", help="Write CSV here instead of printing")
+    args = parser.parse_args()
+
+    store = MetricStore(args.store)
+    end = datetime.datetime.now(datetime.timezone.utc)
+    start = end - datetime.timedelta(days=args.days)
+    if args.summary:
+        frame = store.summary(args.metric, start, end, args.level, args.resource)
+    else:
+        frame = store.query_frame(args.metric, start, end, args.level, args.resource)
+
+    if args.output:
+        frame.to_csv(args.output, index=False)
+        print(f"{len(frame)} rows saved to {args.output}")
+    else:
+        print(frame.to_string(index=False))
+
+
+if __name__ == "__main__":
+    main()
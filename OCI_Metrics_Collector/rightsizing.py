@@ -0,0 +1,255 @@
+import argparse
+import datetime
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+from metric_store import DEFAULT_STORE_PATH, MetricStore, to_epoch
+
+DEFAULT_CATALOG = os.path.join(os.path.dirname(os.path.abspath(__file__)), "shape_catalog.json")
+
+STEP_SECONDS = 300  # one column per 5 minutes
+BATCH_SIZE = 1000  # instances per (instances x time) matrix
+IDLE_CPU_PERCENT = 5
+IDLE_FRACTION = 0.95
+TARGET_CPU_PERCENT = 70  # p95 CPU the recommended size should run at
+TARGET_MEMORY_PERCENT = 80
+MIN_SAVINGS = 0.05  # ignore recommendations that save less than 5%
+
+REPORT_COLUMNS = [
+    "Instance Name", "Instance ID", "State", "Shape", "OCPUs", "Memory (GB)", "Samples",
+    "CPU P50 (%)", "CPU P95 (%)", "CPU P99 (%)", "CPU Idle (%)",
+    "Memory P50 (%)", "Memory P95 (%)", "Memory P99 (%)", "Network P95 (Mbps)",
+    "Recommendation", "Recommended Shape", "Recommended OCPUs", "Recommended Memory (GB)",
+    "Current Monthly Cost", "Recommended Monthly Cost", "Monthly Savings"
+]
+
+
+def load_catalog(path=DEFAULT_CATALOG):
+    with open(path) as file:
+        return json.load(file)
+
+
+def percentiles(matrix, quantiles):
+    # Nearest-rank percentiles of every row, ignoring gaps (NaN). np.sort moves NaN to the end
+    # of each row, so the k-th valid value of all rows is a single take_along_axis.
+    counts = np.count_nonzero(~np.isnan(matrix), axis=1)
+    ordered = np.sort(matrix, axis=1)
+    result = np.full((len(matrix), len(quantiles)), np.nan)
+    for column, quantile in enumerate(quantiles):
+        ranks = np.clip(np.ceil(counts * quantile).astype(np.int64) - 1, 0, None)
+        values = np.take_along_axis(ordered, ranks[:, None], axis=1)[:, 0]
+        result[:, column] = np.where(counts > 0, values, np.nan)
+    return result, counts
+
+
+def utilization_stats(cpu, memory, network):
+    # cpu and memory in percent, network in Mbps, each shaped (instances x time slots)
+    cpu_percentiles, samples = percentiles(cpu, (0.5, 0.95, 0.99))
+    memory_percentiles, _ = percentiles(memory, (0.5, 0.95, 0.99))
+    network_percentiles, _ = percentiles(network, (0.95,))
+    with np.errstate(invalid="ignore", divide="ignore"):
+        idle = np.count_nonzero(cpu < IDLE_CPU_PERCENT, axis=1) / samples
+    return {
+        "samples": samples,
+        "cpu": cpu_percentiles,
+        "memory": memory_percentiles,
+        "network_p95": network_percentiles[:, 0],
+        "idle": idle
+    }
+
+
+def current_size(inventory, catalog):
+    # OCPUs and memory from the inventory (needed for flex shapes), else from the catalog
+    shapes = catalog["shapes"]
+    fixed_ocpus = inventory["Shape"].map(lambda shape: shapes.get(shape, {}).get("ocpus"))
+    fixed_memory = inventory["Shape"].map(lambda shape: shapes.get(shape, {}).get("memory_gb"))
+    missing = pd.Series(np.nan, index=inventory.index)
+    ocpus = pd.to_numeric(inventory["OCPUs"], errors="coerce") if "OCPUs" in inventory else missing
+    memory = pd.to_numeric(inventory["Memory (GB)"], errors="coerce") if "Memory (GB)" in inventory else missing
+    return (
+        ocpus.fillna(fixed_ocpus).to_numpy(dtype=np.float64),
+        memory.fillna(fixed_memory).to_numpy(dtype=np.float64)
+    )
+
+
+def monthly_cost(shape_names, ocpus, memory, catalog):
+    shapes = catalog["shapes"]
+    ocpu_rate = np.array([shapes.get(shape, {}).get("ocpu_hour", np.nan) for shape in shape_names], dtype=np.float64)
+    memory_rate = np.array([shapes.get(shape, {}).get("memory_gb_hour", np.nan) for shape in shape_names], dtype=np.float64)
+    return (ocpus * ocpu_rate + memory * memory_rate) * catalog["hours_per_month"]
+
+
+def size_flex_shapes(shape_names, arch, required_ocpus, required_memory, required_gbps, catalog):
+    # Cheapest feasible flex configuration per instance: every flex shape is sized for all
+    # instances at once, infeasible ones cost infinity, and argmin picks the winner. Ties go
+    # to the instance's current shape, then to the shape listed first in the catalog.
+    names = [name for name, shape in catalog["shapes"].items() if shape.get("flex")]
+    costs = np.full((len(names), len(arch)), np.inf)
+    ocpu_options = np.zeros((len(names), len(arch)))
+    memory_options = np.zeros((len(names), len(arch)))
+    for index, name in enumerate(names):
+        shape = catalog["shapes"][name]
+        ocpus = np.maximum.reduce([
+            required_ocpus,
+            np.full(len(arch), shape["min_ocpus"], dtype=np.float64),
+            np.ceil(required_memory / shape["max_memory_per_ocpu"]),
+            np.ceil(required_gbps / shape["network_gbps_per_ocpu"])
+        ])
+        memory = np.maximum(required_memory, ocpus * shape["min_memory_per_ocpu"])
+        feasible = (
+            (arch == shape["arch"]) & (ocpus <= shape["max_ocpus"]) & (memory <= shape["max_memory_gb"])
+            & (required_gbps <= shape["max_network_gbps"])
+        )
+        cost = (ocpus * shape["ocpu_hour"] + memory * shape["memory_gb_hour"]) * catalog["hours_per_month"]
+        costs[index] = np.where(feasible, cost, np.inf)
+        ocpu_options[index] = ocpus
+        memory_options[index] = memory
+
+    best = np.argmin(costs, axis=0)
+    columns = np.arange(len(arch))
+    current = np.array([names.index(shape) if shape in names else -1 for shape in shape_names])
+    on_flex = current >= 0
+    keep = on_flex & (costs[np.where(on_flex, current, 0), columns] <= costs[best, columns])
+    best = np.where(keep, current, best)
+    return (
+        np.array(names, dtype=object)[best], ocpu_options[best, columns],
+        memory_options[best, columns], costs[best, columns]
+    )
+
+
+def analyze_batch(inventory, cpu, memory, network, catalog,
+                  target_cpu=TARGET_CPU_PERCENT, target_memory=TARGET_MEMORY_PERCENT):
+    # inventory rows line up with the matrix rows
+    stats = utilization_stats(cpu, memory, network)
+    shapes = catalog["shapes"]
+    shape_names = inventory["Shape"].astype(str).to_numpy()
+    arch = np.array([shapes.get(shape, {}).get("arch", "") for shape in shape_names])
+    ocpus, memory_gb = current_size(inventory, catalog)
+    cost = monthly_cost(shape_names, ocpus, memory_gb, catalog)
+
+    # Size for the p95 at the target utilization; a missing metric keeps the current size
+    cpu_p95 = stats["cpu"][:, 1]
+    memory_p95 = stats["memory"][:, 1]
+    required_ocpus = np.where(np.isnan(cpu_p95), ocpus, np.maximum(1, np.ceil(ocpus * cpu_p95 / target_cpu)))
+    required_memory = np.where(np.isnan(memory_p95), memory_gb, np.ceil(memory_gb * memory_p95 / target_memory))
+    required_gbps = np.nan_to_num(stats["network_p95"]) / 1000
+    required_ocpus = np.nan_to_num(required_ocpus)
+    required_memory = np.nan_to_num(required_memory)
+    best_shape, best_ocpus, best_memory, best_cost = size_flex_shapes(shape_names, arch, required_ocpus, required_memory, required_gbps, catalog)
+
+    no_data = stats["samples"] == 0
+    unknown = np.isnan(cost) | (arch == "")
+    idle = (stats["idle"] >= IDLE_FRACTION) & (stats["cpu"][:, 2] < IDLE_CPU_PERCENT)
+    cheaper = np.isfinite(best_cost) & (best_cost < cost * (1 - MIN_SAVINGS))
+    undersized = (required_ocpus > ocpus) | (required_memory > memory_gb)
+    recommendation = np.select(
+        [no_data, unknown, idle, cheaper & (best_shape == shape_names), cheaper, undersized],
+        ["No utilization data", "Shape not in catalog", "Idle - stop or terminate", "Downsize", "Change shape", "Upsize"],
+        default="Right-sized"
+    )
+    recommend_size = np.isin(recommendation, ["Downsize", "Change shape", "Upsize"]) & np.isfinite(best_cost)
+    recommended_cost = np.where(idle & ~no_data & ~unknown, 0.0, np.where(recommend_size, best_cost, cost))
+
+    report = pd.DataFrame({
+        "Instance Name": inventory.get("Instance Name", ""),
+        "Instance ID": inventory["Instance ID"],
+        "State": inventory.get("State", ""),
+        "Shape": shape_names,
+        "OCPUs": ocpus,
+        "Memory (GB)": memory_gb,
+        "Samples": stats["samples"],
+        "CPU P50 (%)": stats["cpu"][:, 0],
+        "CPU P95 (%)": stats["cpu"][:, 1],
+        "CPU P99 (%)": stats["cpu"][:, 2],
+        "CPU Idle (%)": stats["idle"] * 100,
+        "Memory P50 (%)": stats["memory"][:, 0],
+        "Memory P95 (%)": stats["memory"][:, 1],
+        "Memory P99 (%)": stats["memory"][:, 2],
+        "Network P95 (Mbps)": stats["network_p95"],
+        "Recommendation": recommendation,
+        "Recommended Shape": np.where(recommend_size, best_shape, ""),
+        "Recommended OCPUs": np.where(recommend_size, best_ocpus, np.nan),
+        "Recommended Memory (GB)": np.where(recommend_size, best_memory, np.nan),
+        "Current Monthly Cost": cost,
+        "Recommended Monthly Cost": recommended_cost,
+        "Monthly Savings": cost - recommended_cost
+    }, index=inventory.index)
+    return report[REPORT_COLUMNS].round(2)
+
+
+def load_matrix(store, metric, resource_ids, start, slots, per_second=False):
+    # (instances x slots) float32 matrix of 5-minute means built from the 1m rollups; gaps are NaN.
+    # per_second divides each datapoint by the seconds it covers, for metrics summed per interval.
+    matrix = np.full((len(resource_ids), slots), np.nan, dtype=np.float32)
+    end = start + slots * STEP_SECONDS
+    for row, resource_id in enumerate(resource_ids):
+        records = store.query(resource_id, metric, start, end, "1m")
+        if len(records) == 0:
+            continue
+        columns = (records["ts"] - start) // STEP_SECONDS
+        values = records["avg"]
+        if per_second:
+            values = values / store.interval_seconds(resource_id, metric, records["ts"])
+        counts = np.bincount(columns, weights=records["count"], minlength=slots)
+        sums = np.bincount(columns, weights=values * records["count"], minlength=slots)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            matrix[row] = sums / counts
+    return matrix
+
+
+def network_mbps(bytes_in, bytes_out):
+    # Bytes per second in and out; a slot with neither metric stays a gap
+    total = np.where(np.isnan(bytes_in) & np.isnan(bytes_out), np.nan, np.nan_to_num(bytes_in) + np.nan_to_num(bytes_out))
+    return (total * 8 / 1_000_000).astype(np.float32)
+
+
+def analyze_store(store, inventory, start, end, catalog, batch_size=BATCH_SIZE, **targets):
+    # Peak memory is a few (batch_size x slots) float32 matrices regardless of fleet size
+    start = to_epoch(start)
+    slots = max(1, (to_epoch(end) - start) // STEP_SECONDS)
+    reports = []
+    for offset in range(0, len(inventory), batch_size):
+        batch = inventory.iloc[offset:offset + batch_size]
+        resource_ids = batch["Instance ID"].tolist()
+        cpu = load_matrix(store, "CpuUtilization", resource_ids, start, slots)
+        memory = load_matrix(store, "MemoryUtilization", resource_ids, start, slots)
+        network = network_mbps(
+            load_matrix(store, "NetworksBytesIn", resource_ids, start, slots, per_second=True),
+            load_matrix(store, "NetworksBytesOut", resource_ids, start, slots, per_second=True)
+        )
+        reports.append(analyze_batch(batch, cpu, memory, network, catalog, **targets))
+        print(f"Analyzed {min(offset + batch_size, len(inventory))}/{len(inventory)} instances")
+    return pd.concat(reports, ignore_index=True) if reports else pd.DataFrame(columns=REPORT_COLUMNS)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Recommend smaller or flex shapes from stored utilization")
+    parser.add_argument("inventory", help="Compute metrics CSV from compute_metrics.py")
+    parser.add_argument("--store", default=DEFAULT_STORE_PATH)
+    parser.add_argument("--catalog", default=DEFAULT_CATALOG, help="Local shape catalog (JSON)")
+    parser.add_argument("--days", type=float, default=30)
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE)
+    parser.add_argument("--target-cpu", type=float, default=TARGET_CPU_PERCENT, help="p95 CPU %% to size for")
+    parser.add_argument("--target-memory", type=float, default=TARGET_MEMORY_PERCENT, help="p95 memory %% to size for")
+    parser.add_argument("--output", default="rightsizing_report.xlsx")
+    args = parser.parse_args()
+
+    inventory = pd.read_csv(args.inventory).drop_duplicates("Instance ID").reset_index(drop=True)
+    end = datetime.datetime.now(datetime.timezone.utc)
+    start = end - datetime.timedelta(days=args.days)
+    report = analyze_store(
+        MetricStore(args.store), inventory, start, end, load_catalog(args.catalog), args.batch_size,
+        target_cpu=args.target_cpu, target_memory=args.target_memory
+    )
+
+    with pd.ExcelWriter(args.output, engine="openpyxl") as writer:
+        report.to_excel(writer, sheet_name="Rightsizing", index=False)
+    savings = report["Monthly Savings"].fillna(0).clip(lower=0).sum()
+    print(f"Rightsizing report saved to {args.output} (estimated monthly savings: {savings:,.2f})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,194 @@
+import argparse
+import json
+import os
+import time
+
+import numpy as np
+import openpyxl
+import pandas as pd
+from openpyxl.styles import Font
+
+DEFAULT_PRICE_TABLE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "price_table.json")
+COST_COLUMN = "Monthly Cost"
+
+
+def load_price_table(path=DEFAULT_PRICE_TABLE):
+    # JSON price table, or a CSV with item,rate rows for the flat storage/LB/IP rates
+    if path.lower().endswith(".csv"):
+        with open(DEFAULT_PRICE_TABLE) as file:
+            prices = json.load(file)
+        for item, rate in pd.read_csv(path).itertuples(index=False):
+            if item in prices["storage_gb_month"]:
+                prices["storage_gb_month"][item] = float(rate)
+            else:
+                prices[item] = float(rate)
+        return prices
+    with open(path) as file:
+        return json.load(file)
+
+
+def _numeric(series):
+    return pd.to_numeric(series, errors="coerce").fillna(0.0).to_numpy(dtype=np.float64)
+
+
+def _sized_cost(df, rate, charged, label):
+    # Cost by Size (GB) for the charged rows. A charged row with a size that is missing or not a number,
+    # or that still comes to zero, is reported, since it would otherwise be priced at 0 without a trace.
+    sizes = pd.to_numeric(df["Size (GB)"], errors="coerce").to_numpy(dtype=np.float64)
+    cost = np.where(charged, np.nan_to_num(sizes) * rate, 0.0)
+    undecided = df["Remarks"].astype(str).str.startswith("Unknown").to_numpy()
+    unpriced = charged & ~undecided & (np.isnan(sizes) | ((sizes > 0) & (cost <= 0)))
+    if unpriced.any():
+        print(f"Warning: {int(unpriced.sum())} {label} priced at 0; check their Size (GB) and the price table")
+    return cost
+
+
+def price_volumes(df, prices):
+    rates = prices["storage_gb_month"]
+    is_boot = df["Remarks"].astype(str).str.contains("boot", case=False).to_numpy()
+    rate = np.where(is_boot, rates["boot_volume"], rates["block_volume"])
+    return _sized_cost(df, rate, np.ones(len(df), dtype=bool), "unattached volumes")
+
+
+def price_instances(df, prices):
+    # Flexible shapes bill per OCPU and GB of memory, and only a few shapes keep billing compute when stopped
+    shapes = df["Shape"].astype(str)
+    default = prices["default_shape"]
+    table = pd.DataFrame.from_dict(prices["shapes"], orient="index")
+    ocpu_rate = shapes.map(table["ocpu_hour"]).fillna(default["ocpu_hour"]).to_numpy(dtype=np.float64)
+    memory_rate = shapes.map(table["memory_gb_hour"]).fillna(default["memory_gb_hour"]).to_numpy(dtype=np.float64)
+    billed = shapes.map(table["billed_when_stopped"]).fillna(default["billed_when_stopped"]).to_numpy(dtype=bool)
+
+    ocpus = _numeric(df["OCPUs"]) if "OCPUs" in df else np.ones(len(df))
+    memory = _numeric(df["Memory (GB)"]) if "Memory (GB)" in df else np.zeros(len(df))
+    stopped = (df["State"].astype(str) == "STOPPED").to_numpy()
+    hourly = ocpus * ocpu_rate + memory * memory_rate
+    return np.where(stopped & billed, hourly * prices["hours_per_month"], 0.0)
+
+
+def price_storage(df, prices):
+    # Only file systems that are not in use are counted as savings. A bucket is reported unused when it
+    # holds no objects, so there are no stored bytes to save; bucket rows are left unpriced (NaN).
+    is_file_system = (df["Type"].astype(str) == "File Storage").to_numpy()
+    unused = df["Remarks"].astype(str).str.startswith("Unused").to_numpy()
+    cost = _sized_cost(df, prices["storage_gb_month"]["file_storage"], is_file_system & unused, "unused file systems")
+    return np.where(is_file_system, cost, np.nan)
+
+
+def price_load_balancers(df, prices):
+    active = (df["State"].astype(str) == "ACTIVE").to_numpy()
+    return np.where(active, prices["load_balancer_hour"] * prices["hours_per_month"], 0.0)
+
+
+def price_public_ips(df, prices):
+    return np.full(len(df), prices["public_ip_reserved_hour"] * prices["hours_per_month"])
+
+
+def price_backups(df, prices):
+    rate = prices["storage_gb_month"]["volume_backup"]
+    return _sized_cost(df, rate, np.ones(len(df), dtype=bool), "orphaned backups")
+
+
+SHEET_PRICERS = {
+    "Unattached Volumes": price_volumes,
+    "Orphaned Instances": price_instances,
+    "Unused Storage": price_storage,
+    "Orphaned Load Balancers": price_load_balancers,
+    "Unused Public IPs": price_public_ips,
+    "Orphaned Backups": price_backups,
+}
+
+
+def price_orphans(frames, prices):
+    # Adds a cost column to each orphan sheet and returns (priced frames, summary by compartment and type)
+    priced = {}
+    summaries = []
+    for sheet_name, df in frames.items():
+        pricer = SHEET_PRICERS.get(sheet_name)
+        if pricer is None or df.empty:
+            priced[sheet_name] = df
+            continue
+        df = df.copy()
+        cost = pricer(df, prices)
+        # Resources the orphan scan could not decide on (a related listing failed) are not savings
+        undecided = df["Remarks"].astype(str).str.startswith("Unknown").to_numpy()
+        df[COST_COLUMN] = np.round(np.where(undecided, 0.0, cost), 2)
+        priced[sheet_name] = df
+        # Rows a pricer leaves unpriced are not counted in the summary
+        counted = df[~np.isnan(df[COST_COLUMN].to_numpy())]
+        summaries.append(pd.DataFrame({
+            "Compartment": counted["Compartment"].to_numpy(),
+            "Resource Type": sheet_name,
+            COST_COLUMN: counted[COST_COLUMN].to_numpy()
+        }))
+
+    if summaries:
+        combined = pd.concat(summaries, ignore_index=True)
+        summary = combined.groupby(["Compartment", "Resource Type"], as_index=False).agg(
+            Resources=(COST_COLUMN, "size"), **{COST_COLUMN: (COST_COLUMN, "sum")}
+        )
+        summary = summary.sort_values(COST_COLUMN, ascending=False, ignore_index=True)
+        summary["Annual Savings"] = np.round(summary[COST_COLUMN].to_numpy() * 12, 2)
+    else:
+        summary = pd.DataFrame(columns=["Compartment", "Resource Type", "Resources", COST_COLUMN, "Annual Savings"])
+    return priced, summary
+
+
+def cost_column(sheet):
+    # The cost column written by an earlier run, so pricing a report again replaces it; else a new column
+    for cell in sheet[1]:
+        if isinstance(cell.value, str) and cell.value.startswith(COST_COLUMN):
+            return cell.column
+    return sheet.max_column + 1
+
+
+def write_costs(report_path, output_path, priced, summary, currency):
+    # Write the cost column into the existing sheets so their formatting is kept, then add the summary sheet
+    workbook = openpyxl.load_workbook(report_path)
+    for sheet_name, df in priced.items():
+        if COST_COLUMN not in df or sheet_name not in workbook.sheetnames:
+            continue
+        sheet = workbook[sheet_name]
+        column = cost_column(sheet)
+        header = sheet.cell(row=1, column=column, value=f"{COST_COLUMN} ({currency})")
+        header.font = Font(bold=True)
+        for offset, value in enumerate(df[COST_COLUMN].tolist(), start=2):
+            sheet.cell(row=offset, column=column, value=None if np.isnan(value) else value)
+
+    if "Savings Summary" in workbook.sheetnames:
+        workbook.remove(workbook["Savings Summary"])
+    summary_sheet = workbook.create_sheet(title="Savings Summary", index=0)
+    summary_sheet.append(["Compartment", "Resource Type", "Resources", f"{COST_COLUMN} ({currency})", f"Annual Savings ({currency})"])
+    for cell in summary_sheet[1]:
+        cell.font = Font(bold=True)
+    for row in summary.itertuples(index=False):
+        summary_sheet.append(list(row))
+    summary_sheet.append(["Total", "", int(summary["Resources"].sum()), round(float(summary[COST_COLUMN].sum()), 2),
+                          round(float(summary["Annual Savings"].sum()), 2)])
+    workbook.save(output_path)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Estimate the monthly cost of orphaned resources")
+    parser.add_argument("report", nargs="?", default="unused_resources_report.xlsx")
+    parser.add_argument("--prices", default=DEFAULT_PRICE_TABLE, help="Local price table (JSON or CSV)")
+    parser.add_argument("--output", help="Defaults to updating the report in place")
+    args = parser.parse_args()
+
+    prices = load_price_table(args.prices)
+    frames = pd.read_excel(args.report, sheet_name=None)
+    frames.pop("Savings Summary", None)  # Written by an earlier run; it is rebuilt below
+
+    start = time.perf_counter()
+    priced, summary = price_orphans(frames, prices)
+    elapsed = time.perf_counter() - start
+    rows = sum(len(df) for df in priced.values())
+    print(f"Priced {rows} orphaned resources in {elapsed * 1000:.1f} ms")
+    print(f"Estimated waste: {summary[COST_COLUMN].sum():.2f} {prices['currency']} per month")
+
+    write_costs(args.report, args.output or args.report, priced, summary, prices["currency"])
+    print(f"Cost estimates saved to {args.output or args.report}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,38 +1,416 @@
+import argparse
+import os
+import sys
 import oci
 import openpyxl
+from concurrent.futures import ThreadPoolExecutor
 from openpyxl.styles import Font
 
-def collect_unused_resources():
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from OCI_Common.async_client import MAX_IN_FLIGHT, run_compartment_scans
+from OCI_Common.backups import BackupIndex, backup_records, fetch_policy_assignments
+from OCI_Common.buckets import BucketCache
+from OCI_Common.calls import call, listing, run_scan, tolerant
+from OCI_Common.clients import get_client
+from OCI_Common.compartments import fetch_compartments
+from OCI_Common.records import record_type
+from resource_graph import ResourceGraph
+
+MAX_WORKERS = 16
+
+CLIENT_CLASSES = {
+    "blockstorage": oci.core.BlockstorageClient,
+    "compute": oci.core.ComputeClient,
+    "network": oci.core.VirtualNetworkClient,
+    "object_storage": oci.object_storage.ObjectStorageClient,
+    "file_storage": oci.file_storage.FileStorageClient,
+    "load_balancer": oci.load_balancer.LoadBalancerClient
+}
+
+ATTACHED_STATES = ("ATTACHING", "ATTACHED")
+
+
+def format_time(value):
+    return value.strftime('%Y-%m-%d %H:%M:%S')
+
+
+# Details kept for every resource that may end up in the report, as compact records instead of
+# the SDK models; fields a resource type does not have stay None
+Details = record_type("Orphan Candidates", (
+    "compartment", "display_name", "lifecycle_state", "time_created", "size_in_gbs", "attachment_id", "assigned_to"
+))
+
+
+def describe(compartment, resource, **extra):
+    return Details(resource, compartment=compartment["name"], **extra)
+
+
+class ScanResult:
+    # Output of one unit of work: graph nodes (ocid, kind, live, anchor, details),
+    # graph edges (ocid, ocid), rows for sheets that are not graph based, backup records
+    # and the lookups that failed, whose edges are missing from the graph
+    __slots__ = ("nodes", "edges", "rows", "backups", "failed")
+
+    def __init__(self):
+        self.nodes = []
+        self.edges = []
+        self.rows = []
+        self.backups = []
+        self.failed = set()
+
+
+# Each scan function handles one bulk listing and returns a ScanResult. Scans yield the listings
+# they need (see OCI_Common/calls.py), so the same code runs on the thread pool or the asyncio backend
+
+def scan_volumes(session, compartment):
+    result = ScanResult()
+    volumes = yield listing("blockstorage", "list_volumes", compartment_id=compartment["id"])
+    for volume in volumes:
+        result.nodes.append((volume.id, "volume", volume.lifecycle_state == "AVAILABLE", False,
+                             describe(compartment, volume)))
+    return result
+
+
+def scan_volume_attachments(session, compartment):
+    result = ScanResult()
+    attachments = yield listing("compute", "list_volume_attachments", compartment_id=compartment["id"])
+    for attachment in attachments:
+        result.nodes.append((attachment.id, "volume_attachment", attachment.lifecycle_state in ATTACHED_STATES, False, None))
+        result.edges.append((attachment.id, attachment.volume_id))
+        result.edges.append((attachment.id, attachment.instance_id))
+    return result
+
+
+def scan_boot_volumes(session, compartment, availability_domain):
+    result = ScanResult()
+    boot_volumes, attachments = yield [
+        listing("blockstorage", "list_boot_volumes", availability_domain=availability_domain, compartment_id=compartment["id"]),
+        listing("compute", "list_boot_volume_attachments", availability_domain, compartment["id"])
+    ]
+    for boot_volume in boot_volumes:
+        result.nodes.append((boot_volume.id, "boot_volume", boot_volume.lifecycle_state == "AVAILABLE", False,
+                             describe(compartment, boot_volume)))
+    for attachment in attachments:
+        result.nodes.append((attachment.id, "boot_volume_attachment", attachment.lifecycle_state in ATTACHED_STATES, False, None))
+        result.edges.append((attachment.id, attachment.boot_volume_id))
+        result.edges.append((attachment.id, attachment.instance_id))
+    return result
+
+
+def scan_instances(session, compartment):
+    result = ScanResult()
+    instances = yield listing("compute", "list_instances", compartment_id=compartment["id"])
+    for instance in instances:
+        exists = instance.lifecycle_state not in ("TERMINATING", "TERMINATED")
+        result.nodes.append((instance.id, "instance", exists, True, None))
+        if instance.lifecycle_state in ["TERMINATED", "STOPPED"]:
+            remarks = "Stopped (idle, storage still billed)" if instance.lifecycle_state == "STOPPED" else "Terminated"
+            shape_config = instance.shape_config
+            result.rows.append(("Orphaned Instances", [
+                compartment["name"], instance.display_name, instance.id,
+                instance.lifecycle_state, instance.shape,
+                format_time(instance.time_created), remarks,
+                shape_config.ocpus if shape_config else None,
+                shape_config.memory_in_gbs if shape_config else None
+            ]))
+    return result
+
+
+def scan_vnic_attachments(session, compartment):
+    result = ScanResult()
+    attachments = yield listing("compute", "list_vnic_attachments", compartment_id=compartment["id"])
+    for attachment in attachments:
+        attached = attachment.lifecycle_state in ATTACHED_STATES
+        result.nodes.append((attachment.id, "vnic_attachment", attached, False, None))
+        if attachment.vnic_id:
+            result.nodes.append((attachment.vnic_id, "vnic", attached, False,
+                                 describe(compartment, attachment, attachment_id=attachment.id)))
+            result.edges.append((attachment.id, attachment.vnic_id))
+        result.edges.append((attachment.id, attachment.instance_id))
+    return result
+
+
+def ip_node(vcn_id, ip_address):
+    # Private addresses repeat across VCNs, so an address node belongs to one VCN
+    return f"ip:{vcn_id}:{ip_address}"
+
+
+def scan_private_ips(session, compartment):
+    # Private IPs are listed per subnet, which is the bulk form of list_private_ips
+    result = ScanResult()
+    subnets = yield listing("network", "list_subnets", compartment_id=compartment["id"])
+    private_ip_listings = yield [listing("network", "list_private_ips", subnet_id=subnet.id) for subnet in subnets]
+    for subnet, private_ips in zip(subnets, private_ip_listings):
+        for private_ip in private_ips:
+            # An existing private IP is always assigned to something, so it anchors its public IP and LB backends
+            address = ip_node(subnet.vcn_id, private_ip.ip_address)
+            result.nodes.append((private_ip.id, "private_ip", True, True, None))
+            result.edges.append((private_ip.id, private_ip.vnic_id))
+            result.edges.append((private_ip.id, address))
+            result.nodes.append((address, "ip_address", True, False, None))
+    return result
+
+
+def scan_public_ips(session, compartment):
+    result = ScanResult()
+    public_ips = yield listing("network", "list_public_ips", scope="REGION", compartment_id=compartment["id"])
+    for ip in public_ips:
+        exists = ip.lifecycle_state not in ("TERMINATING", "TERMINATED")
+        # Public IPs on NAT gateways and other non private-IP entities are in use by definition
+        anchored = bool(ip.assigned_entity_id) and ip.assigned_entity_type != "PRIVATE_IP"
+        result.nodes.append((ip.id, "public_ip", exists, anchored,
+                             describe(compartment, ip, display_name=ip.ip_address, assigned_to=ip.assigned_entity_id)))
+        result.edges.append((ip.id, ip.private_ip_id or ip.assigned_entity_id))
+    return result
+
+
+def scan_load_balancers(session, compartment):
+    result = ScanResult()
+    load_balancers = yield listing("load_balancer", "list_load_balancers", compartment_id=compartment["id"])
+    # Backends are addressed by IP within the load balancer's VCN, which its subnets give
+    subnet_ids = list(dict.fromkeys(lb.subnet_ids[0] for lb in load_balancers if lb.subnet_ids))
+    subnets = yield [tolerant(call("network", "get_subnet", subnet_id)) for subnet_id in subnet_ids]
+    vcn_ids = {}
+    for subnet_id, subnet in zip(subnet_ids, subnets):
+        if isinstance(subnet, oci.exceptions.ServiceError):
+            result.failed.add(f"load balancer subnet {subnet_id}")
+        else:
+            vcn_ids[subnet_id] = subnet.vcn_id
+    for lb in load_balancers:
+        result.nodes.append((lb.id, "load_balancer", lb.lifecycle_state == "ACTIVE", False, describe(compartment, lb)))
+        vcn_id = vcn_ids.get(lb.subnet_ids[0]) if lb.subnet_ids else None
+        for name, backend_set in (lb.backend_sets or {}).items():
+            backend_set_id = f"{lb.id}/backendSets/{name}"
+            result.nodes.append((backend_set_id, "backend_set", True, False, None))
+            result.edges.append((lb.id, backend_set_id))
+            if vcn_id is None:
+                continue
+            for backend in backend_set.backends or []:
+                # The backend's address joins it to the private IP that serves it. Only that private
+                # IP's listing makes the address live: an address no private IP holds stays a dead
+                # end, so two load balancers sharing a stale backend do not keep each other in use.
+                result.edges.append((backend_set_id, ip_node(vcn_id, backend.ip_address)))
+    return result
+
+
+def scan_file_systems(session, compartment, availability_domain):
+    result = ScanResult()
+    file_systems, mount_targets = yield [
+        listing("file_storage", "list_file_systems", compartment_id=compartment["id"], availability_domain=availability_domain),
+        listing("file_storage", "list_mount_targets", compartment_id=compartment["id"], availability_domain=availability_domain)
+    ]
+    for fs in file_systems:
+        # Metered bytes are what the file system is billed for, reported in GB like volumes
+        details = describe(compartment, fs, size_in_gbs=(fs.metered_bytes or 0) / 2 ** 30)
+        result.nodes.append((fs.id, "file_system", fs.lifecycle_state == "ACTIVE", False, details))
+
+    for mount_target in mount_targets:
+        result.nodes.append((mount_target.id, "mount_target", mount_target.lifecycle_state == "ACTIVE", True, None))
+        if mount_target.export_set_id:
+            result.nodes.append((mount_target.export_set_id, "export_set", True, False, None))
+            result.edges.append((mount_target.id, mount_target.export_set_id))
+    return result
+
+
+def scan_exports(session, compartment):
+    result = ScanResult()
+    exports = yield listing("file_storage", "list_exports", compartment_id=compartment["id"])
+    for export in exports:
+        result.nodes.append((export.id, "export", export.lifecycle_state == "ACTIVE", False, None))
+        result.edges.append((export.id, export.file_system_id))
+        result.edges.append((export.id, export.export_set_id))
+    return result
+
+
+def scan_vcns(session, compartment):
+    result = ScanResult()
+    vcns = yield listing("network", "list_vcns", compartment_id=compartment["id"])
+    for vcn in vcns:
+        result.nodes.append((vcn.id, "vcn", vcn.lifecycle_state == "AVAILABLE", True, None))
+    return result
+
+
+def scan_drgs(session, compartment):
+    result = ScanResult()
+    drgs, attachments = yield [
+        listing("network", "list_drgs", compartment_id=compartment["id"]),
+        # Only VCN attachments are listed unless every type is asked for
+        listing("network", "list_drg_attachments", compartment_id=compartment["id"], attachment_type="ALL")
+    ]
+    for drg in drgs:
+        result.nodes.append((drg.id, "drg", drg.lifecycle_state == "AVAILABLE", False, describe(compartment, drg)))
+    for attachment in attachments:
+        # Any live attachment (VCN, IPSec tunnel, virtual circuit, remote peering) puts its DRG in use
+        network_id = attachment.network_details.id if attachment.network_details else attachment.vcn_id
+        result.nodes.append((attachment.id, "drg_attachment", attachment.lifecycle_state in ATTACHED_STATES, True, None))
+        result.edges.append((attachment.id, attachment.drg_id))
+        result.edges.append((attachment.id, network_id))
+    return result
+
+
+def scan_backups(session, compartment):
+    result = ScanResult()
+    volume_backups, boot_volume_backups = yield [
+        listing("blockstorage", "list_volume_backups", compartment_id=compartment["id"]),
+        listing("blockstorage", "list_boot_volume_backups", compartment_id=compartment["id"])
+    ]
+    result.backups = backup_records(volume_backups, boot_volume_backups)
+    return result
+
+
+def scan_buckets(session, compartment):
+    result = ScanResult()
+    namespace = session["namespace"]
+    bucket_cache = session["buckets"]
+    buckets = yield listing("object_storage", "list_buckets", namespace, compartment_id=compartment["id"])
+    bucket_cache.prefetch(bucket.name for bucket in buckets)
+    for bucket in buckets:
+        bucket_details = bucket_cache.get(bucket.name)
+        if bucket_details is None:
+            # The bucket exists but its size and count could not be read
+            result.rows.append(("Unused Storage", [
+                compartment["name"], bucket.name, "Object Storage", None, "Available",
+                format_time(bucket.time_created), UNKNOWN
+            ]))
+            continue
+        bucket_size = bucket_details["approximate_size"] or 0
+        remarks = "Unused" if bucket_details["approximate_count"] == 0 else "Active"
+        result.rows.append(("Unused Storage", [
+            compartment["name"], bucket.name, "Object Storage",
+            bucket_size / (1024 * 1024 * 1024), "Available",
+            format_time(bucket.time_created), remarks
+        ]))
+    return result
+
+
+COMPARTMENT_SCANS = [
+    scan_volumes, scan_volume_attachments, scan_instances, scan_buckets, scan_vnic_attachments,
+    scan_private_ips, scan_public_ips, scan_load_balancers, scan_exports, scan_vcns, scan_drgs, scan_backups
+]
+AD_SCANS = [scan_boot_volumes, scan_file_systems]
+
+# Reported kinds whose verdict depends on each scan's nodes or edges. When a scan fails, these
+# kinds are reported as unknown instead of orphaned, since what would reach them is missing.
+DEPENDENT_KINDS = {
+    scan_volumes: ("volume_backup",),
+    scan_volume_attachments: ("volume",),
+    scan_instances: ("volume", "boot_volume", "vnic"),
+    scan_vnic_attachments: ("vnic",),
+    scan_private_ips: ("public_ip", "load_balancer"),
+    scan_load_balancers: ("load_balancer",),
+    scan_exports: ("file_system",),
+    scan_vcns: ("drg",),
+    scan_drgs: ("drg",),
+    scan_boot_volumes: ("boot_volume", "boot_volume_backup"),
+    scan_file_systems: ("file_system",),
+    scan_backups: ("volume", "boot_volume", "volume_backup", "boot_volume_backup")
+}
+BACKUP_KINDS = {"Volume Backup": "volume_backup", "Boot Volume Backup": "boot_volume_backup"}
+UNKNOWN = "Unknown (a related listing failed)"
+# Scans that append report rows directly leave one placeholder row per failed compartment, so
+# the compartment's backups or buckets show up as unknown instead of vanishing from the report
+UNLISTED_ROWS = {
+    scan_backups: ("Orphaned Backups", ["Unknown", "", "", None, "", "", UNKNOWN]),
+    scan_buckets: ("Unused Storage", ["Unknown", "Object Storage", None, "", "", UNKNOWN])
+}
+
+
+def compartment_units(session, compartment):
+    # Every (compartment, listing) and (compartment, AD, listing) pair is an independent unit of work
+    units = [(scan, (session, compartment)) for scan in COMPARTMENT_SCANS]
+    for ad in session["availability_domains"]:
+        units.extend((scan, (session, compartment, ad)) for scan in AD_SCANS)
+    return units
+
+
+def scan_with_threads(clients, session, compartments):
+    # Results are yielded in submission order so rows keep the same compartment ordering as a serial scan
+    with ThreadPoolExecutor(max_workers=MAX_WORKERS) as executor:
+        futures = [
+            (compartment, scan, executor.submit(run_scan, scan, clients, *args))
+            for compartment in compartments for scan, args in compartment_units(session, compartment)
+        ]
+        for compartment, scan, future in futures:
+            try:
+                yield compartment, scan, future.result()
+            except oci.exceptions.ServiceError as e:
+                yield compartment, scan, e
+
+
+def scan_with_asyncio(config, session, compartments, max_in_flight, endpoint):
+    # All compartments share one connection pool; a scan that failed comes back as its service error
+    results = run_compartment_scans(
+        config, CLIENT_CLASSES, compartments, lambda compartment: compartment_units(session, compartment),
+        max_in_flight, endpoint
+    )
+    for compartment, compartment_results in zip(compartments, results):
+        for (scan, _), result in zip(compartment_units(session, compartment), compartment_results):
+            yield compartment, scan, result
+
+
+def report_rows(kind, ocid, details, in_use, backup_index, unknown=()):
+    # Sheet and row for a graph node, or None when the resource is not reported. Kinds in unknown
+    # had a scan fail that could have reached them, so they are not called unused.
+    d = details
+    state = d.lifecycle_state
+    if kind in ("volume", "boot_volume") and state == "AVAILABLE" and not in_use:
+        remarks = "Unattached" if kind == "volume" else "Unattached boot volume"
+        remarks = UNKNOWN if kind in unknown else remarks
+        return "Unattached Volumes", [
+            d.compartment, d.display_name, ocid, d.size_in_gbs, state, format_time(d.time_created),
+            backup_index.last_backup_label(ocid, format_time), remarks, backup_index.policy_label(ocid)
+        ]
+    if kind == "file_system":
+        remarks = "In Use" if in_use else UNKNOWN if kind in unknown else "Unused (no export on a mount target)"
+        return "Unused Storage", [d.compartment, d.display_name, "File Storage", d.size_in_gbs, state, format_time(d.time_created), remarks]
+    if kind == "vnic" and not in_use:
+        return "Unattached VNICs", [d.compartment, d.display_name, d.attachment_id, state, format_time(d.time_created),
+                                    UNKNOWN if kind in unknown else "Unattached"]
+    if kind == "load_balancer" and (state in ("TERMINATED", "FAILED") or not in_use):
+        remarks = "Orphaned" if state in ("TERMINATED", "FAILED") else UNKNOWN if kind in unknown else "No backends on live private IPs"
+        return "Orphaned Load Balancers", [d.compartment, d.display_name, ocid, state, format_time(d.time_created), remarks]
+    if kind == "public_ip" and state not in ("TERMINATING", "TERMINATED") and not in_use:
+        return "Unused Public IPs", [d.compartment, d.display_name, d.assigned_to or "Unassigned", state, format_time(d.time_created),
+                                     UNKNOWN if kind in unknown else "Unused"]
+    if kind == "drg" and (state != "AVAILABLE" or not in_use):
+        remarks = "Inactive" if state != "AVAILABLE" else UNKNOWN if kind in unknown else "No attachments"
+        return "Inactive DRGs & VPNs", [d.compartment, d.display_name, "DRG", state, format_time(d.time_created), remarks]
+    return None
+
+
+def collect_unused_resources(backend="threads", max_in_flight=MAX_IN_FLIGHT, endpoint=None):
     config = oci.config.from_file()
-    identity_client = oci.identity.IdentityClient(config)
-    blockstorage_client = oci.core.BlockstorageClient(config)
-    compute_client = oci.core.ComputeClient(config)
-    network_client = oci.core.VirtualNetworkClient(config)
-    object_storage_client = oci.object_storage.ObjectStorageClient(config)
-    file_storage_client = oci.file_storage.FileStorageClient(config)
-    compute_management_client = oci.core.ComputeManagementClient(config)
-    load_balancer_client = oci.load_balancer.LoadBalancerClient(config)
-    
+    # An endpoint override sends every service to one URL, e.g. a local stand-in server
+    client_kwargs = {"service_endpoint": endpoint} if endpoint else {}
+    identity_client = get_client(oci.identity.IdentityClient, config, **client_kwargs)
+    clients = {key: get_client(client_class, config, **client_kwargs) for key, client_class in CLIENT_CLASSES.items()}
+
     tenancy_id = config["tenancy"]
     print("Fetching compartments...")
-    compartments = identity_client.list_compartments(
-        tenancy_id, compartment_id_in_subtree=True
-    ).data
-    
-    availability_domains = identity_client.list_availability_domains(tenancy_id).data
-    
+    compartments = [c for c in fetch_compartments(identity_client, tenancy_id) if c["lifecycle_state"] == "ACTIVE"]
+
+    # Session constants are looked up once and shared by every unit of work
+    namespace = clients["object_storage"].get_namespace().data
+    session = {
+        "namespace": namespace,
+        "availability_domains": [ad.name for ad in identity_client.list_availability_domains(tenancy_id).data],
+        "buckets": BucketCache(clients["object_storage"], namespace, config["region"])
+    }
+
     # Create an Excel workbook
     workbook = openpyxl.Workbook()
-    
+
     # Define sheet names
     sheets = {
-        "Unattached Volumes": ["Compartment", "Volume Name", "Volume OCID", "Size (GB)", "State", "Created Time", "Last Backup Time", "Remarks"],
-        "Orphaned Instances": ["Compartment", "Instance Name", "Instance OCID", "State", "Shape", "Created Time", "Remarks"],
+        "Unattached Volumes": ["Compartment", "Volume Name", "Volume OCID", "Size (GB)", "State", "Created Time", "Last Backup Time", "Remarks", "Backup Policy"],
+        "Orphaned Instances": ["Compartment", "Instance Name", "Instance OCID", "State", "Shape", "Created Time", "Remarks", "OCPUs", "Memory (GB)"],
         "Unused Storage": ["Compartment", "Bucket Name / File System", "Type", "Size (GB)", "State", "Created Time", "Remarks"],
         "Unattached VNICs": ["Compartment", "VNIC Name", "VNIC OCID", "State", "Created Time", "Remarks"],
         "Orphaned Load Balancers": ["Compartment", "Load Balancer Name", "Load Balancer OCID", "State", "Created Time", "Remarks"],
         "Unused Public IPs": ["Compartment", "Public IP", "Assigned To", "State", "Created Time", "Remarks"],
-        "Inactive DRGs & VPNs": ["Compartment", "Resource Name", "Type", "State", "Created Time", "Remarks"]
+        "Inactive DRGs & VPNs": ["Compartment", "Resource Name", "Type", "State", "Created Time", "Remarks"],
+        "Orphaned Backups": ["Compartment", "Backup Name", "Backup OCID", "Type", "Size (GB)", "Created Time", "Source Volume OCID", "Remarks"]
     }
 
     sheet_objects = {}
@@ -43,95 +421,87 @@ def collect_unused_resources():
         for cell in sheet[1]:
             cell.font = Font(bold=True)
         sheet_objects[sheet_name] = sheet
-    
+
     # Remove default sheet
     workbook.remove(workbook["Sheet"])
 
-    for compartment in compartments:
-        print(f"Checking compartment: {compartment.name}")
-        
-        # Unattached Volumes
-        volumes = blockstorage_client.list_volumes(compartment_id=compartment.id).data
-        for volume in volumes:
-            if volume.lifecycle_state != "AVAILABLE":
-                continue
-            sheet_objects["Unattached Volumes"].append([
-                compartment.name, volume.display_name, volume.id,
-                volume.size_in_gbs, volume.lifecycle_state,
-                volume.time_created.strftime('%Y-%m-%d %H:%M:%S'), "N/A", "Unattached"
-            ])
-        
-        # Orphaned Compute Instances
-        instances = compute_client.list_instances(compartment_id=compartment.id).data
-        for instance in instances:
-            if instance.lifecycle_state in ["TERMINATED", "STOPPED"]:
-                sheet_objects["Orphaned Instances"].append([
-                    compartment.name, instance.display_name, instance.id,
-                    instance.lifecycle_state, instance.shape,
-                    instance.time_created.strftime('%Y-%m-%d %H:%M:%S'), "Orphaned"
-                ])
-
-        # Unused Object Storage Buckets & File Storage
-        namespace = object_storage_client.get_namespace().data
-        buckets = object_storage_client.list_buckets(namespace, compartment_id=compartment.id).data
-        for bucket in buckets:
-            bucket_details = object_storage_client.get_bucket(namespace, bucket.name).data
-            bucket_size = bucket_details.approximate_size if bucket_details.approximate_size is not None else 0
-            remarks = "Unused" if bucket_details.approximate_count == 0 else "Active"
-            sheet_objects["Unused Storage"].append([
-                compartment.name, bucket.name, "Object Storage", 
-                bucket_size / (1024 * 1024 * 1024), "Available",
-                bucket.time_created.strftime('%Y-%m-%d %H:%M:%S'), remarks
-            ])
-        
-        for ad in availability_domains:
-            file_systems = file_storage_client.list_file_systems(compartment_id=compartment.id, availability_domain=ad.name).data
-            for fs in file_systems:
-                remarks = "Unused" if fs.lifecycle_state == "AVAILABLE" else "In Use"
-                sheet_objects["Unused Storage"].append([
-                    compartment.name, fs.display_name, "File Storage", "N/A", 
-                    fs.lifecycle_state, fs.time_created.strftime('%Y-%m-%d %H:%M:%S'), remarks
-                ])
-        
-        # Unattached VNICs
-        vnic_attachments = compute_client.list_vnic_attachments(compartment_id=compartment.id).data
-        for vnic in vnic_attachments:
-            if vnic.lifecycle_state != "ATTACHED":
-                sheet_objects["Unattached VNICs"].append([
-                    compartment.name, vnic.display_name, vnic.id,
-                    vnic.lifecycle_state, vnic.time_created.strftime('%Y-%m-%d %H:%M:%S'), "Unattached"
-                ])
-        
-        # Orphaned Load Balancers
-        load_balancers = load_balancer_client.list_load_balancers(compartment_id=compartment.id).data
-        for lb in load_balancers:
-            if lb.lifecycle_state in ["TERMINATED", "FAILED"]:
-                sheet_objects["Orphaned Load Balancers"].append([
-                    compartment.name, lb.display_name, lb.id,
-                    lb.lifecycle_state, lb.time_created.strftime('%Y-%m-%d %H:%M:%S'), "Orphaned"
-                ])
-        
-        # Unused Public IPs
-        public_ips = network_client.list_public_ips(scope="REGION", compartment_id=compartment.id).data
-        for ip in public_ips:
-            assigned_to = ip.assigned_entity_id if ip.assigned_entity_id else "Unassigned"
-            sheet_objects["Unused Public IPs"].append([
-                compartment.name, ip.ip_address, assigned_to,
-                ip.lifecycle_state, ip.time_created.strftime('%Y-%m-%d %H:%M:%S'), "Unused"
-            ])
-        
-        # Inactive DRGs & VPNs
-        drgs = network_client.list_drgs(compartment_id=compartment.id).data
-        for drg in drgs:
-            if drg.lifecycle_state != "AVAILABLE":
-                sheet_objects["Inactive DRGs & VPNs"].append([
-                    compartment.name, drg.display_name, "DRG", drg.lifecycle_state,
-                    drg.time_created.strftime('%Y-%m-%d %H:%M:%S'), "Inactive"
-                ])
+    graph = ResourceGraph()
+    backup_index = BackupIndex()
+    reported = []
+    unknown = set()  # Reported kinds a failed scan leaves undecided
+    print(f"Scanning {len(compartments)} compartments...")
+    if backend == "async":
+        scanned = scan_with_asyncio(config, session, compartments, max_in_flight, endpoint)
+    else:
+        scanned = scan_with_threads(clients, session, compartments)
+    for compartment, scan, result in scanned:
+        failed = isinstance(result, oci.exceptions.ServiceError)
+        if failed:
+            print(f"Error in {scan.__name__} for compartment {compartment['name']}: {result.message}")
+        elif result.failed:
+            print(f"Error in {scan.__name__} for compartment {compartment['name']}: could not read {', '.join(sorted(result.failed))}")
+        if failed or result.failed:
+            unknown.update(DEPENDENT_KINDS.get(scan, ()))
+            if scan is scan_backups:
+                backup_index.incomplete = True
+            if scan in UNLISTED_ROWS:
+                sheet_name, placeholder = UNLISTED_ROWS[scan]
+                sheet_objects[sheet_name].append([compartment["name"]] + placeholder)
+        if failed:
+            continue
+        for ocid, kind, live, anchor, details in result.nodes:
+            graph.add_node(ocid, kind, live, anchor, details)
+            if details is not None:
+                reported.append(ocid)
+        for a, b in result.edges:
+            graph.add_edge(a, b)
+        for sheet_name, row in result.rows:
+            sheet_objects[sheet_name].append(row)
+        for record in result.backups:
+            backup_index.add(record)
+    # Bucket details are written to bucket_details.json for the all-resources collector to reuse
+    session["buckets"].close()
+
+    # Orphans are the resources that no in-use anchor (instance, mount target, VCN, private IP) reaches
+    print(f"Resolving {len(graph)} resources in the relationship graph...")
+    reached = graph.reachable()
+
+    # Scheduled backups already prove policy coverage; only the remaining unattached volumes need an exact lookup
+    unprotected = [
+        ocid for ocid in reported
+        if graph.kinds[graph.index[ocid]] in ("volume", "boot_volume") and not reached[graph.index[ocid]]
+        and ocid not in backup_index.scheduled
+    ]
+    backup_index.policies.update(fetch_policy_assignments(clients["blockstorage"], unprotected))
+    for ocid in reported:
+        position = graph.index[ocid]
+        row = report_rows(graph.kinds[position], ocid, graph.details[ocid], bool(reached[position]), backup_index, unknown)
+        if row is not None:
+            sheet_objects[row[0]].append(row[1])
+
+    # Backups whose source volume is gone are joined against every volume seen in the scan; a volume
+    # that is provisioning, restoring or faulty still exists, only a terminated one is gone
+    compartment_names = {c["id"]: c["name"] for c in compartments}
+    existing_volumes = {
+        graph.ids[position] for position, kind in enumerate(graph.kinds)
+        if kind in ("volume", "boot_volume") and graph.details[graph.ids[position]].lifecycle_state != "TERMINATED"
+    }
+    for record in backup_index.orphaned(existing_volumes):
+        sheet_objects["Orphaned Backups"].append([
+            compartment_names.get(record.compartment_id, record.compartment_id), record.name, record.id,
+            record.kind, record.size_in_gbs, format_time(record.time_created), record.source_id,
+            UNKNOWN if BACKUP_KINDS[record.kind] in unknown else "Source volume deleted"
+        ])
 
     # Save the Excel file
     workbook.save("unused_resources_report.xlsx")
     print("Unused resources report saved to unused_resources_report.xlsx")
 
 if __name__ == "__main__":
-    collect_unused_resources()
+    parser = argparse.ArgumentParser(description="Report unused and orphaned OCI resources")
+    parser.add_argument("--backend", choices=["threads", "async"], default="threads",
+                        help="Scan with a thread pool around the SDK, or with asyncio for very large tenancies")
+    parser.add_argument("--max-in-flight", type=int, default=MAX_IN_FLIGHT, help="Concurrent requests with --backend async")
+    parser.add_argument("--endpoint", help="Send every request to this URL instead of the regional endpoints")
+    args = parser.parse_args()
+    collect_unused_resources(args.backend, args.max_in_flight, args.endpoint)
@@ -0,0 +1,112 @@
+from array import array
+from collections import deque
+
+
+class ResourceGraph:
+    # Resources are nodes keyed by OCID, attachments and ownership are undirected edges.
+    # Edges are kept as two flat integer arrays and turned into a CSR adjacency
+    # (offsets + targets) once all bulk listings have been added.
+
+    def __init__(self):
+        self.ids = []
+        self.index = {}
+        self.kinds = []
+        self.live = bytearray()  # Lifecycle state says the resource exists and is usable
+        self.anchor = bytearray()  # Resources that are in use by definition (e.g. instances)
+        self.details = {}
+        self._sources = array("i")
+        self._targets = array("i")
+        self._offsets = None
+        self._adjacency = None
+
+    def __len__(self):
+        return len(self.ids)
+
+    def _node(self, ocid):
+        position = self.index.get(ocid)
+        if position is None:
+            position = self.index[ocid] = len(self.ids)
+            self.ids.append(ocid)
+            self.kinds.append(None)
+            self.live.append(0)
+            self.anchor.append(0)
+        return position
+
+    def add_node(self, ocid, kind, live=True, anchor=False, details=None):
+        position = self._node(ocid)
+        self.kinds[position] = kind
+        self.live[position] = 1 if live else 0
+        self.anchor[position] = 1 if (anchor and live) else 0
+        if details is not None:
+            self.details[ocid] = details
+        self._offsets = None
+        return position
+
+    def add_edge(self, a, b):
+        # Endpoints that were never listed stay as unknown, non-live nodes
+        if not a or not b:
+            return
+        self._sources.append(self._node(a))
+        self._targets.append(self._node(b))
+        self._offsets = None
+
+    def _build(self):
+        count = len(self.ids)
+        degree = array("i", [0]) * (count + 1)
+        for source in self._sources:
+            degree[source + 1] += 1
+        for target in self._targets:
+            degree[target + 1] += 1
+        for position in range(count):
+            degree[position + 1] += degree[position]
+
+        adjacency = array("i", [0]) * (2 * len(self._sources))
+        fill = array("i", degree)
+        for source, target in zip(self._sources, self._targets):
+            adjacency[fill[source]] = target
+            fill[source] += 1
+            adjacency[fill[target]] = source
+            fill[target] += 1
+
+        self._offsets = degree
+        self._adjacency = adjacency
+
+    def neighbors(self, ocid):
+        if self._offsets is None:
+            self._build()
+        position = self.index[ocid]
+        return [self.ids[n] for n in self._adjacency[self._offsets[position]:self._offsets[position + 1]]]
+
+    def reachable(self):
+        # One breadth-first pass from every anchor, only entering live nodes.
+        # Returns a bytearray flag per node; each node and edge is visited at most once.
+        if self._offsets is None:
+            self._build()
+        offsets = self._offsets
+        adjacency = self._adjacency
+        live = self.live
+
+        reached = bytearray(len(self.ids))
+        queue = deque()
+        for position, is_anchor in enumerate(self.anchor):
+            if is_anchor:
+                reached[position] = 1
+                queue.append(position)
+
+        while queue:
+            position = queue.popleft()
+            for neighbor in adjacency[offsets[position]:offsets[position + 1]]:
+                if not reached[neighbor] and live[neighbor]:
+                    reached[neighbor] = 1
+                    queue.append(neighbor)
+        return reached
+
+    def orphans(self, kinds, reached=None):
+        # Live resources of the given kinds that no anchor can reach
+        if reached is None:
+            reached = self.reachable()
+        kinds = set(kinds)
+        return [
+            self.ids[position] for position in range(len(self.ids))
+            if self.kinds[position] in kinds and self.live[position] and not reached[position]
+        ]
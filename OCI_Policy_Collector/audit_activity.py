@@ -0,0 +1,161 @@
+import argparse
+import csv
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime, timedelta, timezone
+
+import oci
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from OCI_Common.clients import get_client
+from OCI_Common.compartments import fetch_compartments
+from OCI_Common.pagination import paginate
+
+MAX_WORKERS = 8
+MAX_SOURCE_IPS = 10  # Distinct IPs kept per principal, so memory stays bounded by principal count
+SLICE_ATTEMPTS = 3  # Tries per (compartment, time slice) on throttling and server errors
+INCOMPLETE = "incomplete"
+
+
+class PrincipalActivity:
+    __slots__ = ("principal_id", "principal_name", "last_seen", "event_count", "source_ips")
+
+    def __init__(self, principal_id, principal_name=None):
+        self.principal_id = principal_id
+        self.principal_name = principal_name
+        self.last_seen = None
+        self.event_count = 0
+        self.source_ips = set()
+
+    def add(self, event_time, ip_address, principal_name=None):
+        self.event_count += 1
+        if self.last_seen is None or (event_time and event_time > self.last_seen):
+            self.last_seen = event_time
+        if principal_name and not self.principal_name:
+            self.principal_name = principal_name
+        if ip_address and len(self.source_ips) < MAX_SOURCE_IPS:
+            self.source_ips.add(ip_address)
+
+    def merge(self, other):
+        self.event_count += other.event_count
+        if other.last_seen and (self.last_seen is None or other.last_seen > self.last_seen):
+            self.last_seen = other.last_seen
+        self.principal_name = self.principal_name or other.principal_name
+        for ip_address in other.source_ips:
+            if len(self.source_ips) >= MAX_SOURCE_IPS:
+                break
+            self.source_ips.add(ip_address)
+
+
+def time_slices(start_time, end_time, slice_hours):
+    slices = []
+    current = start_time
+    step = timedelta(hours=slice_hours)
+    while current < end_time:
+        slices.append((current, min(current + step, end_time)))
+        current += step
+    return slices
+
+
+def scan_slice(audit_client, compartment_id, start_time, end_time):
+    # Page through one (compartment, time slice) and fold events into per-principal totals
+    activity = {}
+    events = paginate(
+        audit_client.list_events,
+        compartment_id=compartment_id, start_time=start_time, end_time=end_time
+    )
+    for event in events:
+        identity = event.data.identity if event.data else None
+        if identity is None or not identity.principal_id:
+            continue
+        record = activity.get(identity.principal_id)
+        if record is None:
+            record = activity[identity.principal_id] = PrincipalActivity(identity.principal_id)
+        record.add(event.event_time, identity.ip_address, identity.principal_name)
+    return activity
+
+
+def scan_slice_with_retries(audit_client, compartment_id, start_time, end_time, attempts=SLICE_ATTEMPTS):
+    # A throttled or failed slice is scanned again from its start, after a growing pause
+    for attempt in range(attempts):
+        try:
+            return scan_slice(audit_client, compartment_id, start_time, end_time)
+        except oci.exceptions.ServiceError as e:
+            if attempt + 1 == attempts or (e.status != 429 and e.status < 500):
+                raise
+            time.sleep(2 ** attempt)
+
+
+def collect_last_activity(config, days=7, slice_hours=6, compartment_ids=None, max_workers=MAX_WORKERS):
+    audit_client = get_client(oci.audit.AuditClient, config)
+    if compartment_ids is None:
+        identity_client = get_client(oci.identity.IdentityClient, config)
+        compartment_ids = [
+            row["id"] for row in fetch_compartments(identity_client, config["tenancy"])
+            if row["lifecycle_state"] == "ACTIVE"
+        ]
+
+    end_time = datetime.now(timezone.utc)
+    slices = time_slices(end_time - timedelta(days=days), end_time, slice_hours)
+    print(f"Scanning audit events: {len(compartment_ids)} compartments x {len(slices)} time slices...")
+
+    # Returns (activity per principal, failed (compartment, start, end) slices). Principals can act in
+    # any compartment, so after a failed slice no one's last activity is known for certain.
+    activity = {}
+    failed = []
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = {
+            executor.submit(scan_slice_with_retries, audit_client, compartment_id, start, end): (compartment_id, start, end)
+            for compartment_id in compartment_ids
+            for start, end in slices
+        }
+        for future in as_completed(futures):
+            try:
+                partial = future.result()
+            except oci.exceptions.ServiceError as e:
+                compartment_id, start, end = futures[future]
+                print(f"Audit query failed for {compartment_id} from {start:%Y-%m-%d %H:%M} to {end:%Y-%m-%d %H:%M}: {e.message}")
+                failed.append(futures[future])
+                continue
+            for principal_id, record in partial.items():
+                if principal_id in activity:
+                    activity[principal_id].merge(record)
+                else:
+                    activity[principal_id] = record
+    if failed:
+        print(f"{len(failed)} of {len(futures)} Audit queries failed; last activity is {INCOMPLETE}")
+    return activity, failed
+
+
+def write_activity_csv(activity, path, incomplete=False):
+    # After a failed slice a principal may have acted later than shown, or at all
+    with open(path, mode="w", newline="") as file:
+        writer = csv.writer(file)
+        writer.writerow(["Principal Name", "Principal OCID", "Last Seen", "Event Count", "Source IPs"])
+        for record in sorted(activity.values(), key=lambda r: r.last_seen or datetime.min.replace(tzinfo=timezone.utc), reverse=True):
+            writer.writerow([
+                record.principal_name, record.principal_id,
+                (record.last_seen.strftime('%Y-%m-%d %H:%M:%S') if record.last_seen else "N/A") + (f" ({INCOMPLETE})" if incomplete else ""),
+                record.event_count, ", ".join(sorted(record.source_ips))
+            ])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Summarize OCI Audit events into per-principal last activity")
+    parser.add_argument("--days", type=int, default=7, help="Window to scan, in days (Audit keeps up to 365)")
+    parser.add_argument("--slice-hours", type=int, default=6, help="Size of each parallel time slice")
+    parser.add_argument("--workers", type=int, default=MAX_WORKERS)
+    parser.add_argument("--output", default="principal_activity.csv")
+    args = parser.parse_args()
+
+    config = oci.config.from_file()
+    activity, failed = collect_last_activity(config, args.days, args.slice_hours, max_workers=args.workers)
+    write_activity_csv(activity, args.output, incomplete=bool(failed))
+    print(f"Activity for {len(activity)} principals saved to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,230 @@
+import argparse
+import json
+import re
+
+import oci
+import pandas as pd
+
+from policy_index import PolicyIndex, load_policy_rows
+
+TOKEN_PATTERN = re.compile(r"\s*(\{|\}|,|!=|=|'[^']*'|\"[^\"]*\"|[^\s{},=!]+)")
+
+
+class RuleParseError(ValueError):
+    pass
+
+
+class Match:
+    __slots__ = ("variable", "value", "negate")
+
+    def __init__(self, variable, value, negate=False):
+        self.variable = variable
+        self.value = value
+        self.negate = negate
+
+    def evaluate(self, inventory):
+        matched = inventory.lookup(self.variable, self.value)
+        return inventory.all_ids - matched if self.negate else matched
+
+
+class AllOf:
+    __slots__ = ("children",)
+
+    def __init__(self, children):
+        self.children = children
+
+    def evaluate(self, inventory):
+        result = None
+        # Stop as soon as the intersection is empty
+        for child in self.children:
+            matched = child.evaluate(inventory)
+            result = matched if result is None else result & matched
+            if not result:
+                return set()
+        return result if result is not None else set()
+
+
+class AnyOf:
+    __slots__ = ("children",)
+
+    def __init__(self, children):
+        self.children = children
+
+    def evaluate(self, inventory):
+        result = set()
+        for child in self.children:
+            result |= child.evaluate(inventory)
+        return result
+
+
+def tokenize(rule):
+    tokens = []
+    position = 0
+    rule = rule.strip()
+    while position < len(rule):
+        match = TOKEN_PATTERN.match(rule, position)
+        if not match:
+            raise RuleParseError(f"Unexpected character at {position} in '{rule}'")
+        tokens.append(match.group(1))
+        position = match.end()
+    return tokens
+
+
+def compile_rule(rule):
+    # Compile a matching rule such as ANY {instance.compartment.id = 'x', tag.ns.key.value = 'y'}
+    tokens = tokenize(rule)
+    predicate, position = _parse_rule(tokens, 0)
+    if position != len(tokens):
+        raise RuleParseError(f"Unexpected '{tokens[position]}' in '{rule}'")
+    return predicate
+
+
+def _parse_rule(tokens, position):
+    if position >= len(tokens):
+        raise RuleParseError("Unexpected end of rule")
+
+    keyword = tokens[position].upper()
+    if keyword in ("ALL", "ANY") and position + 1 < len(tokens) and tokens[position + 1] == "{":
+        children = []
+        position += 2
+        while True:
+            child, position = _parse_rule(tokens, position)
+            children.append(child)
+            if position >= len(tokens):
+                raise RuleParseError("Missing '}'")
+            if tokens[position] == "}":
+                position += 1
+                break
+            if tokens[position] != ",":
+                raise RuleParseError(f"Expected ',' but found '{tokens[position]}'")
+            position += 1
+        return (AllOf(children) if keyword == "ALL" else AnyOf(children)), position
+
+    if position + 2 >= len(tokens) or tokens[position + 1] not in ("=", "!="):
+        raise RuleParseError(f"Expected a condition at '{tokens[position]}'")
+    variable = tokens[position].lower()
+    value = tokens[position + 2].strip("'\"")
+    return Match(variable, value, negate=tokens[position + 1] == "!="), position + 3
+
+
+class InstanceInventory:
+    # Compartment, id and tag indexes over the instance inventory, so each rule term is one lookup
+
+    def __init__(self, instances):
+        self.instances = {}
+        self.all_ids = set()
+        self.by_compartment = {}
+        self.by_tag = {}
+        self.warnings = set()
+
+        for instance in instances:
+            instance_id = instance["id"]
+            self.instances[instance_id] = instance
+            self.all_ids.add(instance_id)
+            self.by_compartment.setdefault(instance.get("compartment_id"), set()).add(instance_id)
+            for namespace, tags in (instance.get("defined_tags") or {}).items():
+                for key, value in tags.items():
+                    self.by_tag.setdefault((namespace.lower(), key.lower(), str(value)), set()).add(instance_id)
+
+    def lookup(self, variable, value):
+        if variable in ("instance.id", "resource.id"):
+            return {value} if value in self.all_ids else set()
+        if variable in ("instance.compartment.id", "resource.compartment.id"):
+            return self.by_compartment.get(value, set())
+        if variable == "resource.type":
+            return self.all_ids if value.lower() == "instance" else set()
+        if variable.startswith("tag.") and variable.endswith(".value"):
+            parts = variable.split(".")
+            if len(parts) == 4:
+                return self.by_tag.get((parts[1], parts[2], value), set())
+        self.warnings.add(variable)
+        return set()
+
+
+def load_instances(path):
+    # Compute instances from the oci_resources.json written by collector_all_resorces.py
+    with open(path) as file:
+        data = json.load(file)
+    instances = []
+    for compartment, resource_data in data.get("resources", data).items():
+        for item in resource_data.get("Compute Instances", []):
+            instances.append(dict(item, compartment=compartment))
+    return instances
+
+
+def fetch_dynamic_groups(identity_client, tenancy_id):
+    # Dynamic groups always live in the tenancy root
+    return oci.pagination.list_call_get_all_results(identity_client.list_dynamic_groups, tenancy_id).data
+
+
+def resolve_membership(dynamic_groups, inventory):
+    # Returns {group name: set of instance ids} and any rules that failed to compile
+    membership = {}
+    errors = []
+    for group in dynamic_groups:
+        try:
+            predicate = compile_rule(group.matching_rule)
+        except RuleParseError as e:
+            errors.append((group.name, str(e)))
+            continue
+        membership[group.name] = predicate.evaluate(inventory)
+    return membership, errors
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Resolve dynamic group membership for the compute inventory")
+    parser.add_argument("--inventory", default="oci_resources.json", help="Output of collector_all_resorces.py")
+    parser.add_argument("--policies", help="Policy export to list the statements each dynamic group receives")
+    parser.add_argument("--output", default="dynamic_group_membership.xlsx")
+    args = parser.parse_args()
+
+    config = oci.config.from_file()
+    identity_client = oci.identity.IdentityClient(config)
+    print("Fetching dynamic groups...")
+    dynamic_groups = fetch_dynamic_groups(identity_client, config["tenancy"])
+
+    instances = load_instances(args.inventory)
+    inventory = InstanceInventory(instances)
+    membership, errors = resolve_membership(dynamic_groups, inventory)
+    for name, error in errors:
+        print(f"Skipped dynamic group '{name}': {error}")
+    for variable in sorted(inventory.warnings):
+        print(f"Unsupported rule variable '{variable}' never matches an instance")
+
+    policy_index = None
+    if args.policies:
+        policy_index = PolicyIndex.from_rows(load_policy_rows(args.policies))
+
+    group_rows = []
+    for group in dynamic_groups:
+        statements = policy_index.query(dynamic_group=group.name) if policy_index else []
+        group_rows.append({
+            "Dynamic Group": group.name,
+            "Dynamic Group OCID": group.id,
+            "Matching Rule": group.matching_rule,
+            "Member Instances": len(membership.get(group.name, ())),
+            "Policy Statements": "\n".join(s.text for s in statements)
+        })
+
+    instance_groups = {}
+    for name, members in membership.items():
+        for instance_id in members:
+            instance_groups.setdefault(instance_id, []).append(name)
+
+    instance_rows = []
+    for instance in instances:
+        instance_rows.append({
+            "Compartment": instance["compartment"],
+            "Instance Name": instance.get("name"),
+            "Instance OCID": instance["id"],
+            "Dynamic Groups": ", ".join(sorted(instance_groups.get(instance["id"], []))) or "None"
+        })
+
+    with pd.ExcelWriter(args.output) as writer:
+        pd.DataFrame(group_rows).to_excel(writer, sheet_name="Dynamic Groups", index=False)
+        pd.DataFrame(instance_rows).to_excel(writer, sheet_name="Instance Membership", index=False)
+    print(f"Dynamic group membership saved to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,58 +1,115 @@
+import argparse
+import os
+import sys
 import oci
 import csv
 import openpyxl
+from concurrent.futures import ThreadPoolExecutor
 from openpyxl.styles import Font
 
-def list_iam_users_and_groups():
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from OCI_Common.clients import get_client
+from OCI_Common.pagination import paginate
+from audit_activity import INCOMPLETE, collect_last_activity
+from dynamic_groups import fetch_dynamic_groups
+
+MAX_WORKERS = 8
+
+
+def fetch_user_credentials(identity_client, user_id):
+    # API keys and auth tokens are capped per user, so these calls are not paginated
+    try:
+        api_keys = identity_client.list_api_keys(user_id).data
+        auth_tokens = identity_client.list_auth_tokens(user_id).data
+    except oci.exceptions.ServiceError as e:
+        print(f"Could not fetch credentials for user {user_id}: {e.message}")
+        return "N/A", "N/A"
+    active_keys = sum(1 for key in api_keys if key.lifecycle_state == "ACTIVE")
+    active_tokens = sum(1 for token in auth_tokens if token.lifecycle_state == "ACTIVE")
+    return active_keys, active_tokens
+
+
+def fetch_group_members(identity_client, tenancy_id, group_id):
+    # Membership listings need a user or a group, so they are listed per group
+    try:
+        return [member.user_id for member in paginate(
+            identity_client.list_user_group_memberships, compartment_id=tenancy_id, group_id=group_id
+        )]
+    except oci.exceptions.ServiceError as e:
+        print(f"Could not fetch members of group {group_id}: {e.message}")
+        return []
+
+
+def list_iam_users_and_groups(audit_days=None):
     config = oci.config.from_file()
-    identity_client = oci.identity.IdentityClient(config)
+    identity_client = get_client(oci.identity.IdentityClient, config)
     tenancy_id = config["tenancy"]
-    
+
     print("Fetching users...")
-    users = identity_client.list_users(tenancy_id).data
+    users = oci.pagination.list_call_get_all_results(identity_client.list_users, tenancy_id).data
     print("Fetching groups...")
-    groups = identity_client.list_groups(tenancy_id).data
+    groups = oci.pagination.list_call_get_all_results(identity_client.list_groups, tenancy_id).data
     print("Fetching policies...")
-    policies = identity_client.list_policies(tenancy_id).data
-    
+    policies = oci.pagination.list_call_get_all_results(identity_client.list_policies, tenancy_id).data
+    print("Fetching dynamic groups...")
+    dynamic_groups = fetch_dynamic_groups(identity_client, tenancy_id)
+
+    # Group memberships, one paginated listing per group, fetched concurrently
+    print("Fetching group memberships...")
     user_group_map = {}
-    for group in groups:
-        group_members = identity_client.list_user_group_memberships(compartment_id=tenancy_id, group_id=group.id).data
-        for member in group_members:
-            user_group_map.setdefault(member.user_id, []).append(group.name)
-    
-    print("Fetching user last login info...")
-    auth_client = oci.identity.IdentityClient(config)
-    
+    with ThreadPoolExecutor(max_workers=MAX_WORKERS) as executor:
+        members = executor.map(lambda group: fetch_group_members(identity_client, tenancy_id, group.id), groups)
+        for group, user_ids in zip(groups, members):
+            for user_id in user_ids:
+                user_group_map.setdefault(user_id, []).append(group.name)
+
+    print("Fetching user credentials...")
+    with ThreadPoolExecutor(max_workers=MAX_WORKERS) as executor:
+        credentials = dict(zip(
+            (user.id for user in users),
+            executor.map(lambda user: fetch_user_credentials(identity_client, user.id), users)
+        ))
+
+    # Real last activity comes from Audit events, which is opt-in because large tenancies log millions per day
+    activity, failed_slices = {}, []
+    if audit_days:
+        activity, failed_slices = collect_last_activity(config, days=audit_days)
+
     # Create an Excel workbook
     workbook = openpyxl.Workbook()
-    
+
     # Create IAM Users sheet
     user_sheet = workbook.active
     user_sheet.title = "IAM Users"
-    user_headers = ["User Name", "User OCID", "Status", "Groups", "Last Login", "Remarks"]
+    user_headers = ["User Name", "User OCID", "Status", "Groups", "Last Login", "Remarks", "MFA Enabled", "Active API Keys", "Active Auth Tokens"]
+    if audit_days:
+        user_headers += [f"Last Activity ({audit_days}d Audit)", "Audit Events", "Source IPs"]
     user_sheet.append(user_headers)
-    
+
     # Apply bold font to headers
     for cell in user_sheet[1]:
         cell.font = Font(bold=True)
 
-    row = 2  # Start from the second row (1st row has headers)
-
     for user in users:
-        try:
-            auth_response = auth_client.get_authentication_policy(user.id).data
-            last_login = auth_response.lifecycle_state if auth_response else "N/A"
-        except:
-            last_login = "N/A"
-        
+        last_login = user.last_successful_login_time.strftime('%Y-%m-%d %H:%M:%S') if user.last_successful_login_time else "Never"
         remarks = "Active" if user.lifecycle_state == "ACTIVE" else "Inactive/Disabled"
         groups = ", ".join(user_group_map.get(user.id, ["No Group"]))
-        user_sheet.append([user.name, user.id, user.lifecycle_state, groups, last_login, remarks])
-        row += 1
+        api_keys, auth_tokens = credentials[user.id]
+        mfa = "Yes" if user.is_mfa_activated else "No"
+        row = [user.name, user.id, user.lifecycle_state, groups, last_login, remarks, mfa, api_keys, auth_tokens]
+        if audit_days:
+            # With failed Audit queries, no events is not proof of no activity, and a later event may be missing
+            record = activity.get(user.id)
+            if record is None:
+                row += [f"Unknown ({len(failed_slices)} Audit queries failed)" if failed_slices else "No activity", 0, ""]
+            else:
+                last_seen = record.last_seen.strftime('%Y-%m-%d %H:%M:%S') + (f" ({INCOMPLETE})" if failed_slices else "")
+                row += [last_seen, record.event_count, ", ".join(sorted(record.source_ips))]
+        user_sheet.append(row)
 
     print("Writing IAM policies...")
-    
+
     # Create IAM Policies sheet
     policy_sheet = workbook.create_sheet(title="IAM Policies")
     policy_headers = ["Policy Name", "Statements", "Compartment ID"]
@@ -62,17 +119,27 @@ def list_iam_users_and_groups():
     for cell in policy_sheet[1]:
         cell.font = Font(bold=True)
 
-    row = 2  # Start from the second row
-
     for policy in policies:
         for statement in policy.statements:
             policy_sheet.append([policy.name, statement, policy.compartment_id])
-            row += 1
-    
+
+    # Create Dynamic Groups sheet
+    dynamic_group_sheet = workbook.create_sheet(title="Dynamic Groups")
+    dynamic_group_sheet.append(["Dynamic Group Name", "Dynamic Group OCID", "Matching Rule", "State"])
+
+    # Apply bold font to headers
+    for cell in dynamic_group_sheet[1]:
+        cell.font = Font(bold=True)
+
+    for group in dynamic_groups:
+        dynamic_group_sheet.append([group.name, group.id, group.matching_rule, group.lifecycle_state])
+
     # Save the Excel file
     workbook.save("iam_audit_report.xlsx")
     print("IAM audit report saved to iam_audit_report.xlsx")
 
 if __name__ == "__main__":
-    list_iam_users_and_groups()
-
+    parser = argparse.ArgumentParser(description="Export IAM users, groups and policies")
+    parser.add_argument("--audit-days", type=int, help="Add last activity from this many days of Audit events")
+    args = parser.parse_args()
+    list_iam_users_and_groups(args.audit_days)
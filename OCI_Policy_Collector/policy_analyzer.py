@@ -0,0 +1,175 @@
+import argparse
+import os
+import sys
+import time
+
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from OCI_Common.compartments import CompartmentTree, load_or_fetch_compartments
+from policy_index import PolicyIndex, load_policy_rows
+from policy_parser import ALL_RESOURCES, VERB_RANK, resource_keys
+
+# Identity resources that let the holder grant themselves more access
+ESCALATION_RESOURCES = {"policies", "groups", "users", "dynamic-groups", "compartments", "domains", "identity-providers"}
+
+
+def _subject_keys(subject):
+    # Subjects whose grants also apply to this subject
+    keys = [subject.key(), ("any-user", None)]
+    if subject.kind == "group":
+        keys.append(("any-group", None))
+    return keys
+
+
+def build_coverage(index):
+    # (subject, compartment, resource, conditions) -> (highest verb rank, first statement granting it)
+    coverage = {}
+    entries = []
+    for position, statement in enumerate(index.statements):
+        if not statement.is_grant or statement.verb is None:
+            continue
+        rank = VERB_RANK[statement.verb]
+        for subject in statement.subjects:
+            for resource in statement.resources:
+                key = (subject.key(), statement.compartment_id, resource, statement.conditions)
+                best = coverage.get(key)
+                if best is None or rank > best[0]:
+                    coverage[key] = (rank, position)
+                entries.append((position, subject, resource, rank))
+    return coverage, entries
+
+
+def find_redundant(index):
+    # A statement is redundant when every (subject, resource) pair it grants is already granted,
+    # at the same or a higher verb, by another statement for a covering subject, resource family
+    # and the same or an ancestor compartment. Only indexed keys are probed, never statement pairs.
+    coverage, entries = build_coverage(index)
+    ancestors_cache = {}
+    covered_by = {}
+    uncovered = set()
+
+    for position, subject, resource, rank in entries:
+        if position in uncovered:
+            continue
+        statement = index.statements[position]
+        compartment = statement.compartment_id
+        ancestors = ancestors_cache.get(compartment)
+        if ancestors is None:
+            ancestors = ancestors_cache[compartment] = index.ancestors(compartment)
+
+        conditions = [None] if statement.conditions is None else [None, statement.conditions]
+        cover = None
+        for subject_key in _subject_keys(subject):
+            for location in ancestors:
+                for resource_key in resource_keys(resource):
+                    for condition in conditions:
+                        best = coverage.get((subject_key, location, resource_key, condition))
+                        if best is None or best[0] < rank or best[1] == position:
+                            continue
+                        same_grant = (subject_key == subject.key() and location == compartment
+                                      and resource_key == resource and condition == statement.conditions)
+                        # Exact duplicates keep the first occurrence
+                        if same_grant and (best[0] == rank and best[1] > position):
+                            continue
+                        cover = best[1]
+                        break
+                    if cover is not None:
+                        break
+                if cover is not None:
+                    break
+            if cover is not None:
+                break
+
+        if cover is None:
+            uncovered.add(position)
+            covered_by.pop(position, None)
+        else:
+            covered_by.setdefault(position, cover)
+
+    return [(position, cover) for position, cover in sorted(covered_by.items()) if position not in uncovered]
+
+
+def find_overbroad(index):
+    findings = []
+    root = index.tree.root_id if index.tree else "tenancy"
+    for position, statement in enumerate(index.statements):
+        if not statement.is_grant or statement.verb is None:
+            continue
+        tenancy_wide = statement.compartment_id == root
+        unconditioned = statement.conditions is None
+        kinds = {subject.kind for subject in statement.subjects}
+
+        if statement.verb == "manage" and ALL_RESOURCES in statement.resources and tenancy_wide:
+            findings.append((position, "High", "Manages all resources across the whole tenancy"))
+        elif statement.verb == "manage" and ALL_RESOURCES in statement.resources and unconditioned:
+            findings.append((position, "Medium", "Manages all resources in the compartment tree"))
+
+        if kinds & {"any-user", "any-group"} and VERB_RANK[statement.verb] >= VERB_RANK["use"] and unconditioned:
+            findings.append((position, "High", f"Grants '{statement.verb}' to every principal without conditions"))
+
+        escalation = ESCALATION_RESOURCES.intersection(statement.resources)
+        if statement.verb == "manage" and escalation and "service" not in kinds:
+            findings.append((position, "High", f"Can modify identity resources ({', '.join(sorted(escalation))})"))
+    return findings
+
+
+def analyze(index):
+    redundant = []
+    for position, cover in find_redundant(index):
+        statement = index.statements[position]
+        covering = index.statements[cover]
+        redundant.append({
+            "Policy Name": statement.policy_name,
+            "Statement": statement.text,
+            "Location": index.location_label(statement),
+            "Covered By Policy": covering.policy_name,
+            "Covered By Statement": covering.text
+        })
+
+    overbroad = []
+    for position, severity, reason in find_overbroad(index):
+        statement = index.statements[position]
+        overbroad.append({
+            "Policy Name": statement.policy_name,
+            "Statement": statement.text,
+            "Location": index.location_label(statement),
+            "Severity": severity,
+            "Reason": reason
+        })
+
+    return (
+        pd.DataFrame(redundant, columns=["Policy Name", "Statement", "Location", "Covered By Policy", "Covered By Statement"]),
+        pd.DataFrame(overbroad, columns=["Policy Name", "Statement", "Location", "Severity", "Reason"])
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Find redundant and over-broad OCI policy statements")
+    parser.add_argument("export", help="iam_audit_report.xlsx or tenancy_policies_*.csv/.xlsx")
+    parser.add_argument("--output", default="policy_analysis_report.xlsx")
+    parser.add_argument("--compartments", default="compartments.json",
+                        help="Cached compartment list (fetched from OCI when missing)")
+    parser.add_argument("--offline", action="store_true", help="Do not call OCI, resolve names without a compartment tree")
+    args = parser.parse_args()
+
+    tree = None
+    if not args.offline:
+        tree = CompartmentTree(load_or_fetch_compartments(args.compartments))
+
+    start = time.perf_counter()
+    index = PolicyIndex.from_rows(load_policy_rows(args.export), tree)
+    redundant_df, overbroad_df = analyze(index)
+    elapsed = time.perf_counter() - start
+    print(f"Analyzed {len(index.statements)} statements in {elapsed:.2f}s: "
+          f"{len(redundant_df)} redundant, {len(overbroad_df)} over-broad")
+
+    with pd.ExcelWriter(args.output) as writer:
+        redundant_df.to_excel(writer, sheet_name="Redundant Statements", index=False)
+        overbroad_df.to_excel(writer, sheet_name="Over-broad Grants", index=False)
+    print(f"Policy analysis saved to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,199 @@
+import argparse
+import os
+import sys
+import time
+from collections import defaultdict
+
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from OCI_Common.compartments import CompartmentTree, load_or_fetch_compartments
+from policy_parser import VERBS, PolicyParseError, parse_statement, resource_keys
+
+
+def load_policy_rows(path):
+    # Read (policy name, compartment id, statement) rows from either policy export:
+    # the "IAM Policies" sheet written by policy.py or the tenancy_policies_* CSV/Excel files
+    if path.lower().endswith(".csv"):
+        df = pd.read_csv(path)
+    else:
+        sheets = pd.read_excel(path, sheet_name=None)
+        df = sheets.get("IAM Policies", next(iter(sheets.values())))
+
+    statement_column = "Statement" if "Statement" in df.columns else "Statements"
+    rows = []
+    for record in df.to_dict("records"):
+        statement = record.get(statement_column)
+        if not isinstance(statement, str) or not statement.strip():
+            continue
+        compartment_id = record.get("Compartment ID")
+        rows.append((
+            record.get("Policy Name", "N/A"),
+            compartment_id if isinstance(compartment_id, str) else None,
+            statement.strip()
+        ))
+    return rows
+
+
+class PolicyIndex:
+    def __init__(self, tree=None):
+        self.tree = tree
+        self.statements = []
+        self.errors = []
+
+        # Inverted indexes: key -> set of statement positions
+        self.by_group = defaultdict(set)
+        self.by_dynamic_group = defaultdict(set)
+        self.by_subject_kind = defaultdict(set)
+        self.by_verb = defaultdict(set)
+        self.by_resource = defaultdict(set)
+        self.by_compartment = defaultdict(set)
+        self.by_policy = defaultdict(set)
+
+    @classmethod
+    def from_rows(cls, rows, tree=None):
+        index = cls(tree)
+        for policy_name, compartment_id, text in rows:
+            index.add(text, policy_name, compartment_id)
+        return index
+
+    def _resolve_location(self, statement):
+        location = statement.location
+        policy_compartment = statement.policy_compartment_id or (self.tree.root_id if self.tree else None)
+
+        if location.kind == "tenancy":
+            return self.tree.root_id if self.tree else "tenancy"
+        if self.tree is None:
+            return location.value
+        if location.is_id:
+            return location.value
+
+        # Compartment names are relative to the compartment the policy is attached to
+        resolved = self.tree.resolve(location.value, relative_to=policy_compartment)
+        if resolved is None and policy_compartment in self.tree:
+            parts = location.value.split(":")
+            if parts[0].lower() == self.tree.name[policy_compartment].lower():
+                resolved = policy_compartment if len(parts) == 1 else self.tree.resolve(
+                    ":".join(parts[1:]), relative_to=policy_compartment
+                )
+        return resolved or location.value
+
+    def add(self, text, policy_name=None, policy_compartment_id=None):
+        try:
+            statement = parse_statement(text, policy_name, policy_compartment_id)
+        except PolicyParseError as e:
+            self.errors.append((policy_name, text, str(e)))
+            return None
+
+        position = len(self.statements)
+        self.statements.append(statement)
+        self.by_policy[policy_name].add(position)
+        if not statement.is_grant:
+            return statement
+
+        statement.compartment_id = self._resolve_location(statement)
+        self.by_compartment[statement.compartment_id].add(position)
+
+        for subject in statement.subjects:
+            self.by_subject_kind[subject.kind].add(position)
+            if subject.kind == "group":
+                self.by_group[subject.name].add(position)
+            elif subject.kind == "dynamic-group":
+                self.by_dynamic_group[subject.name].add(position)
+
+        self.by_verb[statement.verb].add(position)
+        for resource in statement.resources:
+            self.by_resource[resource].add(position)
+        for permission in statement.permissions:
+            self.by_resource[permission.lower()].add(position)
+        return statement
+
+    def ancestors(self, compartment):
+        # The compartment and all of its ancestors, since policies inherit down the tree
+        if self.tree is None:
+            return [compartment] if compartment == "tenancy" else [compartment, "tenancy"]
+        compartment_id = self.tree.resolve(compartment) or compartment
+        if compartment_id not in self.tree:
+            return [compartment_id, self.tree.root_id]
+        return self.tree.ancestors(compartment_id)
+
+    def query(self, group=None, dynamic_group=None, compartment=None, resource_type=None, verb=None):
+        candidates = []
+
+        if group is not None:
+            key = group if group.startswith("ocid1.") else group.lower()
+            candidates.append(
+                self.by_group.get(key, set()) | self.by_subject_kind["any-user"] | self.by_subject_kind["any-group"]
+            )
+        if dynamic_group is not None:
+            key = dynamic_group if dynamic_group.startswith("ocid1.") else dynamic_group.lower()
+            candidates.append(self.by_dynamic_group.get(key, set()) | self.by_subject_kind["any-user"])
+        if compartment is not None:
+            positions = set()
+            for key in self.ancestors(compartment):
+                positions |= self.by_compartment.get(key, set())
+            candidates.append(positions)
+        if resource_type is not None:
+            positions = set()
+            for key in resource_keys(resource_type):
+                positions |= self.by_resource.get(key, set())
+            candidates.append(positions)
+        if verb is not None:
+            positions = set()
+            for granted in VERBS[VERBS.index(verb.lower()):]:
+                positions |= self.by_verb.get(granted, set())
+            candidates.append(positions)
+
+        if not candidates:
+            return [s for s in self.statements if s.is_grant]
+
+        # Intersect starting from the smallest posting set
+        candidates.sort(key=len)
+        result = set(candidates[0])
+        for positions in candidates[1:]:
+            result &= positions
+            if not result:
+                break
+        return [self.statements[position] for position in sorted(result)]
+
+    def location_label(self, statement):
+        if self.tree is not None and statement.compartment_id in self.tree:
+            return self.tree.path(statement.compartment_id)
+        return str(statement.location)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Query effective permissions from an OCI policy export")
+    parser.add_argument("export", help="iam_audit_report.xlsx or tenancy_policies_*.csv/.xlsx")
+    parser.add_argument("--group", help="Group name or OCID")
+    parser.add_argument("--dynamic-group", help="Dynamic group name or OCID")
+    parser.add_argument("--compartment", help="Compartment OCID or path such as Prod:App")
+    parser.add_argument("--resource", help="Resource type, for example instances or buckets")
+    parser.add_argument("--verb", choices=["inspect", "read", "use", "manage"], help="Minimum verb")
+    parser.add_argument("--compartments", default="compartments.json",
+                        help="Cached compartment list (fetched from OCI when missing)")
+    parser.add_argument("--offline", action="store_true", help="Do not call OCI, resolve names without a compartment tree")
+    args = parser.parse_args()
+
+    tree = None
+    if not args.offline:
+        tree = CompartmentTree(load_or_fetch_compartments(args.compartments))
+
+    start = time.perf_counter()
+    index = PolicyIndex.from_rows(load_policy_rows(args.export), tree)
+    print(f"Compiled {len(index.statements)} statements in {(time.perf_counter() - start) * 1000:.1f} ms")
+    for policy_name, text, error in index.errors:
+        print(f"Skipped statement in policy '{policy_name}': {error}")
+
+    start = time.perf_counter()
+    matches = index.query(args.group, args.dynamic_group, args.compartment, args.resource, args.verb)
+    elapsed = (time.perf_counter() - start) * 1000
+
+    for statement in matches:
+        print(f"[{statement.policy_name}] ({index.location_label(statement)}) {statement.text}")
+    print(f"{len(matches)} matching statements found in {elapsed:.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,285 @@
+import re
+
+# Verbs in increasing order of access, each one includes the ones before it
+VERBS = ("inspect", "read", "use", "manage")
+VERB_RANK = {verb: rank for rank, verb in enumerate(VERBS)}
+
+ALL_RESOURCES = "all-resources"
+
+# Aggregate resource types and the individual types they cover
+RESOURCE_FAMILIES = {
+    "virtual-network-family": [
+        "vcns", "subnets", "route-tables", "network-security-groups", "security-lists", "dhcp-options",
+        "private-ips", "public-ips", "ipv6s", "internet-gateways", "nat-gateways", "service-gateways",
+        "local-peering-gateways", "remote-peering-connections", "drgs", "drg-attachments", "drg-route-tables",
+        "cpes", "ipsec-connections", "cross-connects", "cross-connect-groups", "virtual-circuits",
+        "vnics", "vnic-attachments", "vtaps", "capture-filters", "byoip-ranges", "public-ip-pools"
+    ],
+    "instance-family": [
+        "instances", "instance-images", "instance-console-connection", "console-histories",
+        "app-catalog-listing", "volume-attachments", "vnic-attachments", "dedicated-vm-hosts"
+    ],
+    "compute-management-family": ["instance-configurations", "instance-pools", "cluster-networks"],
+    "volume-family": [
+        "volumes", "volume-attachments", "volume-backups", "boot-volume-backups", "boot-volumes",
+        "backup-policies", "volume-groups", "volume-group-backups", "volume-backup-policy-assignments"
+    ],
+    "object-family": ["buckets", "objects", "objectstorage-namespaces"],
+    "file-family": ["file-systems", "mount-targets", "export-sets"],
+    "database-family": [
+        "db-systems", "db-nodes", "db-homes", "databases", "backups", "pluggable-databases",
+        "vmclusters", "cloud-exadata-infrastructures", "cloud-vmclusters"
+    ],
+    "autonomous-database-family": [
+        "autonomous-databases", "autonomous-backups", "autonomous-container-databases",
+        "autonomous-exadata-infrastructures", "autonomous-vmclusters"
+    ],
+    "cluster-family": ["clusters", "cluster-node-pools", "cluster-work-requests", "cluster-virtualnode-pools"],
+    "functions-family": ["fn-app", "fn-function", "fn-invocation"],
+    "dns": ["dns-zones", "dns-records", "dns-traffic", "dns-steering-policies", "dns-resolvers", "dns-views"],
+    "secret-family": ["secrets", "secret-versions", "secret-bundles"],
+    "vault-family": ["vaults", "keys", "key-delegate"],
+    "cloud-guard-family": [
+        "cloud-guard-config", "cloud-guard-targets", "cloud-guard-detector-recipes",
+        "cloud-guard-responder-recipes", "cloud-guard-problems", "cloud-guard-resource-types"
+    ],
+    "load-balancers": ["load-balancers"],
+    "repos": ["repos"],
+    "leaf-certificate-family": ["leaf-certificates", "leaf-certificate-versions", "leaf-certificate-bundles"],
+    "certificate-authority-family": ["certificate-authorities", "certificate-authority-bundles"],
+    "log-group-family": ["log-groups", "log-content"],
+    "metrics": ["metrics"],
+    "alarms": ["alarms"],
+    "ons-family": ["ons-topics", "ons-subscriptions"],
+    "stream-family": ["stream-pools", "streams", "stream-push", "stream-pull"],
+    "tag-namespaces": ["tag-namespaces"],
+}
+
+# Individual resource type -> families that include it
+TYPE_FAMILIES = {}
+for _family, _members in RESOURCE_FAMILIES.items():
+    for _member in _members:
+        if _member != _family:
+            TYPE_FAMILIES.setdefault(_member, set()).add(_family)
+
+SUBJECT_KINDS = ("dynamic-group", "group", "service", "resource")
+ANY_SUBJECTS = ("any-user", "any-group")
+
+STATEMENT_PATTERN = re.compile(
+    r"^\s*(allow|endorse|admit|deny)\s+(.+?)\s+to\s+(.+?)\s+in\s+(.+?)(?:\s+where\s+(.+?))?\s*$",
+    re.IGNORECASE | re.DOTALL
+)
+DEFINE_PATTERN = re.compile(r"^\s*define\s+(\S+)\s+(.+?)\s+as\s+(\S+)\s*$", re.IGNORECASE)
+
+
+class Subject:
+    __slots__ = ("kind", "name", "domain", "is_id")
+
+    def __init__(self, kind, name=None, domain=None, is_id=False):
+        self.kind = kind
+        self.name = name
+        self.domain = domain
+        self.is_id = is_id
+
+    def key(self):
+        return (self.kind, self.name)
+
+    def __repr__(self):
+        if self.name is None:
+            return self.kind
+        prefix = f"{self.domain}/" if self.domain else ""
+        return f"{self.kind} {'id ' if self.is_id else ''}{prefix}{self.name}"
+
+
+class Location:
+    __slots__ = ("kind", "value", "is_id")
+
+    def __init__(self, kind, value=None, is_id=False):
+        self.kind = kind  # "tenancy" or "compartment"
+        self.value = value
+        self.is_id = is_id
+
+    def __repr__(self):
+        if self.kind == "tenancy":
+            return "tenancy" if self.value is None else f"tenancy {self.value}"
+        return f"compartment {'id ' if self.is_id else ''}{self.value}"
+
+
+class Statement:
+    __slots__ = (
+        "text", "action", "subjects", "verb", "resources", "permissions",
+        "location", "conditions", "policy_name", "policy_compartment_id", "compartment_id"
+    )
+
+    def __init__(self, text, action, subjects=(), verb=None, resources=(), permissions=(),
+                 location=None, conditions=None, policy_name=None, policy_compartment_id=None):
+        self.text = text
+        self.action = action
+        self.subjects = list(subjects)
+        self.verb = verb
+        self.resources = list(resources)
+        self.permissions = list(permissions)
+        self.location = location
+        self.conditions = conditions
+        self.policy_name = policy_name
+        self.policy_compartment_id = policy_compartment_id
+        self.compartment_id = None  # Filled in when the location is resolved against a compartment tree
+
+    @property
+    def is_grant(self):
+        return self.action in ("allow", "admit")
+
+    def __repr__(self):
+        return f"Statement({self.text!r})"
+
+
+class PolicyParseError(ValueError):
+    pass
+
+
+def _unquote(value):
+    return value.strip().strip("'\"").strip()
+
+
+def split_top_level(text, separator=","):
+    # Split on a separator, ignoring separators inside quotes or braces
+    parts = []
+    depth = 0
+    quote = None
+    current = []
+    for char in text:
+        if quote:
+            if char == quote:
+                quote = None
+        elif char in "'\"":
+            quote = char
+        elif char == "{":
+            depth += 1
+        elif char == "}":
+            depth -= 1
+        elif char == separator and depth == 0:
+            parts.append("".join(current).strip())
+            current = []
+            continue
+        current.append(char)
+    if "".join(current).strip():
+        parts.append("".join(current).strip())
+    return parts
+
+
+def parse_subjects(text):
+    subjects = []
+    kind = None
+    for part in split_top_level(text):
+        lowered = part.lower()
+        if lowered in ANY_SUBJECTS:
+            subjects.append(Subject(lowered))
+            kind = None
+            continue
+
+        words = part.split(None, 1)
+        if words and words[0].lower() in SUBJECT_KINDS:
+            kind = words[0].lower()
+            rest = words[1] if len(words) > 1 else ""
+        elif kind is not None:
+            # "group A, B" reuses the previous subject kind
+            rest = part
+        else:
+            raise PolicyParseError(f"Unrecognised subject '{part}'")
+
+        is_id = False
+        if rest.lower().startswith("id "):
+            is_id = True
+            rest = rest[3:]
+
+        domain = None
+        name = rest.strip()
+        # Identity domain prefix: 'Domain'/'Name' or Domain/Name
+        if not is_id and "/" in name:
+            domain, name = name.split("/", 1)
+            domain = _unquote(domain)
+            if domain.lower() == "default":
+                domain = None
+
+        name = _unquote(name)
+        subjects.append(Subject(kind, name if is_id else name.lower(), domain, is_id))
+    return subjects
+
+
+def parse_location(text):
+    words = text.strip().split(None, 1)
+    kind = words[0].lower()
+    rest = words[1].strip() if len(words) > 1 else None
+
+    if kind == "tenancy":
+        return Location("tenancy", _unquote(rest) if rest else None)
+    if kind == "compartment" and rest:
+        if rest.lower().startswith("id "):
+            return Location("compartment", rest[3:].strip(), is_id=True)
+        return Location("compartment", ":".join(_unquote(p) for p in rest.split(":")))
+    raise PolicyParseError(f"Unrecognised location '{text}'")
+
+
+def parse_statement(text, policy_name=None, policy_compartment_id=None):
+    define = DEFINE_PATTERN.match(text)
+    if define:
+        return Statement(
+            text, "define", subjects=[Subject(define.group(1).lower(), _unquote(define.group(2)))],
+            location=Location("tenancy", define.group(3)),
+            policy_name=policy_name, policy_compartment_id=policy_compartment_id
+        )
+
+    match = STATEMENT_PATTERN.match(text)
+    if not match:
+        raise PolicyParseError(f"Unrecognised statement '{text}'")
+
+    action, subject_text, grant_text, location_text, conditions = match.groups()
+
+    # "Admit group X of tenancy Y" names the foreign tenancy after the subject
+    subject_text = re.split(r"\s+of\s+tenancy\s+", subject_text, flags=re.IGNORECASE)[0]
+
+    verb = None
+    resources = []
+    permissions = []
+    grant_text = grant_text.strip()
+    if grant_text.startswith("{"):
+        permissions = [p.strip().upper() for p in grant_text.strip("{}").split(",") if p.strip()]
+    else:
+        words = grant_text.split()
+        verb = words[0].lower()
+        if verb not in VERB_RANK:
+            raise PolicyParseError(f"Unrecognised verb '{words[0]}'")
+        resources = [w.lower() for w in words[1:]] or [ALL_RESOURCES]
+
+    return Statement(
+        text,
+        action.lower(),
+        subjects=parse_subjects(subject_text),
+        verb=verb,
+        resources=resources,
+        permissions=permissions,
+        location=parse_location(location_text),
+        conditions=conditions.strip() if conditions else None,
+        policy_name=policy_name,
+        policy_compartment_id=policy_compartment_id
+    )
+
+
+def resource_keys(resource_type):
+    # Resource tokens whose grant covers the given resource type
+    resource_type = resource_type.lower()
+    keys = {resource_type, ALL_RESOURCES}
+    keys.update(TYPE_FAMILIES.get(resource_type, ()))
+    return keys
+
+
+def resource_covers(broader, narrower):
+    if broader == narrower or broader == ALL_RESOURCES:
+        return True
+    return broader in TYPE_FAMILIES.get(narrower, ()) or (
+        narrower in RESOURCE_FAMILIES and set(RESOURCE_FAMILIES[narrower]) <= set(RESOURCE_FAMILIES.get(broader, ()))
+    )
+
+
+def verb_covers(broader, narrower):
+    return VERB_RANK[broader] >= VERB_RANK[narrower]
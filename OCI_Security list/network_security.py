@@ -1,36 +1,44 @@
+import os
+import sys
 import oci
 import csv
 
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from OCI_Common.clients import get_client
+from OCI_Common.compartments import fetch_compartments
+
 def list_security_lists_and_nsgs():
     config = oci.config.from_file()
-    identity_client = oci.identity.IdentityClient(config)
-    compartments = identity_client.list_compartments(config["tenancy"], compartment_id_in_subtree=True).data
-    network_client = oci.core.VirtualNetworkClient(config)
+    identity_client = get_client(oci.identity.IdentityClient, config)
+    # Every compartment in the tenancy, root included, not just the first page of them
+    compartments = [c for c in fetch_compartments(identity_client, config["tenancy"]) if c["lifecycle_state"] == "ACTIVE"]
+    network_client = get_client(oci.core.VirtualNetworkClient, config)
     
     with open("security_nsg_report.csv", mode="w", newline="") as file:
         writer = csv.writer(file)
         writer.writerow(["Compartment", "Type", "Name", "Rule Type", "Protocol", "Source/Destination", "Options", "Remarks"])
         
         for compartment in compartments:
-            print(f"Checking compartment: {compartment.name}")
+            print(f"Checking compartment: {compartment['name']}")
             
             # Fetch Security Lists
-            security_lists = network_client.list_security_lists(compartment_id=compartment.id).data
+            security_lists = network_client.list_security_lists(compartment_id=compartment["id"]).data
             for sec_list in security_lists:
                 for rule in sec_list.ingress_security_rules:
                     remarks = "Open to all (Risky)" if rule.source == "0.0.0.0/0" else "Safe"
-                    writer.writerow([compartment.name, "Security List", sec_list.display_name, "Ingress", rule.protocol, rule.source, rule.tcp_options, remarks])
+                    writer.writerow([compartment["name"], "Security List", sec_list.display_name, "Ingress", rule.protocol, rule.source, rule.tcp_options, remarks])
                 for rule in sec_list.egress_security_rules:
                     remarks = "Open to all (Risky)" if rule.destination == "0.0.0.0/0" else "Safe"
-                    writer.writerow([compartment.name, "Security List", sec_list.display_name, "Egress", rule.protocol, rule.destination, rule.tcp_options, remarks])
+                    writer.writerow([compartment["name"], "Security List", sec_list.display_name, "Egress", rule.protocol, rule.destination, rule.tcp_options, remarks])
             
             # Fetch Network Security Groups (NSGs)
-            nsgs = network_client.list_network_security_groups(compartment_id=compartment.id).data
+            nsgs = network_client.list_network_security_groups(compartment_id=compartment["id"]).data
             for nsg in nsgs:
                 security_rules = network_client.list_network_security_group_security_rules(network_security_group_id=nsg.id).data
                 for rule in security_rules:
                     remarks = "Open to all (Risky)" if rule.source == "0.0.0.0/0" else "Safe"
-                    writer.writerow([compartment.name, "NSG", nsg.display_name, rule.direction, rule.protocol, rule.source, "-", remarks])
+                    writer.writerow([compartment["name"], "NSG", nsg.display_name, rule.direction, rule.protocol, rule.source, "-", remarks])
     
     print("Security and NSG details saved to security_nsg_report.csv")
 
@@ -1,12 +1,19 @@
+import os
+import sys
 import oci
 import json
 
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from OCI_Common.clients import get_client
+from OCI_Common.compartments import fetch_compartments
+
 # Load the configuration
 config = oci.config.from_file("~/.oci/config")
 
 # Initialize clients
-virtual_network_client = oci.core.VirtualNetworkClient(config)
-identity_client = oci.identity.IdentityClient(config)
+virtual_network_client = get_client(oci.core.VirtualNetworkClient, config)
+identity_client = get_client(oci.identity.IdentityClient, config)
 
 # Get tenancy ID from the config
 tenancy_id = config["tenancy"]
@@ -15,33 +22,27 @@ tenancy_id = config["tenancy"]
 vcn_details = []
 
 try:
-    # List all compartments
-    compartments = oci.pagination.list_call_get_all_results(
-        identity_client.list_compartments,
-        tenancy_id,
-        compartment_id_in_subtree=True,  # Enable fetching sub-compartments
-        access_level="ANY"  # Include all compartments the user has access to
-    ).data
-
-    # Include the root compartment
-    compartments.append(oci.identity.models.Compartment(id=tenancy_id, name="Tenancy Root"))
+    # List all compartments, root included
+    compartments = fetch_compartments(identity_client, tenancy_id)
 
     # Iterate through compartments and fetch VCNs
     for compartment in compartments:
-        if compartment.lifecycle_state == "ACTIVE":
-            print(f"Listing VCNs in compartment: {compartment.name}")
+        if compartment["lifecycle_state"] == "ACTIVE":
+            print(f"Listing VCNs in compartment: {compartment['name']}")
             vcn_response = oci.pagination.list_call_get_all_results(
                 virtual_network_client.list_vcns,
-                compartment_id=compartment.id
+                compartment_id=compartment["id"]
             )
             for vcn in vcn_response.data:
                 print(f"VCN Name: {vcn.display_name}, VCN ID: {vcn.id}")
                 # Add VCN details to the list
                 vcn_details.append({
-                    "compartment": compartment.name,
+                    "compartment": compartment["name"],
                     "vcn_name": vcn.display_name,
                     "vcn_id": vcn.id,
-                    "region": config["region"]  # Add region info
+                    "region": config["region"],  # Add region info
+                    "defined_tags": vcn.defined_tags,
+                    "freeform_tags": vcn.freeform_tags
                 })
 
     # Export VCN details to a JSON file
@@ -0,0 +1,160 @@
+import oci
+
+from OCI_Common.call_budget import CORE
+from OCI_Common.pagination import MAX_LIMIT, paginate
+
+# Call estimates for collector_all_resorces.py, made before it runs. Resources are counted per
+# compartment with one paginated Resource Search (a call per thousand resources), and each count
+# is turned into the calls discovery makes for it: a page per thousand for every listing, plus
+# the per-resource lookups that grow with the fleet.
+
+# Optional discovery stages, in the order a call budget gives them up
+ENRICHMENT_STAGES = [
+    "bucket_objects",  # list_objects for every bucket, or the sampled estimate
+    "instance_nsgs",  # VNIC attachments, VNICs and NSG rules per instance
+    "volume_attachments",  # Attachment listing per volume
+    "volume_backups",  # Backup and boot volume backup listings per compartment
+    "bucket_details",  # get_bucket per bucket, for public access
+    "image_checks",  # Platform image catalog and images it does not list
+    "cloud_guard",
+    "cloud_advisor"
+]
+CORE_LISTINGS = 7  # Listings per compartment: VCNs, instances, volumes, buckets, ADBs, LBs, policies
+
+# Resource Search type -> what discovery lists of it
+SEARCH_TYPES = {
+    "Vcn": "VCNs",
+    "Instance": "Compute Instances",
+    "Volume": "Block Volumes",
+    "Bucket": "Buckets",
+    "AutonomousDatabase": "Autonomous Databases",
+    "LoadBalancer": "Load Balancers",
+    "Policy": "Policies",
+    "NetworkSecurityGroup": "Network Security Groups",
+    "VolumeBackup": "Volume Backups",
+    "BootVolumeBackup": "Boot Volume Backups"
+}
+SEARCH_QUERY = f"query {', '.join(search_type.lower() for search_type in SEARCH_TYPES)} resources"
+
+LATENCY = 0.25  # Seconds per request, for the projection
+SERVICE_RATE = 10  # Requests per second one service answers before it throttles
+IMAGE_PAGES = 3  # A region's platform image listing
+BUCKET_WORKERS = 8  # get_bucket calls BucketCache makes at once
+
+
+def pages(count):
+    return max(1, -(-count // MAX_LIMIT))
+
+
+def search_counts(search_client):
+    # (compartment OCID, search type) -> resources, bucket names per compartment, and the calls taken
+    details = oci.resource_search.models.StructuredSearchDetails(query=SEARCH_QUERY, type="Structured", matching_context_type="NONE")
+    counts, bucket_names = {}, {}
+    items = 0
+    for item in paginate(search_client.search_resources, details):
+        items += 1
+        key = (item.compartment_id, item.resource_type)
+        counts[key] = counts.get(key, 0) + 1
+        if item.resource_type == "Bucket":
+            bucket_names.setdefault(item.compartment_id, []).append(item.display_name)
+    return counts, bucket_names, pages(items)
+
+
+def plan_collection(search_client, compartments, bucket_cache, image_cache_fresh, sample_buckets=False, sample_budget=200):
+    # Estimated calls per (service, stage) for one run over the ACTIVE compartments, and the calls
+    # the estimate itself took. Buckets already in bucket_cache (a BucketCache) need no get_bucket.
+    counts, bucket_names, search_calls = search_counts(search_client)
+    plan = {}
+
+    def add(service, stage, calls):
+        plan[(service, stage)] = plan.get((service, stage), 0) + calls
+
+    add("identity", CORE, pages(len(compartments)))
+    add("object_storage", CORE, 1)  # get_namespace
+    if not image_cache_fresh:
+        add("compute", "image_checks", IMAGE_PAGES)
+    for compartment in compartments:
+        if compartment["lifecycle_state"] != "ACTIVE":
+            continue
+        count = {search_type: counts.get((compartment["id"], search_type), 0) for search_type in SEARCH_TYPES}
+        add("network", CORE, pages(count["Vcn"]))
+        add("compute", CORE, pages(count["Instance"]))
+        add("blockstorage", CORE, pages(count["Volume"]))
+        add("object_storage", CORE, pages(count["Bucket"]))
+        add("database", CORE, pages(count["AutonomousDatabase"]))
+        add("load_balancer", CORE, pages(count["LoadBalancer"]))
+        add("identity", CORE, pages(count["Policy"]))
+
+        # A VNIC attachment listing and at least one VNIC per instance, then each NSG's rules once
+        add("compute", "instance_nsgs", count["Instance"])
+        add("network", "instance_nsgs", count["Instance"] + min(count["NetworkSecurityGroup"], count["Instance"]))
+        add("compute", "volume_attachments", count["Volume"])
+        add("blockstorage", "volume_backups", pages(count["VolumeBackup"]) + pages(count["BootVolumeBackup"]))
+
+        names = bucket_names.get(compartment["id"], [])
+        add("object_storage", "bucket_details", sum(1 for name in names if name not in bucket_cache))
+        if sample_buckets:
+            add("object_storage", "bucket_objects", sample_budget * len(names))
+        else:
+            # Cached object counts give the pages; a bucket not seen before counts as one page
+            add("object_storage", "bucket_objects", sum(
+                pages((bucket_cache.peek(name) or {}).get("approximate_count") or 0) for name in names
+            ))
+    add("cloud_guard", "cloud_guard", 1)
+    add("optimizer", "cloud_advisor", 1)
+    return plan, search_calls
+
+
+def budget_fit(plan, limit):
+    # Stages a --max-calls budget would give up, in order, and the calls left after giving them up
+    total = sum(plan.values())
+    dropped = []
+    for stage in ENRICHMENT_STAGES:
+        if total <= limit:
+            break
+        dropped.append(stage)
+        total -= sum(calls for (_, planned_stage), calls in plan.items() if planned_stage == stage)
+    return dropped, total
+
+
+def projected_seconds(plan, backend, max_in_flight):
+    # Whichever is slower: the requests one after another (or max_in_flight at a time with the
+    # asyncio backend) at LATENCY each, or the busiest service at its rate limit
+    services = {}
+    for (service, _), calls in plan.items():
+        services[service] = services.get(service, 0) + calls
+    total = sum(services.values())
+    throttled = max(services.values(), default=0) / SERVICE_RATE
+    if backend == "async":
+        return max(total * LATENCY / max_in_flight, throttled)
+    details = sum(calls for (_, stage), calls in plan.items() if stage == "bucket_details")
+    return max((total - details + details / BUCKET_WORKERS) * LATENCY, throttled)
+
+
+def format_duration(seconds):
+    minutes, seconds = divmod(int(seconds), 60)
+    hours, minutes = divmod(minutes, 60)
+    return f"{hours}h {minutes:02d}m" if hours else f"{minutes}m {seconds:02d}s"
+
+
+def print_plan(plan, search_calls, active, max_in_flight, limit=None):
+    print(f"Estimated API calls for {active} active compartments (Resource Search counts, {search_calls} calls):")
+    stages = [CORE] + ENRICHMENT_STAGES
+    services = sorted({service for service, _ in plan})
+    print(f"{'Service':<16}" + "".join(f"{stage:>20}" for stage in stages) + f"{'Total':>12}")
+    for service in services:
+        row = [plan.get((service, stage), 0) for stage in stages]
+        print(f"{service:<16}" + "".join(f"{calls:>20,}" for calls in row) + f"{sum(row):>12,}")
+    total = sum(plan.values())
+    print(f"{'Total':<16}" + "".join(f"{sum(plan.get((service, stage), 0) for service in services):>20,}" for stage in stages) + f"{total:>12,}")
+    print(f"Projected wall time: {format_duration(projected_seconds(plan, 'threads', max_in_flight))} with --backend threads, "
+          f"{format_duration(projected_seconds(plan, 'async', max_in_flight))} with --backend async "
+          f"(at {LATENCY}s per request and {SERVICE_RATE} requests/s per service)")
+    if limit is not None:
+        dropped, remaining = budget_fit(plan, limit)
+        if remaining > limit:
+            print(f"--max-calls {limit:,}: the core listings alone need about {remaining:,} calls; later compartments would be skipped")
+        elif dropped:
+            print(f"--max-calls {limit:,}: would skip {', '.join(dropped)} (about {remaining:,} calls)")
+        else:
+            print(f"--max-calls {limit:,}: the whole run fits")
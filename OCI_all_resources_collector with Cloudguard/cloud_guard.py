@@ -0,0 +1,74 @@
+import argparse
+import json
+import os
+import sys
+
+import oci
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from OCI_Common.clients import get_client
+from OCI_Common.compartments import fetch_compartments
+from OCI_Common.pagination import paginate
+
+# Cloud Guard problems on their own, so they can be refreshed every few minutes while the full
+# resource collection runs hourly. One tenancy-wide listing covers every compartment.
+
+
+def format_time(value):
+    return value.isoformat() if value else None
+
+
+def problem_row(problem, compartment_names):
+    return {
+        "compartment": compartment_names.get(problem.compartment_id, problem.compartment_id),
+        "resource_name": problem.resource_name,
+        "resource_ocid": problem.resource_id,
+        "resource_type": problem.resource_type,
+        "risk_level": problem.risk_level,
+        "lifecycle_detail": problem.lifecycle_detail,
+        "detector_rule_id": problem.detector_rule_id,
+        "labels": problem.labels,
+        "region": problem.region,
+        "time_first_detected": format_time(problem.time_first_detected),
+        "time_last_detected": format_time(problem.time_last_detected),
+        "problem_ocid": problem.id
+    }
+
+
+def collect_problems(config, lifecycle_detail="OPEN"):
+    identity_client = get_client(oci.identity.IdentityClient, config)
+    cloud_guard_client = get_client(oci.cloud_guard.CloudGuardClient, config)
+    tenancy_id = config["tenancy"]
+    compartment_names = {row["id"]: row["name"] for row in fetch_compartments(identity_client, tenancy_id)}
+
+    filters = {"lifecycle_detail": lifecycle_detail} if lifecycle_detail else {}
+    problems = paginate(
+        cloud_guard_client.list_problems,
+        compartment_id=tenancy_id,
+        compartment_id_in_subtree=True,
+        access_level="ACCESSIBLE",
+        **filters
+    )
+    return [problem_row(problem, compartment_names) for problem in problems]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export Cloud Guard problems for the whole tenancy")
+    parser.add_argument("--all-states", action="store_true", help="Include resolved and dismissed problems, not only open ones")
+    parser.add_argument("--output", default="cloud_guard_problems.json")
+    args = parser.parse_args()
+
+    config = oci.config.from_file("~/.oci/config")
+    try:
+        rows = collect_problems(config, None if args.all_states else "OPEN")
+    except oci.exceptions.ServiceError as e:
+        print(f"Cloud Guard Service Error: {e}")
+        return
+    with open(args.output, "w") as file:
+        json.dump(rows, file, indent=4)
+    print(f"{len(rows)} Cloud Guard problems saved to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
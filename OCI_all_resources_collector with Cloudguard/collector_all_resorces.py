@@ -1,310 +1,372 @@
+import os
+import sys
+import argparse
 import oci
 import json
-from openpyxl import Workbook
-from openpyxl.styles import PatternFill, Font
-from openpyxl.chart import PieChart, BarChart, Reference
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from OCI_Common.async_client import MAX_IN_FLIGHT, run_compartment_scans
+from OCI_Common.backups import BackupIndex, backup_records
+from OCI_Common.bucket_sampling import estimate_bucket
+from OCI_Common.buckets import BucketCache
+from OCI_Common.call_budget import CORE, CallBudget, listing_calls
+from OCI_Common.calls import call, exists, listing, run_scan, tolerant
+from OCI_Common.clients import get_client
+from OCI_Common.compartments import fetch_compartments, load_or_fetch_compartments, save_compartments
+from OCI_Common.images import DEFAULT_CACHE_PATH as IMAGE_CACHE_PATH, ImageIndex, load_cache
+from OCI_Common.pagination import paginate
+from OCI_Common.records import ObjectRecord, to_json
+from OCI_Common.rules import DEFAULT_RULES_PATH, ResourceTables, evaluate_rules, load_rules
+from OCI_Common.tag_index import TagIndex, index_path
+from call_plan import CORE_LISTINGS, ENRICHMENT_STAGES, plan_collection, print_plan
+from inventory import EXPORT_FIELDS, InventoryLock
+from inventory_workbook import write_workbook
+
+parser = argparse.ArgumentParser(description="Discover OCI resources and check them against best practices")
+parser.add_argument("--sample-buckets", action="store_true",
+                    help="Estimate bucket contents from sampled pages instead of listing every object")
+parser.add_argument("--sample-budget", type=int, default=200, help="List calls per bucket in sampling mode")
+parser.add_argument("--rules", default=DEFAULT_RULES_PATH, help="Best-practice rules file (JSON)")
+parser.add_argument("--backend", choices=["threads", "async"], default="threads",
+                    help="Discover compartments one by one, or all at once with asyncio for very large tenancies")
+parser.add_argument("--max-in-flight", type=int, default=MAX_IN_FLIGHT, help="Concurrent requests with --backend async")
+parser.add_argument("--endpoint", help="Send every request to this URL instead of the regional endpoints")
+parser.add_argument("--plan", action="store_true",
+                    help="Estimate the API calls and wall time of a run from Resource Search counts, then exit")
+parser.add_argument("--max-calls", type=int,
+                    help="API call budget for the run; optional enrichment stages are skipped first once it runs short")
+parser.add_argument("--compartments", default="compartments.json",
+                    help="Compartment list cache; --plan reads it, a run refreshes it")
+args = parser.parse_args()
+if args.max_calls is not None and args.max_calls < 1:
+    parser.error("--max-calls must be at least 1")
 
 # Load OCI configuration
 config = oci.config.from_file("~/.oci/config")
 
-# Initialize OCI clients
-identity_client = oci.identity.IdentityClient(config)
-virtual_network_client = oci.core.VirtualNetworkClient(config)
-compute_client = oci.core.ComputeClient(config)
-block_storage_client = oci.core.BlockstorageClient(config)
-object_storage_client = oci.object_storage.ObjectStorageClient(config)
-database_client = oci.database.DatabaseClient(config)
-load_balancer_client = oci.load_balancer.LoadBalancerClient(config)
-cloud_advisor_client = oci.optimizer.OptimizerClient(config)
-cloud_guard_client = oci.cloud_guard.CloudGuardClient(config)
+# Initialize OCI clients; an endpoint override sends every service to one URL, e.g. a local stand-in server
+client_kwargs = {"service_endpoint": args.endpoint} if args.endpoint else {}
+identity_client = get_client(oci.identity.IdentityClient, config, **client_kwargs)
+virtual_network_client = get_client(oci.core.VirtualNetworkClient, config, **client_kwargs)
+compute_client = get_client(oci.core.ComputeClient, config, **client_kwargs)
+block_storage_client = get_client(oci.core.BlockstorageClient, config, **client_kwargs)
+object_storage_client = get_client(oci.object_storage.ObjectStorageClient, config, **client_kwargs)
+database_client = get_client(oci.database.DatabaseClient, config, **client_kwargs)
+load_balancer_client = get_client(oci.load_balancer.LoadBalancerClient, config, **client_kwargs)
+cloud_advisor_client = get_client(oci.optimizer.OptimizerClient, config, **client_kwargs)
+cloud_guard_client = get_client(oci.cloud_guard.CloudGuardClient, config, **client_kwargs)
+# Discovery scans name their clients by key
+clients = {
+    "identity": identity_client,
+    "network": virtual_network_client,
+    "compute": compute_client,
+    "blockstorage": block_storage_client,
+    "object_storage": object_storage_client,
+    "database": database_client,
+    "load_balancer": load_balancer_client
+}
+CLIENT_CLASSES = {key: type(client) for key, client in clients.items()}
 namespace = object_storage_client.get_namespace().data
+bucket_cache = BucketCache(object_storage_client, namespace, config["region"])
 
 # Get tenancy ID
 tenancy_id = config["tenancy"]
 
+if args.plan:
+    # Dry run: count resources with Resource Search over the cached compartment list and print
+    # the calls a run would make, without listing anything per compartment
+    search_client = get_client(oci.resource_search.ResourceSearchClient, config, **client_kwargs)
+    compartment_rows = load_or_fetch_compartments(args.compartments, config, identity_client)
+    plan, search_calls = plan_collection(
+        search_client, compartment_rows, bucket_cache,
+        load_cache(IMAGE_CACHE_PATH, config["region"]) is not None, args.sample_buckets, args.sample_budget
+    )
+    active_count = sum(1 for row in compartment_rows if row["lifecycle_state"] == "ACTIVE")
+    print_plan(plan, search_calls, active_count, args.max_in_flight, args.max_calls)
+    sys.exit(0)
+
+# Calls are counted per service and stage; with --max-calls the enrichment stages give way first
+budget = CallBudget(args.max_calls, ENRICHMENT_STAGES)
+budget.settle("object_storage", CORE, 0, 1)  # get_namespace
+image_cache_fresh = load_cache(IMAGE_CACHE_PATH, config["region"]) is not None
+image_index = ImageIndex(compute_client, tenancy_id, config["region"])
+if not image_cache_fresh:
+    budget.settle("compute", "image_checks", 0, listing_calls(image_index.images))
+
 # Initialize result storage
 resources = {}
 findings = {}
+skipped_compartments = []  # Not listed for the call budget; they are marked so, not written as empty
+# Records per resource type; the best-practice rules run over these after discovery
+rules = load_rules(args.rules, profile="all_resources")
+tables = ResourceTables(rules, EXPORT_FIELDS)
 cloud_advisor_recommendations = []
 cloud_guard_findings = []
 
-try:
-    # Fetch all compartments
-    compartments = oci.pagination.list_call_get_all_results(
-        identity_client.list_compartments,
-        tenancy_id,
-        compartment_id_in_subtree=True,
-        access_level="ANY"
-    ).data
-    compartments.append(oci.identity.models.Compartment(id=tenancy_id, name="Tenancy Root"))
-
-    # Discover resources in each compartment
-    for compartment in compartments:
-        if compartment.lifecycle_state == "ACTIVE":
-            print(f"Discovering resources in compartment: {compartment.name}")
-            resources[compartment.name] = {}
-            findings[compartment.name] = []
-
-            # Discover VCNs
-            vcn_response = oci.pagination.list_call_get_all_results(
-                virtual_network_client.list_vcns,
-                compartment_id=compartment.id
-            ).data
-            vcn_findings = []
-            for vcn in vcn_response:
-                resources[compartment.name].setdefault("VCNs", []).append({"name": vcn.display_name, "id": vcn.id})
-                # Best practice: Check for wide CIDR ranges
-                if vcn.cidr_block == "0.0.0.0/0":
-                    vcn_findings.append(f"VCN '{vcn.display_name}' has an open CIDR block.")
-            findings[compartment.name].extend(vcn_findings)
-
-            # Discover Compute Instances
-            instance_response = oci.pagination.list_call_get_all_results(
-                compute_client.list_instances,
-                compartment_id=compartment.id
-            ).data
-            instance_findings = []
-            for instance in instance_response:
-                resources[compartment.name].setdefault("Compute Instances", []).append({
-                    "name": instance.display_name,
-                    "id": instance.id
-                })
 
-                # Check if instance is using the latest platform images
-                image_details = compute_client.get_image(instance.image_id).data
-                if "platform" in image_details.operating_system and not image_details.is_latest:
-                    instance_findings.append(f"Instance '{instance.display_name}' is not using the latest platform image.")
-
-                # Check for SSH key-based authentication
-                if not instance.metadata or "ssh_authorized_keys" not in instance.metadata:
-                    instance_findings.append(f"Instance '{instance.display_name}' does not have SSH key-based authentication configured.")
-
-                # Check if password-based login is disabled
-                if instance.metadata and "disable_password_auth" not in instance.metadata:
-                    instance_findings.append(f"Instance '{instance.display_name}' has password-based login enabled.")
-
-                # Check for logging agents
-                if "logging_agent" not in instance.metadata or instance.metadata.get("logging_agent") != "configured":
-                    instance_findings.append(f"Instance '{instance.display_name}' does not have logging agents configured.")
-
-                # Check if NSGs restrict unnecessary ports
-                vnics = compute_client.list_vnic_attachments(compartment_id=compartment.id, instance_id=instance.id).data
-                for vnic_attachment in vnics:
-                    vnic = virtual_network_client.get_vnic(vnic_attachment.vnic_id).data
-                    nsgs = vnic.nsg_ids
-                    for nsg_id in nsgs:
-                        try:
-                            nsg_rules = oci.pagination.list_call_get_all_results(
-                                virtual_network_client.list_network_security_group_security_rules,
-                                network_security_group_id=nsg_id
-                            ).data
-                            for rule in nsg_rules:
-                                if rule.direction == "INGRESS" and rule.source == "0.0.0.0/0":
-                                    instance_findings.append(f"Instance '{instance.display_name}' NSG allows unrestricted ingress.")
-                        except oci.exceptions.ServiceError as e:
-                            instance_findings.append(f"Error fetching rules for NSG ID {nsg_id}: {str(e)}")
-
-            findings[compartment.name].extend(instance_findings)
-
-            # Discover Block Volumes
-            volume_response = oci.pagination.list_call_get_all_results(
-                block_storage_client.list_volumes,
-                compartment_id=compartment.id
-            ).data
-            volume_findings = []
-            for volume in volume_response:
-                resources[compartment.name].setdefault("Block Volumes", []).append({
-                    "name": volume.display_name,
-                    "id": volume.id
-                })
-                # Check if the volume is attached to any instance
-                attachments = oci.pagination.list_call_get_all_results(
-                    compute_client.list_volume_attachments,
-                    compartment_id=compartment.id,
-                    volume_id=volume.id
-                ).data
-                if not attachments:  # No attachments found
-                    volume_findings.append(f"Volume '{volume.display_name}' is not attached to any instance.")
-                # Best practice: Ensure backup policy is set
-                if not volume.is_auto_tune_enabled:
-                    volume_findings.append(f"Volume '{volume.display_name}' does not have auto-tune enabled.")
-            findings[compartment.name].extend(volume_findings)
-
-            # Discover Object Storage Buckets
-            bucket_response = oci.pagination.list_call_get_all_results(
-                object_storage_client.list_buckets,
-                namespace_name=namespace,
-                compartment_id=compartment.id
-            ).data
-            bucket_findings = []
-            for bucket in bucket_response:
-                resources[compartment.name].setdefault("Buckets", []).append({"name": bucket.name})
-                # Fetch detailed bucket info to check for public access
-                bucket_details = object_storage_client.get_bucket(
-                    namespace_name=namespace,
-                    bucket_name=bucket.name
-                ).data
-                # Best practice: Check for public access
-                if bucket_details.public_access_type != "NoPublicAccess":
-                    bucket_findings.append(f"Bucket '{bucket.name}' allows public access.")
-                # Discover Objects in Buckets
-                object_response = oci.pagination.list_call_get_all_results(
-                    object_storage_client.list_objects,
-                    namespace_name=namespace,
-                    bucket_name=bucket.name
-                ).data
-                resources[compartment.name].setdefault("Bucket Objects", []).extend([
-                    {"bucket_name": bucket.name, "object_name": obj.name} for obj in object_response.objects
-                ])
-            findings[compartment.name].extend(bucket_findings)
-
-            # Discover Autonomous Databases
-            adb_response = oci.pagination.list_call_get_all_results(
-                database_client.list_autonomous_databases,
-                compartment_id=compartment.id
-            ).data
-            adb_findings = []
-            for adb in adb_response:
-                resources[compartment.name].setdefault("Autonomous Databases", []).append({
-                    "name": adb.display_name,
-                    "id": adb.id
-                })
-                # Best practice: Check for appropriate workload type
-                if adb.db_workload != "OLTP":
-                    adb_findings.append(f"ADB '{adb.display_name}' is not optimized for OLTP workloads.")
-            findings[compartment.name].extend(adb_findings)
-
-            # Discover Load Balancers
-            lb_response = oci.pagination.list_call_get_all_results(
-                load_balancer_client.list_load_balancers,
-                compartment_id=compartment.id
-            ).data
-            lb_findings = []
-            for lb in lb_response:
-                resources[compartment.name].setdefault("Load Balancers", []).append({
-                    "name": lb.display_name,
-                    "id": lb.id
-                })
-                # Best practice: Ensure SSL termination is configured
-                if not lb.shape_name.startswith("flexible"):
-                    lb_findings.append(f"Load Balancer '{lb.display_name}' is not using a flexible shape.")
-            findings[compartment.name].extend(lb_findings)
+def discover_compartment(compartment):
+    # Discovery for one compartment as a scan (see OCI_Common/calls.py): listings that do not depend
+    # on each other are yielded together, so the asyncio backend sends each batch concurrently.
+    # Returns the records for each resource type; no SDK model outlives the scan. Every batch is
+    # claimed from the call budget first; a stage it refuses leaves its facts unknown (None).
+    found = {}
+    if not budget.claim_core(CORE_LISTINGS):
+        print(f"Call budget spent; skipping compartment {compartment.name}")
+        return None
+    if args.backend == "threads":
+        print(f"Discovering resources in compartment: {compartment.name}")
+    core = [
+        listing("network", "list_vcns", compartment_id=compartment.id),
+        listing("compute", "list_instances", compartment_id=compartment.id),
+        listing("blockstorage", "list_volumes", compartment_id=compartment.id),
+        # Bucket summaries only carry their tags when asked for
+        listing("object_storage", "list_buckets", namespace_name=namespace, compartment_id=compartment.id, fields=["tags"]),
+        listing("database", "list_autonomous_databases", compartment_id=compartment.id),
+        listing("load_balancer", "list_load_balancers", compartment_id=compartment.id),
+        listing("identity", "list_policies", compartment_id=compartment.id)
+    ]
+    core_results = yield core
+    budget.settle_batch([CORE] * len(core), core, core_results)
+    vcns, instances, volumes, buckets, adbs, lbs, policies = core_results
+
+    # Per-resource lookups: VNIC attachments per instance, attachments per volume, one backup
+    # listing per compartment instead of a lookup per volume, and the objects of every bucket.
+    # Lookups for one resource are tolerant, so a resource deleted mid-scan only loses its own facts.
+    check_nsgs = budget.claim("instance_nsgs", len(instances))
+    check_attachments = budget.claim("volume_attachments", len(volumes))
+    check_backups = budget.claim("volume_backups", 2)
+    list_objects = not args.sample_buckets and budget.claim("bucket_objects", len(buckets))
+    per_resource, stages = [], []
+    if check_nsgs:
+        per_resource += [tolerant(listing("compute", "list_vnic_attachments", compartment_id=compartment.id, instance_id=instance.id)) for instance in instances]
+        stages += ["instance_nsgs"] * len(instances)
+    if check_attachments:
+        # Paging stops at the first attachment found
+        per_resource += [tolerant(exists(listing("compute", "list_volume_attachments", compartment_id=compartment.id, volume_id=volume.id))) for volume in volumes]
+        stages += ["volume_attachments"] * len(volumes)
+    if check_backups:
+        per_resource += [
+            listing("blockstorage", "list_volume_backups", compartment_id=compartment.id),
+            listing("blockstorage", "list_boot_volume_backups", compartment_id=compartment.id)
+        ]
+        stages += ["volume_backups"] * 2
+    if list_objects:
+        per_resource += [tolerant(listing("object_storage", "list_objects", namespace_name=namespace, bucket_name=bucket.name)) for bucket in buckets]
+        stages += ["bucket_objects"] * len(buckets)
+    per_resource_results = yield per_resource
+    budget.settle_batch(stages, per_resource, per_resource_results)
+    results = iter(per_resource_results)
+    vnic_attachments = [next(results) for _ in instances] if check_nsgs else [[] for _ in instances]
+    volume_attachments = [next(results) for _ in volumes] if check_attachments else [None for _ in volumes]
+    backup_index = BackupIndex(backup_records(next(results), next(results))) if check_backups else None
+    bucket_objects = list(results) if list_objects else [[] for _ in buckets]
+    for instance, attachments in zip(instances, vnic_attachments):
+        if isinstance(attachments, oci.exceptions.ServiceError):
+            print(f"Error fetching VNIC attachments for instance {instance.display_name}: {str(attachments)}")
+    for volume, attached in zip(volumes, volume_attachments):
+        if isinstance(attached, oci.exceptions.ServiceError):
+            print(f"Error fetching attachments for volume {volume.display_name}: {str(attached)}")
+    for index, (bucket, objects) in enumerate(zip(buckets, bucket_objects)):
+        if isinstance(objects, oci.exceptions.ServiceError):
+            print(f"Error listing objects in bucket {bucket.name}: {str(objects)}")
+            bucket_objects[index] = []
+
+    vnic_ids = [attachment.vnic_id for attachments in vnic_attachments if isinstance(attachments, list) for attachment in attachments]
+    vnic_requests = [tolerant(call("network", "get_vnic", vnic_id)) for vnic_id in vnic_ids]
+    check_nsgs = check_nsgs and budget.claim("instance_nsgs", len(vnic_requests))
+    vnics = yield vnic_requests if check_nsgs else []
+    budget.settle_batch(["instance_nsgs"] * len(vnics), vnic_requests, vnics)
+    vnics = dict(zip(vnic_ids, vnics))
+    # NSG IDs per instance, or None when its attachments or one of its VNICs could not be read
+    instance_nsgs = []
+    for attachments in vnic_attachments if check_nsgs else []:
+        nsgs = []
+        for attachment in attachments if isinstance(attachments, list) else ():
+            vnic = vnics[attachment.vnic_id]
+            if isinstance(vnic, oci.exceptions.ServiceError):
+                print(f"Error fetching VNIC {attachment.vnic_id}: {str(vnic)}")
+                nsgs = None
+                break
+            nsgs.extend(vnic.nsg_ids or [])
+        instance_nsgs.append(nsgs if isinstance(attachments, list) else None)
+
+    # Each NSG's rules are listed once, however many VNICs use it, up to the first open ingress rule
+    nsg_ids = list(dict.fromkeys(nsg_id for nsgs in instance_nsgs if nsgs for nsg_id in nsgs))
+    rule_requests = [tolerant(exists(
+        listing("network", "list_network_security_group_security_rules", network_security_group_id=nsg_id),
+        lambda nsg_rule: nsg_rule.direction == "INGRESS" and nsg_rule.source == "0.0.0.0/0"
+    )) for nsg_id in nsg_ids]
+    check_nsgs = check_nsgs and budget.claim("instance_nsgs", len(rule_requests))
+    nsg_rules = yield rule_requests if check_nsgs else []
+    budget.settle_batch(["instance_nsgs"] * len(nsg_rules), rule_requests, nsg_rules)
+    open_nsgs = set()
+    for nsg_id, open_or_error in zip(nsg_ids, nsg_rules):
+        if isinstance(open_or_error, oci.exceptions.ServiceError):
+            print(f"Error fetching rules for NSG ID {nsg_id}: {str(open_or_error)}")
+        elif open_or_error:
+            open_nsgs.add(nsg_id)
+
+    for vcn in vcns:
+        found.setdefault("VCNs", []).append(tables.record("VCNs", vcn, compartment.name))
+
+    for index, instance in enumerate(instances):
+        # Images the catalog does not list cost a get_image each, the first time they are seen
+        check_image = instance.image_id in image_index.images or budget.claim("image_checks", 1)
+        if check_image and instance.image_id not in image_index.images:
+            image_index.image(instance.image_id)
+            budget.settle("compute", "image_checks", 1, 1)
+        newest_image = image_index.newest(instance.image_id) if check_image else None
+        found.setdefault("Compute Instances", []).append(tables.record(
+            "Compute Instances", instance, compartment.name,
+            image_is_latest=image_index.is_latest(instance.image_id) if check_image else None,
+            latest_image=newest_image["name"] if newest_image else None,
+            # NSGs that allow ingress from anywhere, counted per VNIC
+            open_ingress_nsgs=sum(1 for nsg_id in instance_nsgs[index] if nsg_id in open_nsgs)
+            if check_nsgs and instance_nsgs[index] is not None else None
+        ))
+
+    for volume, attached in zip(volumes, volume_attachments):
+        found.setdefault("Block Volumes", []).append(tables.record(
+            "Block Volumes", volume, compartment.name,
+            attached=attached if isinstance(attached, bool) else None,
+            has_backup_policy=backup_index.has_policy(volume.id) if backup_index else None
+        ))
+
+    # Bucket details come from the shared cache, fetched concurrently for the whole compartment
+    uncached = [bucket.name for bucket in buckets if bucket.name not in bucket_cache]
+    fetch_details = budget.claim("bucket_details", len(uncached))
+    if fetch_details:
+        bucket_cache.prefetch(uncached)
+        budget.settle("object_storage", "bucket_details", len(uncached), len(uncached))
+    for index, bucket in enumerate(buckets):
+        bucket_details = bucket_cache.get(bucket.name) if fetch_details else bucket_cache.peek(bucket.name)
+        found.setdefault("Buckets", []).append(tables.record(
+            "Buckets", bucket, compartment.name,
+            public_access_type=bucket_details["public_access_type"] if bucket_details else None
+        ))
+        # Objects in the bucket, or an estimate from a bounded sample
+        if args.sample_buckets:
+            if budget.claim("bucket_objects", args.sample_budget):
+                estimate = estimate_bucket(object_storage_client, namespace, bucket.name, args.sample_budget)
+                budget.settle("object_storage", "bucket_objects", args.sample_budget, estimate.api_calls)
+                found.setdefault("Bucket Estimates", []).append(estimate)
+            continue
+        objects = found.setdefault("Bucket Objects", [])
+        for obj in bucket_objects[index]:
+            objects.append(ObjectRecord(bucket_name=bucket.name, object_name=obj.name))
+
+    for adb in adbs:
+        found.setdefault("Autonomous Databases", []).append(tables.record("Autonomous Databases", adb, compartment.name))
+
+    for lb in lbs:
+        found.setdefault("Load Balancers", []).append(tables.record("Load Balancers", lb, compartment.name))
+
+    for policy in policies:
+        found.setdefault("Policies", []).append(tables.record("Policies", policy, compartment.name))
+    return found
+
+
+try:
+    # Fetch all compartments, root included
+    compartment_rows = fetch_compartments(identity_client, tenancy_id)
+    budget.settle("identity", CORE, 0, listing_calls(compartment_rows[1:]))
+    if args.compartments:
+        save_compartments(compartment_rows, args.compartments)
+    compartments = [
+        oci.identity.models.Compartment(id=row["id"], name=row["name"], lifecycle_state=row["lifecycle_state"])
+        for row in compartment_rows
+    ]
+
+    # Discover resources in each compartment, keeping the budget's core listings back for them
+    active = [compartment for compartment in compartments if compartment.lifecycle_state == "ACTIVE"]
+    budget.reserve = CORE_LISTINGS * len(active)
+    if args.backend == "async":
+        print(f"Discovering resources in {len(active)} compartments...")
+        discovered = run_compartment_scans(
+            config, CLIENT_CLASSES, active, lambda compartment: [(discover_compartment, (compartment,))],
+            args.max_in_flight, args.endpoint
+        )
+    else:
+        discovered = ([run_scan(discover_compartment, clients, compartment)] for compartment in active)
+    for compartment, (result,) in zip(active, discovered):
+        if isinstance(result, oci.exceptions.ServiceError):
+            print(f"Error discovering compartment {compartment.name}: {result.message}")
+            continue
+        if result is None:
+            skipped_compartments.append(compartment.name)
+            continue
+        resources[compartment.name] = result
+        findings[compartment.name] = []
+        for resource_type, records in result.items():
+            if resource_type in EXPORT_FIELDS:
+                tables[resource_type].extend(records)
+
+    # Evaluate the best-practice rules over everything that was discovered
+    for finding in evaluate_rules(rules, tables):
+        findings[finding["Compartment"]].append(finding)
 
     # Discover Cloud Advisor Recommendations
-    try:
-        advisor_recommendations = oci.pagination.list_call_get_all_results(
-            cloud_advisor_client.list_recommendations,
-            compartment_id=tenancy_id,
-            compartment_id_in_subtree=True  # Include sub-compartments
-        ).data
-        for recommendation in advisor_recommendations:
-            cloud_advisor_recommendations.append({
-                "Name": recommendation.name,
-                "Recommendation": getattr(recommendation, "description", "No description available")
-            })
-    except oci.exceptions.ServiceError as e:
-        print(f"Cloud Advisor Service Error: {e}")
+    if budget.claim("cloud_advisor", 1):
+        try:
+            advisor_recommendations = paginate(
+                cloud_advisor_client.list_recommendations,
+                compartment_id=tenancy_id,
+                compartment_id_in_subtree=True  # Include sub-compartments
+            )
+            for recommendation in advisor_recommendations:
+                cloud_advisor_recommendations.append({
+                    "Name": recommendation.name,
+                    "Recommendation": getattr(recommendation, "description", "No description available")
+                })
+        except oci.exceptions.ServiceError as e:
+            print(f"Cloud Advisor Service Error: {e}")
+        budget.settle("optimizer", "cloud_advisor", 1, listing_calls(cloud_advisor_recommendations))
 
     # Discover Cloud Guard Findings
-    try:
-        cloud_guard_problems = oci.pagination.list_call_get_all_results(
-            cloud_guard_client.list_problems,
-            compartment_id=tenancy_id,
-            compartment_id_in_subtree=True
-        ).data
-        for problem in cloud_guard_problems:
-            cloud_guard_findings.append({
-                "Name": problem.resource_name,
-                "Description": problem.labels
-            })
-    except oci.exceptions.ServiceError as e:
-        print(f"Cloud Guard Service Error: {e}")
-
-    # Export data to JSON
-    with open("oci_resources.json", "w") as file:
-        json.dump({"resources": resources, "findings": findings, "cloud_advisor_recommendations": cloud_advisor_recommendations, "cloud_guard_findings": cloud_guard_findings}, file, indent=4)
+    if budget.claim("cloud_guard", 1):
+        try:
+            cloud_guard_problems = paginate(
+                cloud_guard_client.list_problems,
+                compartment_id=tenancy_id,
+                compartment_id_in_subtree=True
+            )
+            for problem in cloud_guard_problems:
+                cloud_guard_findings.append({
+                    "Name": problem.resource_name,
+                    "Description": problem.labels
+                })
+        except oci.exceptions.ServiceError as e:
+            print(f"Cloud Guard Service Error: {e}")
+        budget.settle("cloud_guard", "cloud_guard", 1, listing_calls(cloud_guard_findings))
+
+    bucket_cache.close()
+    image_index.save()
+
+    # Export data to JSON, under the lock event_sync.py applies its batches with, and renamed over
+    # the old file so a reader never sees half of it
+    with InventoryLock("oci_resources.json"):
+        with open("oci_resources.json.tmp", "w") as file:
+            json.dump({"skipped_compartments": skipped_compartments, "resources": resources, "findings": findings, "cloud_advisor_recommendations": cloud_advisor_recommendations, "cloud_guard_findings": cloud_guard_findings}, file, indent=4, default=to_json)
+        os.replace("oci_resources.json.tmp", "oci_resources.json")
+
+        # Index the tags of every resource next to the inventory, for tag_report.py
+        tag_index = TagIndex.from_rows(
+            (compartment, resource_type, record.as_dict())
+            for compartment, types in resources.items()
+            for resource_type, records in types.items() if resource_type in EXPORT_FIELDS
+            for record in records
+        )
+        tag_index.save(index_path("oci_resources.json"))
 
     print("Resource discovery and validation completed. Results saved to 'oci_resources.json'.")
+    print(f"Tags of {len(tag_index)} resources indexed in '{index_path('oci_resources.json')}'.")
 
     # Export data to Excel
-    workbook = Workbook()
-    summary_sheet = workbook.active
-    summary_sheet.title = "Findings Summary"
-
-    # Add findings summary
-    summary_sheet.append(["Compartment", "Issue", "Recommendation"])
-    for compartment, issues in findings.items():
-        for issue in issues:
-            summary_sheet.append([compartment, issue, "Refer to OCI best practices."])
-
-    # Style misconfigurations
-    for row in summary_sheet.iter_rows(min_row=2, max_row=summary_sheet.max_row, min_col=2, max_col=2):
-        for cell in row:
-            cell.fill = PatternFill(start_color="FFCCCC", end_color="FFCCCC", fill_type="solid")
-            cell.font = Font(bold=True)
-
-    # Add Cloud Advisor Recommendations
-    advisor_sheet = workbook.create_sheet(title="Cloud Advisor")
-    advisor_sheet.append(["Name", "Recommendation"])
-    if cloud_advisor_recommendations:
-        for recommendation in cloud_advisor_recommendations:
-            advisor_sheet.append([recommendation["Name"], recommendation["Recommendation"]])
-    else:
-        advisor_sheet.append(["No Cloud Advisor recommendations found."])
-
-    # Add Cloud Guard Findings
-    cloud_guard_sheet = workbook.create_sheet(title="Cloud Guard")
-    cloud_guard_sheet.append(["Resource Name", "Description"])
-    if cloud_guard_findings:
-        for finding in cloud_guard_findings:
-            cloud_guard_sheet.append([finding["Name"], finding["Description"]])
-    else:
-        cloud_guard_sheet.append(["No Cloud Guard findings found."])
-
-    # Add data sheets for each resource type
-    for resource_type in ["VCNs", "Compute Instances", "Block Volumes", "Buckets", "Bucket Objects", "Autonomous Databases", "Load Balancers"]:
-        sheet = workbook.create_sheet(title=resource_type)
-        sheet.append(["Compartment", "Name", "ID"])
-        for compartment, resource_data in resources.items():
-            for item in resource_data.get(resource_type, []):
-                sheet.append([compartment, item.get("name"), item.get("id", "N/A")])
-
-    # Add Visualization Sheet
-    visualization_sheet = workbook.create_sheet(title="Visualizations")
-    visualization_sheet.append(["Resource Type", "Count"])
-
-    resource_counts = {
-        "VCNs": sum(len(data.get("VCNs", [])) for data in resources.values()),
-        "Compute Instances": sum(len(data.get("Compute Instances", [])) for data in resources.values()),
-        "Block Volumes": sum(len(data.get("Block Volumes", [])) for data in resources.values()),
-        "Buckets": sum(len(data.get("Buckets", [])) for data in resources.values()),
-        "Bucket Objects": sum(len(data.get("Bucket Objects", [])) for data in resources.values()),
-        "Autonomous Databases": sum(len(data.get("Autonomous Databases", [])) for data in resources.values()),
-        "Load Balancers": sum(len(data.get("Load Balancers", [])) for data in resources.values()),
-    }
-
-    for resource_type, count in resource_counts.items():
-        visualization_sheet.append([resource_type, count])
-
-    pie_chart = PieChart()
-    pie_chart.title = "Resource Distribution"
-    pie_data = Reference(visualization_sheet, min_col=2, min_row=2, max_row=len(resource_counts) + 1)
-    pie_labels = Reference(visualization_sheet, min_col=1, min_row=2, max_row=len(resource_counts) + 1)
-    pie_chart.add_data(pie_data, titles_from_data=False)
-    pie_chart.set_categories(pie_labels)
-    visualization_sheet.add_chart(pie_chart, "D2")
-
-    bar_chart = BarChart()
-    bar_chart.title = "Resource Counts"
-    bar_data = Reference(visualization_sheet, min_col=2, min_row=2, max_row=len(resource_counts) + 1)
-    bar_labels = Reference(visualization_sheet, min_col=1, min_row=2, max_row=len(resource_counts) + 1)
-    bar_chart.add_data(bar_data, titles_from_data=False)
-    bar_chart.set_categories(bar_labels)
-    visualization_sheet.add_chart(bar_chart, "D20")
-
-    # Save the Excel workbook
-    workbook.save("oci_resources.xlsx")
+    write_workbook("oci_resources.xlsx", resources, findings, cloud_advisor_recommendations, cloud_guard_findings, skipped_compartments)
     print("Detailed findings and visualizations saved to 'oci_resources.xlsx'.")
+    for line in budget.summary():
+        print(line)
 
 except oci.exceptions.ServiceError as e:
     print(f"Service Error: {e}")
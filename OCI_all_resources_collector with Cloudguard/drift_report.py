@@ -0,0 +1,237 @@
+import argparse
+import json
+import os
+import sys
+import time
+from array import array
+
+import numpy as np
+from openpyxl import Workbook
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.styles import Font
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from OCI_Common.snapshots import iter_json_spans, iter_xlsx_snapshot, read_record, record_ocid, skipped_compartments
+from inventory import EXPORT_FIELDS, identity_field
+
+# Compare two inventory runs (oci_resources.json or the .xlsx workbook) without loading either.
+# One streaming pass over each run hashes every record into flat arrays: an identity (resource
+# type plus OCID, or name for buckets) and a digest of its text, with the record's byte offset in the file. The runs
+# are joined on those arrays with numpy, and only the records that were added, removed or
+# changed are read back, each with one positioned read. Compartments either run skipped for its
+# call budget are left out of both, since a skipped compartment has no records in that run.
+
+DIFF_COLUMNS = ["Compartment", "Resource Type", "Name", "ID", "Field", "Old Value", "New Value"]
+
+# Inventory types exported without an OCID, matched on the field the inventory identifies them by
+NAMED_TYPES = {resource_type for resource_type in EXPORT_FIELDS if identity_field(resource_type) != "id"}
+
+
+def canonical(value):
+    return json.dumps(value, sort_keys=True, separators=(",", ":"), default=str)
+
+
+def record_identity(resource_type, record):
+    # The OCID, or the identity field of a named inventory type (a bucket's name); None for
+    # records that are only known by their content (findings, objects)
+    if resource_type in NAMED_TYPES:
+        return record.get(identity_field(resource_type))
+    return record_ocid(record)
+
+
+def snapshot_records(path):
+    # (compartment, resource type, identity, text, position): text is what gets hashed, and position
+    # finds the record again, a byte offset for JSON or the row number for a workbook. JSON
+    # records are only decoded when they can have an identity, to find the field that holds it.
+    if path.lower().endswith(".xlsx"):
+        for row_number, (compartment, resource_type, record) in enumerate(iter_xlsx_snapshot(path)):
+            yield compartment, resource_type, record_identity(resource_type, record), canonical(record), row_number
+        return
+    for compartment, resource_type, text, offset in iter_json_spans(path):
+        # Resources are matched by identity; records without one (objects, findings) by content
+        if resource_type in NAMED_TYPES or '"ocid1.' in text:
+            resource_id = record_identity(resource_type, json.loads(text))
+        else:
+            resource_id = None
+        yield compartment, resource_type, resource_id, text, offset
+
+
+class SnapshotIndex:
+    # Identity and content hashes of every record in one run, sorted by identity, with the
+    # resource type and compartment of each record as one small integer code. Hashes are the
+    # interpreter's own 64-bit string hashes: both runs are hashed by the same process, and
+    # nothing is stored, so they only need to agree with each other.
+
+    def __init__(self, path, skipped=frozenset()):
+        self.path = path
+        self.labels = {}  # (resource type, compartment) -> code
+        keys, digests, codes, positions, lengths = array("q"), array("q"), array("I"), array("Q"), array("I")
+        for compartment, resource_type, resource_id, text, position in snapshot_records(path):
+            if compartment in skipped:
+                continue
+            keys.append(hash((resource_type, resource_id) if resource_id else (resource_type, compartment, text)))
+            digests.append(hash((compartment, text)))
+            codes.append(self.labels.setdefault((resource_type, compartment), len(self.labels)))
+            positions.append(position)
+            lengths.append(len(text))
+        order = np.argsort(np.frombuffer(keys, dtype=np.int64), kind="stable")
+        sorted_keys = np.frombuffer(keys, dtype=np.int64)[order]
+        del keys
+        # A record listed twice (the same OCID in two compartments, say) is kept once
+        first = np.ones(len(sorted_keys), dtype=bool)
+        first[1:] = sorted_keys[1:] != sorted_keys[:-1]
+        order = order[first]
+        self.keys = sorted_keys[first]
+        self.duplicates = len(sorted_keys) - len(self.keys)
+        del sorted_keys, first
+        # Each column is reordered and its buffer released before the next, to keep the peak low
+        self.digests = np.frombuffer(digests, dtype=np.int64)[order]
+        del digests
+        self.codes = np.frombuffer(codes, dtype=np.uint32)[order]
+        del codes
+        self.positions = np.frombuffer(positions, dtype=np.uint64)[order]
+        del positions
+        self.lengths = np.frombuffer(lengths, dtype=np.uint32)[order]
+
+    def __len__(self):
+        return len(self.keys)
+
+    def records(self, selected):
+        # (compartment, resource type, record) for the selected index positions, in order
+        labels = list(self.labels)
+        found = [None] * len(selected)
+        if self.path.lower().endswith(".xlsx"):
+            wanted = {int(row_number): slot for slot, row_number in enumerate(self.positions[selected])}
+            for row_number, (compartment, resource_type, record) in enumerate(iter_xlsx_snapshot(self.path)):
+                if row_number in wanted:
+                    found[wanted[row_number]] = (compartment, resource_type, record)
+            return found
+        with open(self.path, "rb") as file:
+            for slot, index in enumerate(selected):
+                resource_type, compartment = labels[self.codes[index]]
+                found[slot] = (compartment, resource_type, read_record(file, int(self.positions[index]), int(self.lengths[index])))
+        return found
+
+
+def compare(old, new):
+    # Positions of the removed records in old, the added ones in new, and the changed ones in both
+    # Both key arrays are sorted and unique, so one binary search per old key finds its match
+    found = np.minimum(np.searchsorted(new.keys, old.keys), max(len(new) - 1, 0))
+    old_common = np.flatnonzero(new.keys[found] == old.keys) if len(new) else np.zeros(0, dtype=np.intp)
+    new_common = found[old_common]
+    del found
+    changed = old.digests[old_common] != new.digests[new_common]
+    removed = np.ones(len(old), dtype=bool)
+    removed[old_common] = False
+    added = np.ones(len(new), dtype=bool)
+    added[new_common] = False
+    return np.flatnonzero(removed), np.flatnonzero(added), old_common[changed], new_common[changed]
+
+
+def flatten(value, prefix=""):
+    # Nested dicts (tags, metadata) become dotted fields so a diff names the exact key that moved
+    if isinstance(value, dict) and value:
+        fields = {}
+        for key, item in value.items():
+            fields.update(flatten(item, f"{prefix}{key}."))
+        return fields
+    return {prefix[:-1]: value}
+
+
+def field_changes(old_compartment, old_record, new_compartment, new_record):
+    old_fields = flatten(old_record)
+    new_fields = flatten(new_record)
+    changes = []
+    if old_compartment != new_compartment:
+        changes.append(("compartment", old_compartment, new_compartment))
+    for field in dict.fromkeys(list(old_fields) + list(new_fields)):
+        old_value, new_value = old_fields.get(field), new_fields.get(field)
+        if old_value != new_value:
+            changes.append((field, old_value, new_value))
+    return changes
+
+
+def cell(value):
+    return canonical(value) if isinstance(value, (dict, list)) else value
+
+
+def record_label(record):
+    return record.get("name") or record.get("display_name") or record.get("resource_name"), record_ocid(record)
+
+
+def header_row(sheet, headers):
+    cells = []
+    for header in headers:
+        header_cell = WriteOnlyCell(sheet, value=header)
+        header_cell.font = Font(bold=True)
+        cells.append(header_cell)
+    return cells
+
+
+def write_report(old, new, removed, added, changed_old, changed_new, output):
+    # Returns the number of records whose fields really changed; a digest can also differ
+    # when only the formatting of a record did
+    workbook = Workbook(write_only=True)
+    summary = workbook.create_sheet("Summary")
+    added_sheet = workbook.create_sheet("Added")
+    removed_sheet = workbook.create_sheet("Removed")
+    changed_sheet = workbook.create_sheet("Changed")
+    for sheet in (added_sheet, removed_sheet):
+        sheet.append(header_row(sheet, ["Compartment", "Resource Type", "Name", "ID", "Record"]))
+    changed_sheet.append(header_row(changed_sheet, DIFF_COLUMNS))
+
+    counts = {}  # (resource type, compartment) -> [added, removed, changed]
+    for sheet, column, records in ((added_sheet, 0, new.records(added)), (removed_sheet, 1, old.records(removed))):
+        for compartment, resource_type, record in records:
+            counts.setdefault((resource_type, compartment), [0, 0, 0])[column] += 1
+            sheet.append([compartment, resource_type, *record_label(record), canonical(record)])
+
+    changed_count = 0
+    for (old_compartment, _, old_record), (compartment, resource_type, record) in zip(
+            old.records(changed_old), new.records(changed_new)):
+        changes = field_changes(old_compartment, old_record, compartment, record)
+        if not changes:
+            continue
+        changed_count += 1
+        counts.setdefault((resource_type, compartment), [0, 0, 0])[2] += 1
+        name, resource_id = record_label(record)
+        for field, old_value, new_value in changes:
+            changed_sheet.append([compartment, resource_type, name, resource_id, field, cell(old_value), cell(new_value)])
+
+    summary.append(header_row(summary, ["Resource Type", "Compartment", "Added", "Removed", "Changed"]))
+    for (resource_type, compartment), (added_count, removed_count, changes) in sorted(counts.items()):
+        summary.append([resource_type, compartment, added_count, removed_count, changes])
+    workbook.save(output)
+    return changed_count
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Report resources added, removed and changed between two inventory runs")
+    parser.add_argument("old", help="Earlier oci_resources.json or oci_resources.xlsx")
+    parser.add_argument("new", help="Later run in the same format")
+    parser.add_argument("--output", default="drift_report.xlsx", help="Report workbook")
+    args = parser.parse_args()
+    # Records are hashed as written, so a JSON run and a workbook run would never match
+    if args.old.lower().endswith(".xlsx") != args.new.lower().endswith(".xlsx"):
+        parser.error("both runs must be oci_resources.json files or both .xlsx workbooks")
+
+    started = time.perf_counter()
+    skipped = skipped_compartments(args.old) | skipped_compartments(args.new)
+    if skipped:
+        print(f"Leaving out {len(skipped)} compartments a call budget skipped: {', '.join(sorted(skipped))}")
+    old = SnapshotIndex(args.old, skipped)
+    new = SnapshotIndex(args.new, skipped)
+    for index in (old, new):
+        if index.duplicates:
+            print(f"{index.path}: {index.duplicates} duplicate records ignored")
+    removed, added, changed_old, changed_new = compare(old, new)
+    print(f"Indexed {len(old)} and {len(new)} records in {time.perf_counter() - started:.1f}s")
+
+    changed = write_report(old, new, removed, added, changed_old, changed_new, args.output)
+    print(f"{len(added)} added, {len(removed)} removed, {changed} changed")
+    print(f"Drift report saved to {args.output} ({time.perf_counter() - started:.1f}s)")
+
+
+if __name__ == "__main__":
+    main()
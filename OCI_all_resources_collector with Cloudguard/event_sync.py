@@ -0,0 +1,272 @@
+import argparse
+import base64
+import json
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import oci
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from OCI_Common.calls import resolve, tolerant
+from OCI_Common.compartments import fetch_compartments
+from OCI_Common.rules import DEFAULT_RULES_PATH, PLACEHOLDER, ResourceTables, evaluate_rules, load_rules
+from inventory import EXPORT_FIELDS, OCID_TYPES, Inventory, InventoryLock, export_record, refresh_call
+
+# Keep oci_resources.json current between full runs from OCI change events. Events come from an
+# NDJSON file (one Events service or Audit record per line, e.g. exported by a Service Connector)
+# or straight from an OCI Stream. Events for the same resource within one window collapse into a
+# single change, and each change is one get of that resource: the record is replaced, moved to
+# its new compartment, or removed when the get answers 404. A refreshed resource's findings are
+# evaluated again; a deleted one's are dropped.
+
+WINDOW = 5.0  # Seconds events are collected before a batch is applied
+MAX_BATCH = 500  # Distinct resources per batch, whatever the window
+MAX_WORKERS = 8
+POLL_INTERVAL = 1.0  # Seconds to wait when the feed has nothing new
+READ_SIZE = 1 << 20
+MESSAGE_LIMIT = 1000
+READ_ONLY_ACTIONS = {"GET", "HEAD"}
+
+
+def decode_event(line):
+    # One event object, or None for a blank or malformed line
+    if not line.strip():
+        return None
+    try:
+        event = json.loads(line)
+    except ValueError:
+        event = None
+    if not isinstance(event, dict):
+        print(f"Skipping malformed event: {line[:80]}")
+        return None
+    return event
+
+
+def file_events(path, follow=False, poll_interval=POLL_INTERVAL):
+    # Each poll yields the events appended since the last one; with follow, an empty list
+    # while the file is idle, so a window can close without new events
+    pending = ""
+    with open(path) as file:
+        while True:
+            chunk = file.read(READ_SIZE)
+            if chunk:
+                lines = (pending + chunk).split("\n")
+                # A line still being written is completed by the next read
+                pending = lines.pop()
+                yield [event for event in map(decode_event, lines) if event]
+            elif follow:
+                time.sleep(poll_interval)
+                yield []
+            else:
+                yield [event for event in [decode_event(pending)] if event]
+                return
+
+
+def stream_events(config, stream_id, group_name, endpoint=None, poll_interval=POLL_INTERVAL):
+    # Messages of an OCI Stream read with a group cursor, so a restart resumes where the group
+    # left off instead of replaying the whole retention window
+    if endpoint:
+        messages_endpoint = endpoint
+    else:
+        admin_client = oci.streaming.StreamAdminClient(config)
+        messages_endpoint = admin_client.get_stream(stream_id).data.messages_endpoint
+    stream_client = oci.streaming.StreamClient(config, service_endpoint=messages_endpoint)
+    cursor = stream_client.create_group_cursor(stream_id, oci.streaming.models.CreateGroupCursorDetails(
+        group_name=group_name, type="TRIM_HORIZON", commit_on_get=True
+    )).data.value
+    while True:
+        response = stream_client.get_messages(stream_id, cursor, limit=MESSAGE_LIMIT)
+        cursor = response.headers["opc-next-cursor"]
+        if not response.data:
+            time.sleep(poll_interval)
+            yield []
+            continue
+        events = (decode_event(base64.b64decode(message.value).decode("utf-8")) for message in response.data)
+        yield [event for event in events if event]
+
+
+def parse_event(event):
+    # (resource type, identity, namespace) of the resource an event is about, or None for events
+    # that do not change an inventoried resource. Events service and Audit records both carry
+    # the resource in data.resourceId; Object Storage names buckets as /n/<namespace>/b/<bucket>/.
+    data = event.get("data") or {}
+    request = data.get("request") or {}
+    if (request.get("action") or "").upper() in READ_ONLY_ACTIONS:
+        return None
+    resource_id = data.get("resourceId") or ""
+    if resource_id.startswith("/n/"):
+        parts = [part for part in resource_id.split("/") if part]
+        # Object events (/n/<namespace>/b/<bucket>/o/<object>) do not change the bucket record
+        if len(parts) == 4 and parts[2] == "b":
+            return "Buckets", parts[3], parts[1]
+        return None
+    for prefix, resource_type in OCID_TYPES.items():
+        if resource_id.startswith(prefix):
+            return resource_type, resource_id, None
+    return None
+
+
+def resource_findings(rules, resource_type, model, compartment):
+    # Findings for one resource read back by its get, and the IDs of the rules a get cannot decide:
+    # those reading facts only a full scan gathers (attachments, open NSGs, ...), which the model
+    # does not have. Findings of those rules are left as the last full run wrote them.
+    decided, undecided = [], set()
+    for rule in rules:
+        if rule["resource_type"] != resource_type:
+            continue
+        paths = [condition["field"] for condition in rule.get("where", []) + rule.get("any", [])]
+        paths += PLACEHOLDER.findall(rule["message"])
+        if all(hasattr(model, path.split(".")[0]) for path in paths):
+            decided.append(rule)
+        else:
+            undecided.add(rule["id"])
+    tables = ResourceTables(decided, EXPORT_FIELDS)
+    tables[resource_type].add(tables.record(resource_type, model, compartment))
+    return evaluate_rules(decided, tables), undecided
+
+
+class EventSync:
+    # Applies batches of changes to an inventory with one get per changed resource
+
+    def __init__(self, inventory, clients, compartment_names, refresh_compartments, rules, max_workers=MAX_WORKERS):
+        self.inventory = inventory
+        self.clients = clients
+        self.compartment_names = compartment_names  # compartment OCID -> name, as the collector writes it
+        self.refresh_compartments = refresh_compartments
+        self.rules = rules
+        self.missing_compartments = set()
+        self.executor = ThreadPoolExecutor(max_workers=max_workers)
+        self.events = 0
+        self.calls = 0
+        self.updated = 0
+        self.removed = 0
+
+    def compartment_name(self, compartment_id):
+        # A compartment created after startup is picked up by listing them again, once per compartment
+        if compartment_id not in self.compartment_names and compartment_id not in self.missing_compartments:
+            self.compartment_names = self.refresh_compartments()
+            if compartment_id not in self.compartment_names:
+                self.missing_compartments.add(compartment_id)
+        return self.compartment_names.get(compartment_id)
+
+    def fetch(self, changes):
+        # The get of every changed resource, sent together; a failure comes back as its ServiceError
+        requests = [tolerant(refresh_call(resource_type, identity, namespace))
+                    for (resource_type, identity), namespace in changes.items()]
+        self.calls += len(requests)
+        return list(self.executor.map(lambda request: resolve(self.clients, request), requests))
+
+    def apply(self, changes, results):
+        # changes: (resource type, identity) -> namespace, with the results of fetch(changes);
+        # returns the number of records touched
+        touched = 0
+        for (resource_type, identity), result in zip(changes, results):
+            if isinstance(result, oci.exceptions.ServiceError):
+                if result.status == 404:
+                    if self.inventory.remove(resource_type, identity):
+                        self.removed += 1
+                        touched += 1
+                else:
+                    print(f"Could not refresh {resource_type} {identity}: {result.message}")
+                continue
+            compartment = self.compartment_name(result.compartment_id)
+            if compartment is None:
+                print(f"Skipping {resource_type} {identity}: compartment {result.compartment_id} is not visible")
+                continue
+            self.inventory.upsert(resource_type, compartment, export_record(resource_type, result))
+            findings, undecided = resource_findings(self.rules, resource_type, result, compartment)
+            self.inventory.replace_findings(compartment, resource_type, identity, findings, keep=undecided)
+            self.updated += 1
+            touched += 1
+        return touched
+
+    def run(self, source, window=WINDOW, max_batch=MAX_BATCH):
+        # Collect changes until the window closes or the batch is full, then apply them together.
+        # The latest event per resource wins; the get reads its current state either way.
+        changes = {}
+        opened = None
+        try:
+            for events in source:
+                for event in events:
+                    self.events += 1
+                    change = parse_event(event)
+                    if change is None:
+                        continue
+                    resource_type, identity, namespace = change
+                    changes[(resource_type, identity)] = namespace
+                    if opened is None:
+                        opened = time.monotonic()
+                if changes and (time.monotonic() - opened >= window or len(changes) >= max_batch):
+                    self.flush(changes)
+                    changes, opened = {}, None
+        finally:
+            # Also on Ctrl-C, so a followed feed does not lose the changes of the open window
+            if changes:
+                self.flush(changes)
+            self.executor.shutdown(wait=True)
+
+    def flush(self, changes):
+        started = time.perf_counter()
+        results = self.fetch(changes)
+        # A full collector run may have rewritten the inventory since the last batch: it is read
+        # again first, so the batch is applied on top of that run instead of overwriting it
+        with InventoryLock(self.inventory.path):
+            if self.inventory.reload_if_changed():
+                print(f"Reloaded {self.inventory.path}, which was rewritten since the last batch")
+            touched = self.apply(changes, results)
+            if touched:
+                self.inventory.save()
+        print(f"Applied {len(changes)} changes ({touched} records written) in {time.perf_counter() - started:.1f}s; "
+              f"{self.events} events so far")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Apply OCI change events to oci_resources.json between full runs")
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument("--events", help="NDJSON file of Events service or Audit records")
+    source.add_argument("--stream-id", help="OCID of an OCI Stream that receives the events")
+    parser.add_argument("--follow", action="store_true", help="Keep reading events appended to the --events file")
+    parser.add_argument("--stream-group", default="inventory-sync", help="Consumer group for --stream-id")
+    parser.add_argument("--inventory", default="oci_resources.json", help="Inventory written by collector_all_resorces.py")
+    parser.add_argument("--window", type=float, default=WINDOW, help="Seconds events are batched before they are applied")
+    parser.add_argument("--max-batch", type=int, default=MAX_BATCH, help="Distinct resources per batch")
+    parser.add_argument("--rules", default=DEFAULT_RULES_PATH, help="Best-practice rules file (JSON) the collector ran with")
+    parser.add_argument("--endpoint", help="Send every request to this URL instead of the regional endpoints")
+    args = parser.parse_args()
+
+    config = oci.config.from_file("~/.oci/config")
+    client_kwargs = {"service_endpoint": args.endpoint} if args.endpoint else {}
+    identity_client = oci.identity.IdentityClient(config, **client_kwargs)
+    clients = {
+        "identity": identity_client,
+        "network": oci.core.VirtualNetworkClient(config, **client_kwargs),
+        "compute": oci.core.ComputeClient(config, **client_kwargs),
+        "blockstorage": oci.core.BlockstorageClient(config, **client_kwargs),
+        "object_storage": oci.object_storage.ObjectStorageClient(config, **client_kwargs),
+        "database": oci.database.DatabaseClient(config, **client_kwargs),
+        "load_balancer": oci.load_balancer.LoadBalancerClient(config, **client_kwargs)
+    }
+
+    def compartment_names():
+        return {row["id"]: row["name"] for row in fetch_compartments(identity_client, config["tenancy"])}
+
+    inventory = Inventory(args.inventory)
+    print(f"Loaded {len(inventory)} resources from {args.inventory}")
+    rules = load_rules(args.rules, profile="all_resources")
+    sync = EventSync(inventory, clients, compartment_names(), compartment_names, rules)
+    if args.events:
+        events = file_events(args.events, args.follow)
+    else:
+        events = stream_events(config, args.stream_id, args.stream_group, args.endpoint)
+    try:
+        sync.run(events, args.window, args.max_batch)
+    except KeyboardInterrupt:
+        pass
+    print(f"{sync.events} events applied as {sync.calls} get calls: {sync.updated} resources refreshed, {sync.removed} deleted")
+
+
+if __name__ == "__main__":
+    main()
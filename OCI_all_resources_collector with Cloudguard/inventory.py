@@ -0,0 +1,203 @@
+import json
+import os
+
+from OCI_Common.calls import call
+from OCI_Common.records import record_type
+from OCI_Common.tag_index import TagIndex, index_path
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None  # Windows: writers of the inventory are not locked against each other
+
+# Output fields per resource type (JSON key -> model field). Discovery keeps a compact record of
+# each resource with these fields and the ones the rules read, not the SDK model. Every type keeps
+# its tags, for the tag index (OCI_Common/tag_index.py).
+TAG_FIELDS = {"defined_tags": "defined_tags", "freeform_tags": "freeform_tags"}
+EXPORT_FIELDS = {
+    "VCNs": {"name": "display_name", "id": "id", **TAG_FIELDS},
+    "Compute Instances": {"name": "display_name", "id": "id", "compartment_id": "compartment_id", **TAG_FIELDS},
+    "Block Volumes": {"name": "display_name", "id": "id", **TAG_FIELDS},
+    "Buckets": {"name": "name", **TAG_FIELDS},
+    "Autonomous Databases": {"name": "display_name", "id": "id", **TAG_FIELDS},
+    "Load Balancers": {"name": "display_name", "id": "id", **TAG_FIELDS},
+    "Policies": {"name": "name", "id": "id", **TAG_FIELDS}
+}
+
+# Resource types that can be refreshed one resource at a time: (client key, get operation).
+# Buckets are read by namespace and name; the others by OCID.
+REFRESH_CALLS = {
+    "Compute Instances": ("compute", "get_instance"),
+    "Block Volumes": ("blockstorage", "get_volume"),
+    "VCNs": ("network", "get_vcn"),
+    "Buckets": ("object_storage", "get_bucket"),
+    "Autonomous Databases": ("database", "get_autonomous_database"),
+    "Load Balancers": ("load_balancer", "get_load_balancer"),
+    "Policies": ("identity", "get_policy")
+}
+
+# Resource type of an OCID, by its prefix
+OCID_TYPES = {
+    "ocid1.instance.": "Compute Instances",
+    "ocid1.volume.": "Block Volumes",
+    "ocid1.vcn.": "VCNs",
+    "ocid1.autonomousdatabase.": "Autonomous Databases",
+    "ocid1.loadbalancer.": "Load Balancers",
+    "ocid1.policy.": "Policies"
+}
+
+
+def identity_field(resource_type):
+    # Records are identified by OCID; buckets, which are exported without one, by name
+    return "id" if "id" in EXPORT_FIELDS[resource_type] else "name"
+
+
+def refresh_call(resource_type, identity, namespace=None):
+    # The single get that reads one resource back, as a call for OCI_Common.calls.resolve
+    client, operation = REFRESH_CALLS[resource_type]
+    if resource_type == "Buckets":
+        return call(client, operation, namespace, identity)
+    return call(client, operation, identity)
+
+
+def export_record(resource_type, model):
+    # The same fields a full run writes for the resource
+    return record_type(resource_type, (), EXPORT_FIELDS[resource_type])(model).as_dict()
+
+
+def file_stamp(path):
+    # Changes whenever the file is rewritten or replaced
+    stat = os.stat(path)
+    return stat.st_ino, stat.st_mtime_ns, stat.st_size
+
+
+class InventoryLock:
+    # Exclusive advisory lock on <inventory>.lock. The collector holds it while it writes a full
+    # run and event_sync.py while it applies a batch, so neither overwrites the other's changes.
+    __slots__ = ("path", "file")
+
+    def __init__(self, path):
+        self.path = path + ".lock"
+        self.file = None
+
+    def __enter__(self):
+        self.file = open(self.path, "a")
+        if fcntl is not None:
+            fcntl.flock(self.file, fcntl.LOCK_EX)
+        return self
+
+    def __exit__(self, *exc_info):
+        # Closing the file releases the lock
+        self.file.close()
+        self.file = None
+
+
+class Inventory:
+    # A collector run (oci_resources.json) held in memory, with every resource indexed by type and
+    # identity so one resource can be replaced, moved or removed without rescanning anything.
+
+    def __init__(self, path):
+        self.path = path
+        self.load()
+
+    def load(self):
+        with open(self.path) as file:
+            self.stamp = file_stamp(self.path)
+            self.data = json.load(file)
+        self.resources = self.data.setdefault("resources", {})
+        self.findings = self.data.setdefault("findings", {})
+        self.index = {}  # (resource type, identity) -> compartment name
+        for compartment, types in self.resources.items():
+            for resource_type, records in types.items():
+                if resource_type not in EXPORT_FIELDS:
+                    continue
+                field = identity_field(resource_type)
+                for record in records:
+                    if record.get(field):
+                        self.index[(resource_type, record[field])] = compartment
+
+    def __len__(self):
+        return len(self.index)
+
+    def reload_if_changed(self):
+        # Read the file again when something else (a full collector run) replaced it since it was
+        # loaded or last saved; returns whether it did. Call it with the InventoryLock held.
+        if file_stamp(self.path) == self.stamp:
+            return False
+        self.load()
+        return True
+
+    def _take(self, resource_type, identity):
+        # Remove a record from its compartment and return it, or None when it is not stored
+        compartment = self.index.pop((resource_type, identity), None)
+        if compartment is None:
+            return None
+        field = identity_field(resource_type)
+        types = self.resources[compartment]
+        for position, record in enumerate(types[resource_type]):
+            if record.get(field) == identity:
+                types[resource_type].pop(position)
+                # A full run only writes the types it found
+                if not types[resource_type]:
+                    del types[resource_type]
+                return record
+        return None
+
+    def _take_findings(self, compartment, resource_type, identity):
+        # Remove and return the findings raised against one resource
+        kept, taken = [], []
+        for finding in self.findings.get(compartment, []):
+            matches = finding.get("Resource Type") == resource_type and identity in (finding.get("Resource ID"), finding.get("Resource Name"))
+            (taken if matches else kept).append(finding)
+        self.findings[compartment] = kept
+        return taken
+
+    def upsert(self, resource_type, compartment, record):
+        # Replace the stored record in place, or move it (and its findings) when the resource
+        # changed compartment
+        identity = record[identity_field(resource_type)]
+        previous = self.index.get((resource_type, identity))
+        if previous == compartment:
+            records = self.resources[compartment][resource_type]
+            field = identity_field(resource_type)
+            for position, stored in enumerate(records):
+                if stored.get(field) == identity:
+                    records[position] = record
+                    return
+        findings = []
+        if previous is not None:
+            self._take(resource_type, identity)
+            findings = self._take_findings(previous, resource_type, identity)
+        self.resources.setdefault(compartment, {}).setdefault(resource_type, []).append(record)
+        for finding in findings:
+            finding["Compartment"] = compartment
+        self.findings.setdefault(compartment, []).extend(findings)
+        self.index[(resource_type, identity)] = compartment
+
+    def replace_findings(self, compartment, resource_type, identity, findings, keep=()):
+        # Replace the findings raised against one resource, keeping those of the rule IDs in keep
+        kept = [finding for finding in self._take_findings(compartment, resource_type, identity) if finding.get("Rule ID") in keep]
+        self.findings.setdefault(compartment, []).extend(kept + findings)
+
+    def remove(self, resource_type, identity):
+        # Drop a deleted resource and the findings raised against it; returns whether it was stored
+        compartment = self.index.get((resource_type, identity))
+        if self._take(resource_type, identity) is None:
+            return False
+        self._take_findings(compartment, resource_type, identity)
+        return True
+
+    def save(self):
+        # Written to a temporary file and renamed over the old one, so readers never see half a file
+        temporary = self.path + ".tmp"
+        with open(temporary, "w") as file:
+            json.dump(self.data, file, indent=4)
+        os.replace(temporary, self.path)
+        self.stamp = file_stamp(self.path)
+        # The tag index next to the inventory is rebuilt from the records in memory
+        TagIndex.from_rows(
+            (compartment, resource_type, record)
+            for compartment, types in self.resources.items()
+            for resource_type, records in types.items() if resource_type in EXPORT_FIELDS
+            for record in records
+        ).save(index_path(self.path))
@@ -0,0 +1,96 @@
+from openpyxl import Workbook
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.chart import BarChart, PieChart, Reference
+from openpyxl.styles import Font, PatternFill
+
+from OCI_Common.rules import FINDING_COLUMNS
+
+# The oci_resources.xlsx workbook, written in openpyxl's write-only mode: rows are streamed to the
+# file as they are appended instead of kept as cell objects until save, so memory stays flat at
+# any inventory size (see OCI_Benchmarks/report_writers.py).
+
+SHEET_TYPES = ["VCNs", "Compute Instances", "Block Volumes", "Buckets", "Bucket Objects", "Autonomous Databases", "Load Balancers", "Policies"]
+ISSUE_FILL = PatternFill(start_color="FFCCCC", end_color="FFCCCC", fill_type="solid")
+
+
+def issue_row(sheet, issue):
+    # Misconfigurations are highlighted in the Issue column
+    row = [issue[column] for column in FINDING_COLUMNS]
+    issue_column = FINDING_COLUMNS.index("Issue")
+    issue_cell = WriteOnlyCell(sheet, value=row[issue_column])
+    issue_cell.fill = ISSUE_FILL
+    issue_cell.font = Font(bold=True)
+    row[issue_column] = issue_cell
+    return row
+
+
+def write_workbook(path, resources, findings, cloud_advisor_recommendations, cloud_guard_findings, skipped_compartments=()):
+    workbook = Workbook(write_only=True)
+
+    # Add findings summary
+    summary_sheet = workbook.create_sheet(title="Findings Summary")
+    summary_sheet.append(FINDING_COLUMNS)
+    for compartment, issues in findings.items():
+        for issue in issues:
+            summary_sheet.append(issue_row(summary_sheet, issue))
+
+    # Add Cloud Advisor Recommendations
+    advisor_sheet = workbook.create_sheet(title="Cloud Advisor")
+    advisor_sheet.append(["Name", "Recommendation"])
+    if cloud_advisor_recommendations:
+        for recommendation in cloud_advisor_recommendations:
+            advisor_sheet.append([recommendation["Name"], recommendation["Recommendation"]])
+    else:
+        advisor_sheet.append(["No Cloud Advisor recommendations found."])
+
+    # Add Cloud Guard Findings
+    cloud_guard_sheet = workbook.create_sheet(title="Cloud Guard")
+    cloud_guard_sheet.append(["Resource Name", "Description"])
+    if cloud_guard_findings:
+        for finding in cloud_guard_findings:
+            cloud_guard_sheet.append([finding["Name"], finding["Description"]])
+    else:
+        cloud_guard_sheet.append(["No Cloud Guard findings found."])
+
+    # Add data sheets for each resource type
+    for resource_type in SHEET_TYPES:
+        sheet = workbook.create_sheet(title=resource_type)
+        sheet.append(["Compartment", "Name", "ID"])
+        for compartment, resource_data in resources.items():
+            for item in resource_data.get(resource_type, []):
+                sheet.append([compartment, item.get("name"), item.get("id", "N/A")])
+
+    # Compartments the call budget skipped have no rows above; the sheet tells them from empty ones
+    if skipped_compartments:
+        skipped_sheet = workbook.create_sheet(title="Skipped Compartments")
+        skipped_sheet.append(["Compartment", "Reason"])
+        for compartment in skipped_compartments:
+            skipped_sheet.append([compartment, "Call budget spent (--max-calls)"])
+
+    # Add Visualization Sheet
+    visualization_sheet = workbook.create_sheet(title="Visualizations")
+    visualization_sheet.append(["Resource Type", "Count"])
+    resource_counts = {
+        resource_type: sum(len(data.get(resource_type, [])) for data in resources.values())
+        for resource_type in SHEET_TYPES
+    }
+    for resource_type, count in resource_counts.items():
+        visualization_sheet.append([resource_type, count])
+
+    pie_chart = PieChart()
+    pie_chart.title = "Resource Distribution"
+    pie_data = Reference(visualization_sheet, min_col=2, min_row=2, max_row=len(resource_counts) + 1)
+    pie_labels = Reference(visualization_sheet, min_col=1, min_row=2, max_row=len(resource_counts) + 1)
+    pie_chart.add_data(pie_data, titles_from_data=False)
+    pie_chart.set_categories(pie_labels)
+    visualization_sheet.add_chart(pie_chart, "D2")
+
+    bar_chart = BarChart()
+    bar_chart.title = "Resource Counts"
+    bar_data = Reference(visualization_sheet, min_col=2, min_row=2, max_row=len(resource_counts) + 1)
+    bar_labels = Reference(visualization_sheet, min_col=1, min_row=2, max_row=len(resource_counts) + 1)
+    bar_chart.add_data(bar_data, titles_from_data=False)
+    bar_chart.set_categories(bar_labels)
+    visualization_sheet.add_chart(bar_chart, "D20")
+
+    workbook.save(path)
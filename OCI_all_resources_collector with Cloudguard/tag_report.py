@@ -0,0 +1,110 @@
+import argparse
+import csv
+import os
+import sys
+import time
+
+import numpy as np
+from openpyxl import Workbook
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.styles import Font
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from OCI_Common.snapshots import iter_json_snapshot
+from OCI_Common.tag_index import TagIndex, TagQueryError, compile_query, index_path
+
+# Tag queries and tag compliance over an inventory run, answered from the tag index the collector
+# stores next to oci_resources.json. An index older than its inventory (event_sync.py updated it,
+# or it came from an older collector) is rebuilt first with one streaming pass over the file.
+
+
+def load_index(inventory_path):
+    path = index_path(inventory_path)
+    if os.path.exists(path) and os.path.getmtime(path) >= os.path.getmtime(inventory_path):
+        return TagIndex.load(path)
+    print(f"Indexing tags in {inventory_path}...")
+    index = TagIndex.from_rows(iter_json_snapshot(inventory_path))
+    index.save(path)
+    return index
+
+
+def header_row(sheet, headers):
+    cells = []
+    for header in headers:
+        header_cell = WriteOnlyCell(sheet, value=header)
+        header_cell.font = Font(bold=True)
+        cells.append(header_cell)
+    return cells
+
+
+def write_matches(index, positions, output):
+    with open(output, "w", newline="") as file:
+        writer = csv.writer(file)
+        writer.writerow(["Compartment", "Resource Type", "Name", "ID"])
+        for position in positions:
+            writer.writerow([
+                index.compartments[index.compartment_codes[position]], index.types[index.type_codes[position]],
+                index.names[position], index.ids[position]
+            ])
+
+
+def write_compliance(index, required, positions, missing, output):
+    workbook = Workbook(write_only=True)
+    summary = workbook.create_sheet("Summary")
+    failing_sheet = workbook.create_sheet("Non-compliant")
+    summary.append(header_row(summary, ["Compartment", "Resources", "Non-compliant", "Compliant %"] + [f"Missing {item}" for item in required]))
+    for compartment, checked, failing, per_requirement in index.compliance_summary(positions, missing):
+        summary.append([compartment, checked, failing, round(100 * (checked - failing) / checked, 1), *per_requirement])
+
+    failing_sheet.append(header_row(failing_sheet, ["Compartment", "Resource Type", "Name", "ID", "Missing Tags"]))
+    for row in missing.any(axis=1).nonzero()[0]:
+        position = positions[row]
+        failing_sheet.append([
+            index.compartments[index.compartment_codes[position]], index.types[index.type_codes[position]],
+            index.names[position], index.ids[position],
+            ", ".join(item for item, absent in zip(required, missing[row]) if absent)
+        ])
+    workbook.save(output)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Query resources by tag and report resources missing required tags")
+    parser.add_argument("--inventory", default="oci_resources.json", help="Collector run to read")
+    parser.add_argument("--query", help="Tag query, e.g. \"Ops.CostCenter AND (env=prod OR NOT Ops.Owner)\"")
+    parser.add_argument("--require", action="append",
+                        help="Tag every resource must have, e.g. Ops.CostCenter; any tag query works. Repeat for several")
+    parser.add_argument("--types", help="Comma separated resource types to check, e.g. \"Compute Instances,Block Volumes\"")
+    parser.add_argument("--output", help="Report file (tag_compliance.xlsx with --require, tag_query.csv otherwise)")
+    args = parser.parse_args()
+    if not args.query and not args.require:
+        parser.error("give a --query, one or more --require, or both")
+    try:
+        for expression in [args.query] + (args.require or []):
+            if expression:
+                compile_query(expression)
+    except TagQueryError as e:
+        parser.error(str(e))
+
+    started = time.perf_counter()
+    index = load_index(args.inventory)
+    scope = compile_query(args.query).evaluate(index) if args.query else np.ones(len(index), dtype=bool)
+    if args.types:
+        scope &= index.type_mask([resource_type.strip() for resource_type in args.types.split(",")])
+
+    if not args.require:
+        output = args.output or "tag_query.csv"
+        positions = scope.nonzero()[0]
+        write_matches(index, positions, output)
+        print(f"{len(positions)} of {len(index)} resources match; saved to {output} ({time.perf_counter() - started:.1f}s)")
+        return
+
+    output = args.output or "tag_compliance.xlsx"
+    positions, missing = index.compliance(args.require, scope)
+    write_compliance(index, args.require, positions, missing, output)
+    print(f"{int(missing.any(axis=1).sum())} of {len(positions)} resources are missing required tags")
+    print(f"Tag compliance report saved to {output} ({time.perf_counter() - started:.1f}s)")
+
+
+if __name__ == "__main__":
+    main()
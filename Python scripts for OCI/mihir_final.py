@@ -1,9 +1,17 @@
+import os
+import sys
 import oci
 import json
 from openpyxl import Workbook
 from openpyxl.styles import PatternFill, Font
 from openpyxl.chart import PieChart, BarChart, Reference
 
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from OCI_Common.pagination import paginate
+from OCI_Common.records import ObjectRecord, to_json
+from OCI_Common.rules import FINDING_COLUMNS, ResourceTables, evaluate_rules, load_rules
+
 # Load OCI configuration
 config = oci.config.from_file("~/.oci/config")
 
@@ -20,18 +28,32 @@ namespace = object_storage_client.get_namespace().data
 # Get tenancy ID
 tenancy_id = config["tenancy"]
 
+# Output fields per resource type (JSON key -> model field). Discovery keeps a compact record of
+# each resource with these fields and the ones the rules read, not the SDK model.
+EXPORT_FIELDS = {
+    "VCNs": {"name": "display_name", "id": "id"},
+    "Compute Instances": {"name": "display_name", "id": "id"},
+    "Block Volumes": {"name": "display_name", "id": "id"},
+    "Buckets": {"name": "name"},
+    "Autonomous Databases": {"name": "display_name", "id": "id"},
+    "Load Balancers": {"name": "display_name", "id": "id"}
+}
+
 # Initialize result storage
 resources = {}
 findings = {}
+# Records per resource type; the best-practice rules run over these after discovery
+rules = load_rules(profile="basic")
+tables = ResourceTables(rules, EXPORT_FIELDS)
 
 try:
     # Fetch all compartments
-    compartments = oci.pagination.list_call_get_all_results(
+    compartments = list(paginate(
         identity_client.list_compartments,
         tenancy_id,
         compartment_id_in_subtree=True,
         access_level="ANY"
-    ).data
+    ))
     compartments.append(oci.identity.models.Compartment(id=tenancy_id, name="Tenancy Root"))
 
     # Discover resources in each compartment
@@ -42,121 +64,93 @@ try:
             findings[compartment.name] = []
 
             # Discover VCNs
-            vcn_response = oci.pagination.list_call_get_all_results(
+            vcn_response = paginate(
                 virtual_network_client.list_vcns,
                 compartment_id=compartment.id
-            ).data
-            vcn_findings = []
+            )
             for vcn in vcn_response:
-                resources[compartment.name].setdefault("VCNs", []).append({"name": vcn.display_name, "id": vcn.id})
-                # Best practice: Check for wide CIDR ranges
-                if vcn.cidr_block == "0.0.0.0/0":
-                    vcn_findings.append(f"VCN '{vcn.display_name}' has an open CIDR block.")
-            findings[compartment.name].extend(vcn_findings)
+                record = tables.record("VCNs", vcn, compartment.name)
+                resources[compartment.name].setdefault("VCNs", []).append(record)
+                tables["VCNs"].add(record)
 
             # Discover Compute Instances
-            instance_response = oci.pagination.list_call_get_all_results(
+            instance_response = paginate(
                 compute_client.list_instances,
                 compartment_id=compartment.id
-            ).data
-            instance_findings = []
+            )
             for instance in instance_response:
-                resources[compartment.name].setdefault("Compute Instances", []).append({
-                    "name": instance.display_name,
-                    "id": instance.id
-                })
-                # Best practice: Check if instance metadata is restricted
-                if instance.shape.startswith("VM.Standard"):
-                    instance_findings.append(f"Instance '{instance.display_name}' is using a basic shape.")
-            findings[compartment.name].extend(instance_findings)
+                record = tables.record("Compute Instances", instance, compartment.name)
+                resources[compartment.name].setdefault("Compute Instances", []).append(record)
+                tables["Compute Instances"].add(record)
 
             # Discover Block Volumes
-            volume_response = oci.pagination.list_call_get_all_results(
+            volume_response = paginate(
                 block_storage_client.list_volumes,
                 compartment_id=compartment.id
-            ).data
-            volume_findings = []
+            )
             for volume in volume_response:
-                resources[compartment.name].setdefault("Block Volumes", []).append({
-                    "name": volume.display_name,
-                    "id": volume.id
-                })
                 # Check if the volume is attached to any instance
-                attachments = oci.pagination.list_call_get_all_results(
+                attached = any(True for _ in paginate(
                     compute_client.list_volume_attachments,
                     compartment_id=compartment.id,
                     volume_id=volume.id
-                ).data
-                if not attachments:  # No attachments found
-                    volume_findings.append(f"Volume '{volume.display_name}' is not attached to any instance.")
-                # Best practice: Ensure backup policy is set
-                if not volume.is_auto_tune_enabled:
-                    volume_findings.append(f"Volume '{volume.display_name}' does not have auto-tune enabled.")
-            findings[compartment.name].extend(volume_findings)
+                ))
+                record = tables.record("Block Volumes", volume, compartment.name, attached=attached)
+                resources[compartment.name].setdefault("Block Volumes", []).append(record)
+                tables["Block Volumes"].add(record)
 
             # Discover Object Storage Buckets
-            bucket_response = oci.pagination.list_call_get_all_results(
+            bucket_response = paginate(
                 object_storage_client.list_buckets,
                 namespace_name=namespace,
                 compartment_id=compartment.id
-            ).data
-            bucket_findings = []
+            )
             for bucket in bucket_response:
-                resources[compartment.name].setdefault("Buckets", []).append({"name": bucket.name})
                 # Fetch detailed bucket info to check for public access
                 bucket_details = object_storage_client.get_bucket(
                     namespace_name=namespace,
                     bucket_name=bucket.name
                 ).data
-                # Best practice: Check for public access
-                if bucket_details.public_access_type != "NoPublicAccess":
-                    bucket_findings.append(f"Bucket '{bucket.name}' allows public access.")
+                record = tables.record("Buckets", bucket, compartment.name, public_access_type=bucket_details.public_access_type)
+                resources[compartment.name].setdefault("Buckets", []).append(record)
+                tables["Buckets"].add(record)
                 # Discover Objects in Buckets
-                object_response = oci.pagination.list_call_get_all_results(
+                object_response = paginate(
                     object_storage_client.list_objects,
                     namespace_name=namespace,
                     bucket_name=bucket.name
-                ).data
-                resources[compartment.name].setdefault("Bucket Objects", []).extend([
-                    {"bucket_name": bucket.name, "object_name": obj.name} for obj in object_response.objects
-                ])
-            findings[compartment.name].extend(bucket_findings)
+                )
+                resources[compartment.name].setdefault("Bucket Objects", []).extend(
+                    ObjectRecord(bucket_name=bucket.name, object_name=obj.name) for obj in object_response
+                )
 
             # Discover Autonomous Databases
-            adb_response = oci.pagination.list_call_get_all_results(
+            adb_response = paginate(
                 database_client.list_autonomous_databases,
                 compartment_id=compartment.id
-            ).data
-            adb_findings = []
+            )
             for adb in adb_response:
-                resources[compartment.name].setdefault("Autonomous Databases", []).append({
-                    "name": adb.display_name,
-                    "id": adb.id
-                })
-                # Best practice: Check for appropriate workload type
-                if adb.db_workload != "OLTP":
-                    adb_findings.append(f"ADB '{adb.display_name}' is not optimized for OLTP workloads.")
-            findings[compartment.name].extend(adb_findings)
+                record = tables.record("Autonomous Databases", adb, compartment.name)
+                resources[compartment.name].setdefault("Autonomous Databases", []).append(record)
+                tables["Autonomous Databases"].add(record)
 
             # Discover Load Balancers
-            lb_response = oci.pagination.list_call_get_all_results(
+            lb_response = paginate(
                 load_balancer_client.list_load_balancers,
                 compartment_id=compartment.id
-            ).data
-            lb_findings = []
+            )
             for lb in lb_response:
-                resources[compartment.name].setdefault("Load Balancers", []).append({
-                    "name": lb.display_name,
-                    "id": lb.id
-                })
-                # Best practice: Ensure SSL termination is configured
-                if not lb.shape_name.startswith("flexible"):
-                    lb_findings.append(f"Load Balancer '{lb.display_name}' is not using a flexible shape.")
-            findings[compartment.name].extend(lb_findings)
+                record = tables.record("Load Balancers", lb, compartment.name)
+                resources[compartment.name].setdefault("Load Balancers", []).append(record)
+                tables["Load Balancers"].add(record)
+
+    # Evaluate the best-practice rules over everything that was discovered
+    for finding in evaluate_rules(rules, tables):
+        findings[finding["Compartment"]].append(finding)
 
     # Export data to JSON
     with open("oci_resources.json", "w") as file:
-        json.dump({"resources": resources, "findings": findings}, file, indent=4)
+        json.dump({"resources": resources, "findings": findings}, file, indent=4, default=to_json)
 
     print("Resource discovery and validation completed. Results saved to 'oci_resources.json'.")
 
@@ -166,13 +160,14 @@ try:
     summary_sheet.title = "Findings Summary"
 
     # Add findings summary
-    summary_sheet.append(["Compartment", "Issue", "Recommendation"])
+    summary_sheet.append(FINDING_COLUMNS)
     for compartment, issues in findings.items():
         for issue in issues:
-            summary_sheet.append([compartment, issue, "Refer to OCI best practices."])
+            summary_sheet.append([issue[column] for column in FINDING_COLUMNS])
 
     # Style misconfigurations
-    for row in summary_sheet.iter_rows(min_row=2, max_row=summary_sheet.max_row, min_col=2, max_col=2):
+    issue_column = FINDING_COLUMNS.index("Issue") + 1
+    for row in summary_sheet.iter_rows(min_row=2, max_row=summary_sheet.max_row, min_col=issue_column, max_col=issue_column):
         for cell in row:
             cell.fill = PatternFill(start_color="FFCCCC", end_color="FFCCCC", fill_type="solid")
             cell.font = Font(bold=True)
@@ -181,7 +176,7 @@ try:
     resource_issues_summary = {}
     for compartment, issues in findings.items():
         for issue in issues:
-            resource_type = issue.split(" ")[0]  # Extract resource type from the issue string
+            resource_type = issue["Resource Type"]
             resource_issues_summary[resource_type] = resource_issues_summary.get(resource_type, 0) + 1
 
     # Add a summary table for findings by resource type
@@ -1,9 +1,15 @@
+import os
+import sys
 import oci
 import json
 import csv
 from oci.object_storage import UploadManager
 import argparse
 
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from OCI_Common.bucket_sampling import estimate_bucket
+
 # Load the configuration
 config = oci.config.from_file("~/.oci/config")
 
@@ -24,6 +30,9 @@ namespace = object_storage_client.get_namespace().data
 parser = argparse.ArgumentParser(description="Discover OCI Resources")
 parser.add_argument("--type", help="Filter by resource type (e.g., vcn, compute, block)")
 parser.add_argument("--compartment-name", help="Filter by compartment name")
+parser.add_argument("--sample-buckets", action="store_true",
+                    help="Estimate bucket contents from sampled pages instead of listing every object")
+parser.add_argument("--sample-budget", type=int, default=200, help="List calls per bucket in sampling mode")
 args = parser.parse_args()
 
 # Initialize result storage
@@ -87,8 +96,12 @@ try:
                     {"name": bucket.name} for bucket in bucket_response
                 ]
 
-                # List objects in buckets
+                # List objects in buckets, or estimate them from a bounded sample
                 for bucket in bucket_response:
+                    if args.sample_buckets:
+                        estimate = estimate_bucket(object_storage_client, namespace, bucket.name, args.sample_budget)
+                        resources[compartment.name].setdefault("Bucket Estimates", []).append(estimate.as_dict())
+                        continue
                     object_response = oci.pagination.list_call_get_all_results(
                         object_storage_client.list_objects,
                         namespace_name=namespace,